@@ -4,17 +4,28 @@
 飞书项目流程管理配置API客户端 (Python版本)
 """
 
+import argparse
 import json
 import time
 import uuid
-from typing import Dict, List, Optional, Any
+from concurrent.futures import Future
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Any, Tuple, Union
 import requests
 from datetime import datetime
 
+from shared import (EVENTS, METRICS, NO_RETRY, OUTPUT_CHOICES, READ_FLIGHT, TRACER, BatchNotSupported,
+                    FieldCreateBatcher, FieldSpec, RequestMetrics, RetryPolicy, SingleFlight, SyncJournal,
+                    call_with_retry, is_retry_safe, make_emitter, merge_field_specs, parse_response,
+                    payload_digest, split_batch_results, traced, workflow_node_fields)
+
 
 class FeishuProjectAPI:
     """飞书项目API客户端"""
 
+    # 相邻写请求之间的间隔（秒），避免触发限流
+    request_interval = 0.1
+
     def __init__(self, config: Dict[str, str]):
         """初始化API客户端
 
@@ -33,55 +44,132 @@ class FeishuProjectAPI:
             'X-PLUGIN-TOKEN': self.plugin_token,
             'X-USER-KEY': self.user_key
         })
+        self.timeout = 30
+
+        # 请求指标（默认使用进程级注册表）
+        self.metrics: RequestMetrics = METRICS
+        # 瞬时故障重试策略
+        self.retry_policy = RetryPolicy()
+        # 字段创建合并器（enable_field_batching 后启用）
+        self.field_batcher: Optional[FieldCreateBatcher] = None
+        # 读请求合并与短期缓存（进程内共享；设为 None 关闭）
+        self.read_flight: Optional[SingleFlight] = READ_FLIGHT
 
     def _generate_uuid(self) -> str:
         """生成幂等性UUID"""
         return str(uuid.uuid4())
 
-    def _request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Optional[Dict]:
+    def _send_request(self, method: str, endpoint: str, data: Optional[Any] = None,
+                      idem_key: Optional[str] = None) -> Tuple[requests.Response, Optional[Dict]]:
+        """发送HTTP请求，瞬时故障时按策略重试（重试复用同一个 X-IDEM-UUID）
+
+        Returns:
+            (最后一次的响应, 已解析的 JSON 响应体)；非200或无法解析时响应体为 None
+        """
+        parsed: Dict[str, Optional[Dict]] = {}
+        url = f"{self.base_url}/{self.project_key}/{endpoint}"
+
+        # 为写操作添加幂等性UUID（所有重试复用同一个）
+        headers = {}
+        if method in ['POST', 'PUT', 'PATCH', 'DELETE']:
+            headers['X-IDEM-UUID'] = idem_key or self._generate_uuid()
+
+        def attempt() -> requests.Response:
+            started = time.perf_counter()
+            try:
+                with TRACER.span(f"{method} {endpoint}", 'http'):
+                    response = self.session.request(
+                        method=method,
+                        url=url,
+                        json=data,
+                        headers=headers,
+                        timeout=self.timeout
+                    )
+            except requests.exceptions.RequestException as e:
+                self.metrics.observe_exception(method, endpoint, e, started)
+                raise
+            body, err_code = parse_response(response)
+            parsed['body'] = body
+            self.metrics.observe_response(method, endpoint, response, started, err_code)
+            return response
+
+        def on_retry(attempt_no: int, delay: float, reason: str):
+            EVENTS.emit('api.retry', f"[重试] {method} {endpoint} 第{attempt_no}次失败({reason})，{delay:.1f}秒后重试",
+                        'warning', method=method, endpoint=endpoint, attempt=attempt_no, reason=reason)
+
+        policy = self.retry_policy if is_retry_safe(method, headers) else NO_RETRY
+        response = call_with_retry(attempt, policy, on_retry=on_retry)
+        return response, parsed.get('body')
+
+    def _request(self, method: str, endpoint: str, data: Optional[Dict] = None,
+                 idem_key: Optional[str] = None) -> Optional[Dict]:
         """发送API请求
 
+        并发的相同 GET 请求共享一次调用，成功结果短期缓存；写请求后失效本空间的缓存
+
         Args:
             method: HTTP方法
             endpoint: API端点
             data: 请求数据
+            idem_key: 指定幂等键（断点续跑时复用日志中记录的键），为空时自动生成
 
         Returns:
             响应数据或None（如果请求失败）
         """
-        url = f"{self.base_url}/{self.project_key}/{endpoint}"
-
-        # 为写操作添加幂等性UUID
-        headers = {}
-        if method in ['POST', 'PUT', 'PATCH', 'DELETE']:
-            headers['X-IDEM-UUID'] = self._generate_uuid()
+        if self.read_flight is None:
+            return self._request_once(method, endpoint, data, idem_key)
 
+        scope = (self.base_url, self.project_key)
+        if method == 'GET' and data is None:
+            return self.read_flight.do(scope + (self.user_key, endpoint),
+                                       lambda: self._request_once(method, endpoint))
         try:
-            print(f"[API请求] {method} {endpoint}")
-            response = self.session.request(
-                method=method,
-                url=url,
-                json=data,
-                headers=headers,
-                timeout=30
-            )
+            return self._request_once(method, endpoint, data, idem_key)
+        finally:
+            if method != 'GET':
+                self.read_flight.invalidate(scope)
 
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('err_code') == 0:
-                    print(f"[API响应] 成功")
-                    return result.get('data')
-                else:
-                    print(f"[API错误] {result.get('err_msg')}")
-                    return None
-            else:
-                print(f"[HTTP错误] {response.status_code}: {response.text}")
-                return None
+    def _request_once(self, method: str, endpoint: str, data: Optional[Dict] = None,
+                      idem_key: Optional[str] = None) -> Optional[Dict]:
+        """发送请求并解析响应，返回响应中的 data，失败时返回None"""
+        result = self._request_body(method, endpoint, data, idem_key)
+        return None if result is None else result.get('data')
+
+    def _request_body(self, method: str, endpoint: str, data: Optional[Dict] = None,
+                      idem_key: Optional[str] = None, detail: str = '',
+                      unsupported: Iterable[int] = ()) -> Optional[Dict]:
+        """发送请求并统一检查响应（HTTP状态码、err_code），成功时返回完整响应体，失败时返回None
+
+        所有请求的错误处理和事件都经过这里；指标在 _send_request 中按每次尝试记录
 
+        Args:
+            detail: 附加在请求事件中的说明（如页码、字段数）
+            unsupported: 表示平台不支持该端点的状态码，命中时抛出 BatchNotSupported
+        """
+        EVENTS.emit('api.request', f"[API请求] {method} {endpoint}{detail}", 'debug',
+                    method=method, endpoint=endpoint)
+        try:
+            response, result = self._send_request(method, endpoint, data, idem_key)
         except requests.exceptions.RequestException as e:
-            print(f"[请求异常] {str(e)}")
+            EVENTS.emit('api.response', f"[请求异常] {str(e)}", 'error',
+                        method=method, endpoint=endpoint, ok=False, error=type(e).__name__)
             return None
 
+        if response.status_code in unsupported:
+            raise BatchNotSupported(response.text)
+        if response.status_code != 200:
+            EVENTS.emit('api.response', f"[HTTP错误] {response.status_code}: {response.text}", 'warning',
+                        method=method, endpoint=endpoint, ok=False, http_status=response.status_code)
+            return None
+        if result is None or result.get('err_code') != 0:
+            err_msg = result.get('err_msg') if result is not None else '响应不是有效的JSON'
+            EVENTS.emit('api.response', f"[API错误] {err_msg}", 'warning',
+                        method=method, endpoint=endpoint, ok=False, err_msg=err_msg)
+            return None
+
+        EVENTS.emit('api.response', "[API响应] 成功", 'debug', method=method, endpoint=endpoint, ok=True)
+        return result
+
     def get_work_item_types(self) -> Optional[List]:
         """获取工作项类型列表"""
         return self._request('GET', 'work_item_types')
@@ -94,158 +182,384 @@ class FeishuProjectAPI:
         """获取字段列表"""
         return self._request('GET', f'field/{work_item_type_key}')
 
-    def create_custom_field(self, work_item_type_key: str, field_config: Dict) -> Optional[Dict]:
-        """创建自定义字段"""
-        return self._request('POST', f'field/{work_item_type_key}/create', field_config)
+    def query_work_items(self, work_item_type_keys: List[str], page_num: int = 1,
+                         page_size: int = 200) -> Optional[Dict]:
+        """分页查询工作项（只读，可安全重试）
+
+        Args:
+            work_item_type_keys: 工作项类型
+            page_num: 页码，从1开始
+            page_size: 每页数量（平台上限200）
+
+        Returns:
+            {'items': 工作项列表, 'pagination': {'page_num', 'page_size', 'total'}}，失败时返回None
+        """
+        result = self._request_body('POST', 'work_item/filter', {
+            'work_item_type_keys': list(work_item_type_keys),
+            'page_num': page_num,
+            'page_size': page_size
+        }, detail=f" (第{page_num}页)")
+        if result is None:
+            return None
+        return {
+            'items': result.get('data') or [],
+            'pagination': result.get('pagination') or {'page_num': page_num, 'page_size': page_size}
+        }
+
+    def create_custom_field(self, work_item_type_key: str, field_config: Dict,
+                            idem_key: Optional[str] = None) -> Optional[Dict]:
+        """创建自定义字段（启用合并时会等待所在批次完成）"""
+        if self.field_batcher:
+            return self.field_batcher.submit(work_item_type_key, field_config, idem_key).result()
+        return self._create_field_single(work_item_type_key, field_config, idem_key)
+
+    def enable_field_batching(self, window: float = 0.05, max_batch: int = 50) -> FieldCreateBatcher:
+        """把短时间内的字段创建合并为批量创建请求"""
+        self.field_batcher = FieldCreateBatcher(self._create_fields_request, self._create_field_single,
+                                                window=window, max_batch=max_batch)
+        return self.field_batcher
+
+    def _create_field_single(self, work_item_type_key: str, field_config: Dict,
+                             idem_key: Optional[str] = None) -> Optional[Dict]:
+        return self._request('POST', f'field/{work_item_type_key}/create', field_config, idem_key)
+
+    def _create_fields_request(self, work_item_type_key: str, field_configs: List[Dict],
+                               idem_key: Optional[str] = None) -> List[Optional[Dict]]:
+        """调用批量创建端点，返回每个字段的结果（失败项为None）"""
+        endpoint = 'field/batch_create'
+        try:
+            result = self._request_body('POST', endpoint, {
+                'work_item_type': work_item_type_key,
+                'fields': field_configs
+            }, idem_key, detail=f" ({len(field_configs)} 个字段)", unsupported=(404, 405, 501))
+        except BatchNotSupported:
+            EVENTS.emit('api.batch_fallback', "[批量] 平台不支持批量创建字段，改为逐个创建", 'notice',
+                        endpoint=endpoint)
+            raise
+        finally:
+            if self.read_flight is not None:
+                self.read_flight.invalidate((self.base_url, self.project_key))
+
+        if result is None:
+            return [None] * len(field_configs)
+        items = split_batch_results(result.get('data'), len(field_configs),
+                                    lambda item: Exception(item.get('err_msg')))
+        return [None if isinstance(item, Exception) else item for item in items]
 
     def update_process_config(self, work_item_type_key: str, process_config: Dict) -> Optional[Dict]:
         """更新流程配置"""
         return self._request('PUT', f'process/{work_item_type_key}/config', process_config)
 
-    def create_process_node(self, work_item_type_key: str, node_config: Dict) -> Optional[Dict]:
+    def create_process_node(self, work_item_type_key: str, node_config: Dict,
+                            idem_key: Optional[str] = None) -> Optional[Dict]:
         """创建流程节点"""
-        return self._request('POST', f'process/{work_item_type_key}/node', node_config)
+        return self._request('POST', f'process/{work_item_type_key}/node', node_config, idem_key)
 
-    def create_transition(self, work_item_type_key: str, transition_config: Dict) -> Optional[Dict]:
+    def create_transition(self, work_item_type_key: str, transition_config: Dict,
+                          idem_key: Optional[str] = None) -> Optional[Dict]:
         """创建流程转换规则"""
-        return self._request('POST', f'process/{work_item_type_key}/transition', transition_config)
+        return self._request('POST', f'process/{work_item_type_key}/transition', transition_config, idem_key)
 
-    def configure_metrics(self, metrics_config: Dict) -> Optional[Dict]:
+    def configure_metrics(self, metrics_config: Dict, idem_key: Optional[str] = None) -> Optional[Dict]:
         """配置质量指标"""
-        return self._request('POST', 'metrics/configure', metrics_config)
+        return self._request('POST', 'metrics/configure', metrics_config, idem_key)
+
+    def create_fields_batch(self, work_item_type_key: str, fields: Iterable[Union[FieldSpec, Dict]],
+                            journal: Optional[SyncJournal] = None) -> List[Dict]:
+        """批量创建字段（启用合并时先提交全部字段，按批次发送）
+
+        Args:
+            fields: 字段规格（或字段配置字典）
+            journal: 预写日志；已完成的字段直接跳过
+        """
+        submitted = []
+        for spec in fields:
+            field = spec.to_workflow_field() if isinstance(spec, FieldSpec) else spec
+            op_id = f"field:{self.project_key}:{work_item_type_key}:{field['key']}"
+            skipped, idem_key = journal_plan(journal, op_id, 'field', field)
+            EVENTS.emit('field.submit', f"创建字段: {field['name']}" + ("（日志中已完成，跳过）" if skipped else ""),
+                        'debug', field=field['name'], key=field['key'], skipped=skipped)
+            if skipped:
+                future = None
+            elif self.field_batcher:
+                future = self.field_batcher.submit(work_item_type_key, field, idem_key)
+            else:
+                future = Future()
+                future.set_result(self._create_field_single(work_item_type_key, field, idem_key))
+                # 避免触发限流
+                time.sleep(self.request_interval)
+            submitted.append((field, op_id, future))
+
+        if self.field_batcher:
+            self.field_batcher.flush()
 
-    def create_fields_batch(self, work_item_type_key: str, fields: List[Dict]) -> List[Dict]:
-        """批量创建字段"""
         results = []
-        for field in fields:
-            print(f"创建字段: {field['name']}")
-            result = self.create_custom_field(work_item_type_key, field)
+        for field, op_id, future in submitted:
+            skipped = future is None
+            result = True if skipped else journal_record(journal, op_id, future.result())
             results.append({
                 'field': field['name'],
-                'success': result is not None
+                'success': result is not None,
+                'skipped': skipped
             })
-            # 避免触发限流
-            time.sleep(0.1)
         return results
 
 
-def configure_workflow():
-    """主配置函数"""
-    print("===== 飞书项目流程管理配置 =====\n")
+def journal_plan(journal: Optional[SyncJournal], op_id: str, kind: str, payload: Any) -> tuple:
+    """在预写日志中登记写操作
+
+    Returns:
+        (是否因日志中已完成而跳过, 幂等键)
+    """
+    if journal is None:
+        return False, None
+    digest = payload_digest(payload)
+    if journal.is_done(op_id, digest):
+        return True, None
+    return False, journal.plan(op_id, kind, digest)
+
+
+def journal_record(journal: Optional[SyncJournal], op_id: str, result: Any) -> Any:
+    """记录写操作的结果（None 表示失败），原样返回结果"""
+    if journal is not None:
+        if result is None:
+            journal.fail(op_id, 'request failed')
+        else:
+            journal.complete(op_id, result)
+    return result
+
+
+def journaled_call(journal: Optional[SyncJournal], op_id: str, kind: str, payload: Any,
+                   send) -> tuple:
+    """在预写日志保护下执行一个写操作
+
+    Args:
+        journal: 预写日志（为空时直接执行）
+        op_id: 操作标识
+        kind: 操作类型
+        payload: 请求体（用于判断配置是否变化）
+        send: 接收幂等键并发送请求的函数，失败时返回 None
+
+    Returns:
+        (结果, 是否因日志中已完成而跳过)
+    """
+    skipped, idem_key = journal_plan(journal, op_id, kind, payload)
+    if skipped:
+        return True, True
+    return journal_record(journal, op_id, send(idem_key)), False
+
+
+@traced('configure_workflow')
+def configure_workflow(config_file: str = 'workflow-config.json',
+                       auth_file: str = 'auth-config.json',
+                       report_file: str = 'configuration-report.json',
+                       api: Optional[FeishuProjectAPI] = None,
+                       metrics_file: Optional[str] = None,
+                       journal: Optional[SyncJournal] = None):
+    """主配置函数
+
+    Args:
+        config_file: 流程配置文件路径
+        auth_file: 认证配置文件路径
+        report_file: 配置报告输出路径
+        api: 预先构建的API客户端（为空时根据认证配置创建）
+        metrics_file: API请求指标输出路径（.prom/.txt 为Prometheus格式，其余为JSON）
+        journal: 已调用 begin_run() 的预写日志；中断后重跑时跳过已完成的操作
+    """
+    EVENTS.emit('step', "===== 飞书项目流程管理配置 =====\n", 'notice', bold=True)
 
     # 读取配置文件
     try:
-        with open('workflow-config.json', 'r', encoding='utf-8') as f:
+        with open(config_file, 'r', encoding='utf-8') as f:
             workflow_config = json.load(f)
     except FileNotFoundError:
-        print("错误: 找不到 workflow-config.json 文件")
+        EVENTS.emit('error', f"错误: 找不到 {config_file} 文件", 'error')
         return
 
     # 读取认证配置
     try:
-        with open('auth-config.json', 'r', encoding='utf-8') as f:
+        with open(auth_file, 'r', encoding='utf-8') as f:
             auth_config = json.load(f)
     except FileNotFoundError:
-        print("错误: 请先创建 auth-config.json 文件配置认证信息")
-        print("可以复制 auth-config-template.json 并填入您的认证信息")
+        EVENTS.emit('error', f"错误: 请先创建 {auth_file} 文件配置认证信息\n"
+                    "可以复制 auth-config-template.json 并填入您的认证信息", 'error')
         return
 
     # 初始化API客户端
-    api = FeishuProjectAPI(auth_config)
-
-    print("1. 获取现有工作项类型...")
-    work_item_types = api.get_work_item_types()
-    if work_item_types:
-        print(f"工作项类型: {json.dumps(work_item_types, ensure_ascii=False, indent=2)}")
-
-    print("\n2. 获取需求工作项的流程模板...")
-    templates = api.get_template_list('requirement')
-    if templates:
-        print(f"流程模板: {json.dumps(templates, ensure_ascii=False, indent=2)}")
-
-    print("\n3. 创建流程管理字段...")
-    all_fields = []
-
-    # 收集所有节点的字段
-    for node in workflow_config['processManagement']['nodes']:
-        for field in node['fields']:
-            # 避免重复
-            if not any(f['key'] == field['key'] for f in all_fields):
-                all_fields.append({
-                    'key': field['key'],
-                    'name': field['name'],
-                    'type': field['type'],
-                    'required': field.get('required', False),
-                    'description': field.get('description', ''),
-                    'options': field.get('options'),
-                    'default': field.get('default')
-                })
-
-    print(f"准备创建 {len(all_fields)} 个字段")
-    field_results = api.create_fields_batch('requirement', all_fields)
-
-    print("\n字段创建结果:")
-    for result in field_results:
-        status = "✅ 成功" if result['success'] else "❌ 失败"
-        print(f"  - {result['field']}: {status}")
-
-    print("\n4. 创建流程节点...")
-    for node in workflow_config['processManagement']['nodes']:
-        print(f"创建节点: {node['name']}")
-        node_result = api.create_process_node('requirement', {
-            'id': node['id'],
-            'name': node['name'],
-            'type': node['type'],
-            'fields': [f['key'] for f in node['fields']]
-        })
-
-        if node_result:
-            print(f"  ✅ {node['name']} 创建成功")
-        else:
-            print(f"  ❌ {node['name']} 创建失败")
-
-        time.sleep(0.1)
+    if api is None:
+        api = FeishuProjectAPI(auth_config)
+
+    project_key = auth_config['projectKey']
+    if journal and journal.resumed:
+        EVENTS.emit('resume', f"↻ 从断点恢复：跳过已完成的 {journal.summary().get('done', 0)} 个操作\n",
+                    'notice', done=journal.summary().get('done', 0))
+
+    def remember(name, loader):
+        return journal.remember(name, loader) if journal else loader()
+
+    with TRACER.span('step1_work_item_types'):
+        EVENTS.emit('step', "1. 获取现有工作项类型...", 'notice', step=1)
+        work_item_types = remember('work_item_types', api.get_work_item_types)
+        if work_item_types:
+            EVENTS.emit('work_item_types', f"工作项类型: {json.dumps(work_item_types, ensure_ascii=False, indent=2)}",
+                        data=work_item_types)
+
+    with TRACER.span('step2_template_list'):
+        EVENTS.emit('step', "\n2. 获取需求工作项的流程模板...", 'notice', step=2)
+        templates = remember('template_list:requirement', lambda: api.get_template_list('requirement'))
+        if templates:
+            EVENTS.emit('templates', f"流程模板: {json.dumps(templates, ensure_ascii=False, indent=2)}",
+                        data=templates)
+
+    with TRACER.span('step3_create_fields'):
+        EVENTS.emit('step', "\n3. 创建流程管理字段...", 'notice', step=3)
+        node_fields = list(workflow_node_fields(workflow_config['processManagement']['nodes']))
+        node_specs = [node for node, _ in node_fields]
+
+        # 按key合并所有节点的字段，同一key定义不一致时报告冲突（保留首次定义）
+        all_fields, field_conflicts = merge_field_specs(node_fields)
+        if field_conflicts:
+            EVENTS.emit('field.conflicts', f"⚠️  {len(field_conflicts)} 处字段定义冲突（保留首次出现的定义）:",
+                        'warning', count=len(field_conflicts))
+            for conflict in field_conflicts:
+                details = ', '.join(f"{name}: {conflict['first'][name]!r} ≠ {conflict['other'][name]!r}"
+                                    for name in conflict['attributes'])
+                EVENTS.emit('field.conflict', f"  - {conflict['key']}（{conflict['first_node']} / {conflict['node']}）{details}",
+                            'warning', key=conflict['key'])
+
+        EVENTS.emit('field.plan', f"准备创建 {len(all_fields)} 个字段", total=len(all_fields))
+        field_results = api.create_fields_batch('requirement', all_fields, journal=journal)
+
+        EVENTS.emit('step', "\n字段创建结果:")
+        for result in field_results:
+            status = 'skip' if result['skipped'] else ('ok' if result['success'] else 'fail')
+            EVENTS.emit('field', f"  - {result['field']}: " + ("✅ 成功" if result['success'] else "❌ 失败"),
+                        field=result['field'], status=status)
+
+    with TRACER.span('step4_create_nodes'):
+        EVENTS.emit('step', "\n4. 创建流程节点...", 'notice', step=4)
+        for node in node_specs:
+            EVENTS.emit('node.submit', f"创建节点: {node.name}", node=node.key)
+            node_config = node.to_workflow_node()
+            node_result, skipped = journaled_call(
+                journal, f"node:{project_key}:requirement:{node.key}", 'node', node_config,
+                lambda idem_key: api.create_process_node('requirement', node_config, idem_key)
+            )
 
-    print("\n5. 创建流程转换规则...")
-    for transition in workflow_config['processManagement']['transitions']:
-        print(f"创建转换: {transition['name']}")
-        transition_result = api.create_transition('requirement', transition)
+            if skipped:
+                EVENTS.emit('node', f"  ↻ {node.name} 日志中已完成，跳过", node=node.key, status='skip')
+                continue
+            if node_result:
+                EVENTS.emit('node', f"  ✅ {node.name} 创建成功", node=node.key, status='ok')
+            else:
+                EVENTS.emit('node', f"  ❌ {node.name} 创建失败", node=node.key, status='fail')
+
+            time.sleep(api.request_interval)
+
+    with TRACER.span('step5_create_transitions'):
+        EVENTS.emit('step', "\n5. 创建流程转换规则...", 'notice', step=5)
+        for transition in workflow_config['processManagement']['transitions']:
+            EVENTS.emit('transition.submit', f"创建转换: {transition['name']}", transition=transition['name'])
+            op_id = f"transition:{project_key}:requirement:{transition['from']}->{transition['to']}:{transition['name']}"
+            transition_result, skipped = journaled_call(
+                journal, op_id, 'transition', transition,
+                lambda idem_key: api.create_transition('requirement', transition, idem_key)
+            )
 
-        if transition_result:
-            print(f"  ✅ {transition['name']} 创建成功")
+            if skipped:
+                EVENTS.emit('transition', f"  ↻ {transition['name']} 日志中已完成，跳过",
+                            transition=transition['name'], status='skip')
+                continue
+            if transition_result:
+                EVENTS.emit('transition', f"  ✅ {transition['name']} 创建成功",
+                            transition=transition['name'], status='ok')
+            else:
+                EVENTS.emit('transition', f"  ❌ {transition['name']} 创建失败",
+                            transition=transition['name'], status='fail')
+
+            time.sleep(api.request_interval)
+
+    with TRACER.span('step6_configure_metrics'):
+        EVENTS.emit('step', "\n6. 配置质量指标...", 'notice', step=6)
+        metrics_result, skipped = journaled_call(
+            journal, f"metrics:{project_key}", 'metrics', workflow_config['qualityMetrics'],
+            lambda idem_key: api.configure_metrics(workflow_config['qualityMetrics'], idem_key)
+        )
+        if skipped:
+            EVENTS.emit('metrics', "↻ 质量指标日志中已完成，跳过", status='skip')
+        elif metrics_result:
+            EVENTS.emit('metrics', "✅ 质量指标配置成功", status='ok')
         else:
-            print(f"  ❌ {transition['name']} 创建失败")
-
-        time.sleep(0.1)
+            EVENTS.emit('metrics', "❌ 质量指标配置失败", status='fail')
 
-    print("\n6. 配置质量指标...")
-    metrics_result = api.configure_metrics(workflow_config['qualityMetrics'])
-    if metrics_result:
-        print("✅ 质量指标配置成功")
-    else:
-        print("❌ 质量指标配置失败")
-
-    print("\n===== 配置完成 =====")
+    EVENTS.emit('step', "\n===== 配置完成 =====", 'notice', bold=True)
+    if journal:
+        journal.finish_run()
 
     # 生成配置报告
     report = {
         'timestamp': datetime.now().isoformat(),
-        'project': auth_config['projectKey'],
+        'project': project_key,
         'fields': {
             'total': len(all_fields),
             'created': sum(1 for r in field_results if r['success']),
-            'failed': sum(1 for r in field_results if not r['success'])
+            'failed': sum(1 for r in field_results if not r['success']),
+            'by_type': dict(Counter(f.type for f in all_fields)),
+            'conflicts': field_conflicts
         },
-        'nodes': len(workflow_config['processManagement']['nodes']),
+        'nodes': len(node_specs),
         'transitions': len(workflow_config['processManagement']['transitions']),
         'metrics': len(workflow_config['qualityMetrics'])
     }
 
-    with open('configuration-report.json', 'w', encoding='utf-8') as f:
+    with open(report_file, 'w', encoding='utf-8') as f:
         json.dump(report, f, ensure_ascii=False, indent=2)
 
-    print("\n配置报告已保存到 configuration-report.json")
+    EVENTS.emit('report', f"\n配置报告已保存到 {report_file}", path=report_file)
+
+    if metrics_file:
+        api.metrics.dump(metrics_file)
+        EVENTS.emit('report', f"API请求指标已保存到 {metrics_file}", path=metrics_file)
+
+    return report
 
 
 if __name__ == '__main__':
-    configure_workflow()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='飞书项目流程管理配置')
+    parser.add_argument('--metrics-out', metavar='PATH', help='导出API请求指标（JSON或Prometheus文本）')
+    parser.add_argument('--trace-out', metavar='PATH', help='导出各步骤耗时追踪（Chrome Trace Event JSON）')
+    parser.add_argument('--journal', metavar='PATH', help='预写日志路径；中断后重跑时从断点恢复')
+    parser.add_argument('--restart', action='store_true', help='忽略日志中未完成的运行，从头开始')
+    parser.add_argument('--batch-window', metavar='MS', type=float, default=0,
+                        help='把该时间窗口（毫秒）内的字段创建合并为批量请求（默认 0 不合并）')
+    parser.add_argument('--output', choices=OUTPUT_CHOICES, default='pretty',
+                        help='输出格式：pretty 终端渲染 + 实时进度，json 每个事件一行 JSON，silent 不输出')
+    args = parser.parse_args()
+
+    EVENTS.configure(make_emitter(args.output))
+
+    if args.metrics_out:
+        METRICS.install_signal_dump(args.metrics_out)
+    if args.trace_out:
+        TRACER.configure(args.trace_out)
+    run_journal = None
+    if args.journal:
+        run_journal = SyncJournal(args.journal)
+        run_journal.begin_run(restart=args.restart)
+    workflow_api = None
+    if args.batch_window > 0:
+        try:
+            with open('auth-config.json', 'r', encoding='utf-8') as f:
+                workflow_api = FeishuProjectAPI(json.load(f))
+            workflow_api.enable_field_batching(window=args.batch_window / 1000)
+        except FileNotFoundError:
+            pass
+    try:
+        configure_workflow(api=workflow_api, metrics_file=args.metrics_out, journal=run_journal)
+    finally:
+        if run_journal:
+            run_journal.close()
+        if args.trace_out:
+            TRACER.export()
+            EVENTS.emit('report', f"步骤耗时追踪已保存到 {args.trace_out}", path=args.trace_out)
+        EVENTS.close()
\ No newline at end of file
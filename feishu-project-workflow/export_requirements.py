@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+需求批量导出
+分页并发拉取空间内的工作项（含流程配置与 quality-metrics.yaml 中的字段），按工作项类型分片流式写入本地
+CSV / NDJSON / Parquet 文件，离线分析时不必重复调用API。
+
+- 并发：有界的页窗口，同时在途的页数不超过 并发数 × 2，内存占用与数据量无关
+- 流式：页按顺序写出，CSV/NDJSON 每页一次写入，Parquet 每 N 行写出一个分卷
+- 断点续跑：每个类型一个游标文件，记录已持久化的页数和文件偏移；重跑时从游标继续
+
+    exports/requirement.csv                 # CSV / NDJSON：每个类型一个文件
+    exports/requirement.cursor.json         # 游标
+    exports/story/part-00001.parquet        # Parquet：每个类型一个目录
+
+用法:
+    python export_requirements.py
+    python export_requirements.py --types requirement,story --format parquet --concurrency 8
+    python export_requirements.py --format ndjson --restart
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from api_client import FeishuProjectAPI
+from shared import (EVENTS, OUTPUT_CHOICES, QUALITY_METRICS_FILE, load_layered_config, make_emitter,
+                    merge_field_specs, quality_field_specs, workflow_node_fields)
+
+# 每个工作项固定导出的列
+BASE_COLUMNS = (('id', 'number'), ('name', 'text'), ('work_item_type_key', 'text'),
+                ('created_at', 'datetime'), ('updated_at', 'datetime'))
+
+# 平台分页上限
+MAX_PAGE_SIZE = 200
+
+# 游标文件最短写入间隔（秒）；游标落后时续跑会截断并重新拉取少量页，结果不变
+CURSOR_INTERVAL = 1.0
+
+FORMATS = ('csv', 'ndjson', 'parquet')
+
+
+class ExportError(Exception):
+    """导出失败（已写出的部分保留在游标中，重跑时继续）"""
+
+
+def export_columns(config_file: str = 'workflow-config.json',
+                   metrics_file: Optional[str] = QUALITY_METRICS_FILE) -> List[Tuple[str, str]]:
+    """导出列：固定列 + 流程配置中各节点字段 + 质量指标字段（按key去重，保留首次定义）
+
+    两份配置的字段key不同（如流程配置的 created_time / deployment_time，
+    质量指标的 requirement_created_at / deployed_at），都要导出，离线指标计算按质量指标的key读取
+
+    Args:
+        metrics_file: quality-metrics.yaml 路径；为 None 或使用默认路径但文件不存在时只导出流程字段
+
+    Returns:
+        [(列名, 字段类型)]
+    """
+    with open(config_file, 'r', encoding='utf-8') as f:
+        workflow_config = json.load(f)
+    fields, _ = merge_field_specs(workflow_node_fields(workflow_config['processManagement']['nodes']))
+    if metrics_file and (metrics_file != QUALITY_METRICS_FILE or os.path.exists(metrics_file)):
+        fields += quality_field_specs(load_layered_config(metrics_file))
+
+    columns, seen = list(BASE_COLUMNS), {name for name, _ in BASE_COLUMNS}
+    for field in fields:
+        if field.key not in seen:
+            seen.add(field.key)
+            columns.append((field.key, field.type))
+    return columns
+
+
+def _field_value(value: Any) -> Any:
+    """字段取值：选项取 label，多选取 label 列表"""
+    if isinstance(value, dict) and 'label' in value:
+        return value['label']
+    if isinstance(value, list):
+        return [_field_value(v) for v in value]
+    return value
+
+
+def row_flattener(columns: List[Tuple[str, str]]) -> Callable[[Dict], List[Any]]:
+    """返回把工作项展开为一行的函数：按列顺序的取值列表（固定列 + 字段列，缺失为 None）"""
+    base_names = {name for name, _ in BASE_COLUMNS}
+    width = len(columns)
+    base_positions = [(i, name) for i, (name, _) in enumerate(columns) if name in base_names]
+    field_positions = {name: i for i, (name, _) in enumerate(columns) if name not in base_names}
+
+    def flatten(item: Dict) -> List[Any]:
+        row = [None] * width
+        for i, name in base_positions:
+            row[i] = item.get(name)
+        for field in item.get('fields') or ():
+            i = field_positions.get(field.get('field_key'))
+            if i is not None:
+                value = field.get('field_value')
+                row[i] = _field_value(value) if isinstance(value, (dict, list)) else value
+        return row
+
+    return flatten
+
+
+def _write_json(path: str, data: Dict):
+    """原子写入 JSON 文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.cursor-', suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------------------------------------
+# 分片写入
+# ----------------------------------------------------------------------
+
+class _FileShardWriter(ABC):
+    """单文件分片（CSV / NDJSON）：每页编码后一次写入，写入后即持久化
+
+    Args:
+        path: 输出文件
+        columns: 导出列
+        position: 游标中记录的写入位置（续跑时截断到该偏移后追加）
+    """
+
+    def __init__(self, path: str, columns: List[Tuple[str, str]], position: Optional[Dict] = None):
+        self.path = path
+        self.columns = [name for name, _ in columns]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if position and os.path.exists(path):
+            # 游标之后的内容（上次中断时未确认的页）丢弃
+            self._fp = open(path, 'r+b')
+            self._fp.truncate(position['offset'])
+            self._fp.seek(position['offset'])
+        else:
+            self._fp = open(path, 'wb')
+            self._fp.write(self._header())
+
+    def _header(self) -> bytes:
+        return b''
+
+    @abstractmethod
+    def _encode(self, rows: List[List]) -> bytes:
+        """把一页行数据编码为要追加的字节"""
+
+    def write(self, rows: List[List]) -> bool:
+        """写入一页，返回此时已写入的内容是否全部持久化"""
+        if rows:
+            self._fp.write(self._encode(rows))
+        return True
+
+    def position(self) -> Dict:
+        self._fp.flush()
+        return {'offset': self._fp.tell()}
+
+    def close(self) -> Dict:
+        position = self.position()
+        self._fp.close()
+        return position
+
+
+class CSVShardWriter(_FileShardWriter):
+    """CSV（UTF-8 BOM，Excel 可直接打开）；列表/字典取值序列化为 JSON"""
+
+    def _header(self) -> bytes:
+        return '\ufeff'.encode('utf-8') + self._encode_rows([self.columns])
+
+    @staticmethod
+    def _encode_rows(rows: Iterable[List]) -> bytes:
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator='\n').writerows(rows)
+        return buf.getvalue().encode('utf-8')
+
+    def _encode(self, rows: List[List]) -> bytes:
+        return self._encode_rows(
+            [json.dumps(v, ensure_ascii=False) if v.__class__ in (list, dict) else v for v in row]
+            for row in rows
+        )
+
+
+class NDJSONShardWriter(_FileShardWriter):
+    """NDJSON：每行一个工作项"""
+
+    def _encode(self, rows: List[List]) -> bytes:
+        names = self.columns
+        return ''.join(json.dumps(dict(zip(names, row)), ensure_ascii=False, separators=(',', ':')) + '\n'
+                       for row in rows).encode('utf-8')
+
+
+class ParquetShardWriter:
+    """Parquet 分卷目录：缓冲到 rows_per_part 行后写出一个分卷（原子替换），分卷写出后才持久化
+
+    字段类型映射：number → float64，datetime/id → int64，其余 → string（列表/字典序列化为 JSON）
+    """
+
+    def __init__(self, path: str, columns: List[Tuple[str, str]], position: Optional[Dict] = None,
+                 rows_per_part: int = 50_000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ExportError("导出 Parquet 需要安装 pyarrow: pip install pyarrow")
+        self._pa, self._pq = pa, pq
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self.columns = columns
+        self.schema = pa.schema([(name, self._arrow_type(name, field_type)) for name, field_type in columns])
+        self._converters = [(i, f.name, self._converter(f.type)) for i, f in enumerate(self.schema)]
+        self.parts = position['parts'] if position else 0
+        self._buffer: Dict[str, List] = {name: [] for name, _ in columns}
+        self._buffered = 0
+
+        os.makedirs(path, exist_ok=True)
+        # 清理游标之后的分卷（上次中断时写出但未确认的）
+        for name in os.listdir(path):
+            if name.startswith('part-') and name.endswith('.parquet') and int(name[5:10]) > self.parts:
+                os.remove(os.path.join(path, name))
+
+    def _arrow_type(self, name: str, field_type: str):
+        pa = self._pa
+        if name in ('id', 'created_at', 'updated_at') or field_type == 'datetime':
+            return pa.int64()
+        if field_type == 'number':
+            return pa.float64()
+        return pa.string()
+
+    def _converter(self, arrow_type):
+        """按列类型转换取值（无法转换的数值记为空）"""
+        pa = self._pa
+        if arrow_type == pa.string():
+            return lambda v: json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else str(v)
+        cast = int if arrow_type == pa.int64() else float
+
+        def convert(value):
+            try:
+                return cast(value)
+            except (TypeError, ValueError):
+                return None
+        return convert
+
+    def write(self, rows: List[List]) -> bool:
+        for i, name, convert in self._converters:
+            column = self._buffer[name]
+            for row in rows:
+                value = row[i]
+                column.append(None if value is None or value == '' else convert(value))
+        self._buffered += len(rows)
+        if self._buffered >= self.rows_per_part:
+            self._flush_part()
+        return self._buffered == 0
+
+    def _flush_part(self):
+        if not self._buffered:
+            return
+        table = self._pa.table(self._buffer, schema=self.schema)
+        number = self.parts + 1
+        part_path = os.path.join(self.path, f'part-{number:05d}.parquet')
+        tmp_path = part_path + '.tmp'
+        self._pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, part_path)
+        self.parts = number
+        self._buffer = {name: [] for name, _ in self.columns}
+        self._buffered = 0
+
+    def position(self) -> Dict:
+        return {'parts': self.parts}
+
+    def close(self) -> Dict:
+        self._flush_part()
+        return self.position()
+
+
+WRITERS = {'csv': CSVShardWriter, 'ndjson': NDJSONShardWriter, 'parquet': ParquetShardWriter}
+
+
+# ----------------------------------------------------------------------
+# 导出
+# ----------------------------------------------------------------------
+
+class RequirementExporter:
+    """分页并发导出工作项
+
+    Args:
+        api: API客户端（会话在多个线程间共享）
+        out_dir: 输出目录
+        fmt: csv / ndjson / parquet
+        columns: 导出列，见 export_columns()
+        page_size: 每页数量（不超过200）
+        concurrency: 同时在途的分页请求数
+    """
+
+    def __init__(self, api: FeishuProjectAPI, out_dir: str = 'exports', fmt: str = 'csv',
+                 columns: Optional[List[Tuple[str, str]]] = None, page_size: int = MAX_PAGE_SIZE,
+                 concurrency: int = 4):
+        if fmt not in WRITERS:
+            raise ValueError(f"不支持的导出格式: {fmt}")
+        self.api = api
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.columns = list(columns or BASE_COLUMNS)
+        self.page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        self.concurrency = max(1, concurrency)
+
+    def output_path(self, work_item_type: str) -> str:
+        if self.fmt == 'parquet':
+            return os.path.join(self.out_dir, work_item_type)
+        return os.path.join(self.out_dir, f'{work_item_type}.{self.fmt}')
+
+    def cursor_path(self, work_item_type: str) -> str:
+        return os.path.join(self.out_dir, f'{work_item_type}.cursor.json')
+
+    def _load_cursor(self, work_item_type: str, restart: bool) -> Optional[Dict]:
+        """读取可续跑的游标；导出参数变化时拒绝续跑"""
+        path = self.cursor_path(work_item_type)
+        if restart or not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            cursor = json.load(f)
+        expected = {'format': self.fmt, 'page_size': self.page_size,
+                    'columns': [name for name, _ in self.columns]}
+        changed = [key for key, value in expected.items() if cursor.get(key) != value]
+        if changed:
+            raise ExportError(f"{work_item_type} 的导出参数与游标不一致（{', '.join(changed)}），"
+                              f"请使用 --restart 重新导出")
+        return cursor
+
+    def _fetch(self, work_item_type: str, page_num: int) -> Dict:
+        page = self.api.query_work_items([work_item_type], page_num, self.page_size)
+        if page is None:
+            raise ExportError(f"{work_item_type} 第{page_num}页获取失败")
+        return page
+
+    def export_type(self, work_item_type: str, restart: bool = False) -> Dict:
+        """导出一个工作项类型（一个分片），返回导出摘要"""
+        cursor = self._load_cursor(work_item_type, restart)
+        if cursor and cursor.get('complete'):
+            EVENTS.emit('export.shard', f"↻ {work_item_type} 已导出完成（{cursor['rows']} 条），跳过",
+                        work_item_type=work_item_type, status='skip', rows=cursor['rows'])
+            return cursor
+
+        state = cursor or {
+            'work_item_type': work_item_type,
+            'format': self.fmt,
+            'page_size': self.page_size,
+            'columns': [name for name, _ in self.columns],
+            'pages_done': 0,
+            'rows': 0,
+            'total': None,
+            'writer': None,
+            'complete': False,
+        }
+        if cursor:
+            EVENTS.emit('export.resume', f"↻ {work_item_type} 从第{state['pages_done'] + 1}页继续"
+                        f"（已导出 {state['rows']} 条）", 'notice',
+                        work_item_type=work_item_type, pages_done=state['pages_done'])
+
+        writer = WRITERS[self.fmt](self.output_path(work_item_type), self.columns, state['writer'])
+        cursor_path = self.cursor_path(work_item_type)
+        started = time.perf_counter()
+        flatten = row_flattener(self.columns)
+        # 已写入但尚未持久化的页数和行数（Parquet 分卷写出前）
+        unconfirmed_pages = unconfirmed_rows = 0
+        cursor_written = 0.0
+
+        def commit(page_rows: int, durable: bool):
+            nonlocal unconfirmed_pages, unconfirmed_rows, cursor_written
+            unconfirmed_pages += 1
+            unconfirmed_rows += page_rows
+            if durable:
+                state['pages_done'] += unconfirmed_pages
+                state['rows'] += unconfirmed_rows
+                unconfirmed_pages = unconfirmed_rows = 0
+                now = time.monotonic()
+                if now - cursor_written >= CURSOR_INTERVAL:
+                    state['writer'] = writer.position()
+                    _write_json(cursor_path, state)
+                    cursor_written = now
+
+        pending = {}
+        completed = False
+        with ThreadPoolExecutor(max_workers=self.concurrency,
+                                thread_name_prefix=f'export-{work_item_type}') as pool:
+            try:
+                # 先取第一页得到总数，再按页窗口并发拉取其余页
+                first_page = state['pages_done'] + 1
+                page = self._fetch(work_item_type, first_page)
+                state['total'] = page['pagination'].get('total', state['total'])
+                last_page = max(first_page, math.ceil((state['total'] or 0) / self.page_size))
+                next_write = first_page
+                window = self.concurrency * 2
+
+                while True:
+                    items = page['items']
+                    commit(len(items), writer.write([flatten(item) for item in items]))
+                    EVENTS.emit('export.page', '', 'debug', work_item_type=work_item_type,
+                                page=next_write, rows=len(items))
+                    # 最后一页是满的：导出期间有新增，继续向后取
+                    if next_write == last_page and len(items) == self.page_size:
+                        last_page += 1
+                    next_write += 1
+                    if next_write > last_page:
+                        break
+
+                    next_submit = next_write + len(pending)
+                    while next_submit <= last_page and next_submit < next_write + window:
+                        pending[next_submit] = pool.submit(self._fetch, work_item_type, next_submit)
+                        next_submit += 1
+                    page = pending.pop(next_write).result()
+                completed = True
+            finally:
+                # 出错时取消尚未开始的页，已写入的内容全部落盘并记入游标
+                for future in pending.values():
+                    future.cancel()
+                state['writer'] = writer.close()
+                state['pages_done'] += unconfirmed_pages
+                state['rows'] += unconfirmed_rows
+                state['complete'] = completed
+                _write_json(cursor_path, state)
+
+        elapsed = time.perf_counter() - started
+        EVENTS.emit('export.shard', f"✅ {work_item_type}: 导出 {state['rows']} 条 → "
+                    f"{self.output_path(work_item_type)}（{elapsed:.1f} 秒）",
+                    work_item_type=work_item_type, status='ok', rows=state['rows'],
+                    seconds=round(elapsed, 3))
+        return state
+
+    def export(self, work_item_types: Iterable[str], restart: bool = False) -> Dict[str, Dict]:
+        """依次导出各类型（每个类型一个分片，可分别在不同进程中运行）"""
+        return {work_item_type: self.export_type(work_item_type, restart)
+                for work_item_type in work_item_types}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='飞书项目需求批量导出')
+    parser.add_argument('--types', default='requirement',
+                        help='工作项类型，逗号分隔；每个类型导出为一个分片（默认 requirement）')
+    parser.add_argument('--format', choices=FORMATS, default='csv', help='导出格式（parquet 需要 pyarrow）')
+    parser.add_argument('--out-dir', default='exports', help='输出目录')
+    parser.add_argument('--concurrency', type=int, default=4, help='同时在途的分页请求数')
+    parser.add_argument('--page-size', type=int, default=MAX_PAGE_SIZE, help='每页数量（最大200）')
+    parser.add_argument('--config', default='workflow-config.json', help='流程配置（决定导出的字段列）')
+    parser.add_argument('--metrics-config', default=QUALITY_METRICS_FILE,
+                        help='质量指标配置（其中的字段同样导出；默认 ../meego-quality-automation/quality-metrics.yaml）')
+    parser.add_argument('--auth', default='auth-config.json', help='认证配置')
+    parser.add_argument('--restart', action='store_true', help='忽略游标，重新导出')
+    parser.add_argument('--output', choices=OUTPUT_CHOICES, default='pretty',
+                        help='输出格式：pretty 终端渲染 + 实时进度，json 每个事件一行 JSON，silent 不输出')
+    args = parser.parse_args(argv)
+
+    EVENTS.configure(make_emitter(args.output))
+    try:
+        with open(args.auth, 'r', encoding='utf-8') as f:
+            api = FeishuProjectAPI(json.load(f))
+    except FileNotFoundError:
+        print(f"错误: 请先创建 {args.auth} 文件配置认证信息")
+        return 1
+
+    exporter = RequirementExporter(api, args.out_dir, args.format, export_columns(args.config, args.metrics_config),
+                                   args.page_size, args.concurrency)
+    try:
+        exporter.export([t.strip() for t in args.types.split(',') if t.strip()], restart=args.restart)
+    except ExportError as e:
+        EVENTS.emit('export.error', f"❌ {e}（重新运行将从游标继续）", 'error', error=str(e))
+        return 1
+    finally:
+        EVENTS.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公共模块入口
+本目录的脚本复用 meego-quality-automation 中的模块（事件总线、请求指标、重试、规格模型等）。
+那些模块之间按平铺模块名互相导入，需要其目录在 sys.path 中；路径只在这里设置一次，
+其他脚本一律 `from shared import ...`，不依赖导入顺序。
+"""
+
+import sys
+from pathlib import Path
+
+SHARED_DIR = Path(__file__).resolve().parent.parent / 'meego-quality-automation'
+
+# 质量指标配置（export_requirements 按其中的字段导出列）
+QUALITY_METRICS_FILE = str(SHARED_DIR / 'quality-metrics.yaml')
+
+if str(SHARED_DIR) not in sys.path:
+    sys.path.insert(0, str(SHARED_DIR))
+
+from config_layers import load_layered_config  # noqa: E402
+from event_bus import EVENTS, OUTPUT_CHOICES, make_emitter  # noqa: E402
+from field_batcher import BatchNotSupported, FieldCreateBatcher, split_batch_results  # noqa: E402
+from request_metrics import METRICS, RequestMetrics, parse_response  # noqa: E402
+from retry_policy import NO_RETRY, RetryPolicy, call_with_retry, is_retry_safe  # noqa: E402
+from single_flight import READ_FLIGHT, SingleFlight  # noqa: E402
+from specs import FieldSpec, merge_field_specs, quality_field_specs, workflow_node_fields  # noqa: E402
+from sync_journal import SyncJournal, payload_digest  # noqa: E402
+from tracing import TRACER, traced  # noqa: E402
+
+__all__ = [
+    'SHARED_DIR', 'QUALITY_METRICS_FILE',
+    'load_layered_config',
+    'EVENTS', 'OUTPUT_CHOICES', 'make_emitter',
+    'BatchNotSupported', 'FieldCreateBatcher', 'split_batch_results',
+    'METRICS', 'RequestMetrics', 'parse_response',
+    'NO_RETRY', 'RetryPolicy', 'call_with_retry', 'is_retry_safe',
+    'READ_FLIGHT', 'SingleFlight',
+    'FieldSpec', 'merge_field_specs', 'quality_field_specs', 'workflow_node_fields',
+    'SyncJournal', 'payload_digest',
+    'TRACER', 'traced',
+]
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+同步吞吐量基准测试
+在进程内模拟后端上运行 sync_all / configure_workflow，按字段数、节点数、并发度、
+注入延迟和限流进行扫描，并输出可跨提交对比的 JSON 结果
+
+用法:
+    python benchmark_sync.py --fields 10,100,1000 --concurrency 1,4 --latency-ms 0,20
+    python benchmark_sync.py --output bench.json --baseline bench-prev.json
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+from event_bus import EVENTS, SilentEmitter
+from fake_meego import FakeMeegoBackend
+from queue_logging import setup_logging
+from single_flight import READ_FLIGHT
+from sync_config import FeishuProjectClient, QualityMetricsConfigurator
+
+WORKFLOW_DIR = Path(__file__).resolve().parent.parent / 'feishu-project-workflow'
+if str(WORKFLOW_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKFLOW_DIR))
+
+from api_client import FeishuProjectAPI, configure_workflow  # noqa: E402
+
+ENTRY_POINTS = ('sync_all', 'configure_workflow')
+FIELD_TYPES = ('text', 'number', 'datetime', 'select')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+# ----------------------------------------------------------------------
+# 生成测试配置
+# ----------------------------------------------------------------------
+
+def _make_field(index: int) -> Dict:
+    field_type = FIELD_TYPES[index % len(FIELD_TYPES)]
+    field = {'key': f'bench_field_{index}', 'name': f'基准字段{index}', 'type': field_type}
+    if field_type == 'select':
+        field['options'] = ['高', '中', '低']
+    return field
+
+
+def build_quality_config(project_key: str, n_fields: int, n_nodes: int) -> Dict:
+    """生成 quality-metrics.yaml 结构的配置，字段平均分布在5个指标上"""
+    metrics = [{'key': f'bench_metric_{m}', 'name': f'基准指标{m}', 'fields': []} for m in range(5)]
+    for i in range(n_fields):
+        metrics[i % 5]['fields'].append(_make_field(i))
+
+    return {
+        'project': {'key': project_key, 'name': '基准测试空间'},
+        'work_item_type': 'requirement',
+        'quality_metrics': metrics,
+        'workflow_nodes': [
+            {'key': f'bench_node_{n}', 'name': f'基准节点{n}', 'type': 'process',
+             'required_fields': [f'bench_field_{n}'] if n < n_fields else []}
+            for n in range(n_nodes)
+        ],
+        'automation_rules': [],
+    }
+
+
+def build_workflow_config(n_fields: int, n_nodes: int) -> Dict:
+    """生成 workflow-config.json 结构的配置，字段按节点轮转分配（含跨节点重复字段）"""
+    nodes = [{'id': f'bench_node_{n}', 'name': f'基准节点{n}', 'type': 'process', 'fields': []}
+             for n in range(max(1, n_nodes))]
+    for i in range(n_fields):
+        nodes[i % len(nodes)]['fields'].append(_make_field(i))
+    # 每个节点额外引用一个公共字段，覆盖去重路径
+    for node in nodes:
+        node['fields'].append(_make_field(0))
+
+    return {
+        'workItemType': 'requirement',
+        'processManagement': {
+            'nodes': nodes,
+            'transitions': [
+                {'from': nodes[n]['id'], 'to': nodes[n + 1]['id'], 'name': f'转换{n}'}
+                for n in range(len(nodes) - 1)
+            ],
+        },
+        'qualityMetrics': {
+            f'metric{m}': {'name': f'基准指标{m}', 'formula': 'AVG(x)', 'target': 1}
+            for m in range(5)
+        },
+    }
+
+
+# ----------------------------------------------------------------------
+# 单次运行
+# ----------------------------------------------------------------------
+
+def _run_sync_all(backend: FakeMeegoBackend, workdir: Path, worker: int, project_key: str,
+                  n_fields: int, n_nodes: int, request_interval: float, batch_window: float = 0.0):
+    config_file = workdir / f'quality-metrics-{worker}.yaml'
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(build_quality_config(project_key, n_fields, n_nodes), f, allow_unicode=True)
+
+    configurator = QualityMetricsConfigurator(str(config_file))
+    configurator.request_interval = request_interval
+    configurator.client = FeishuProjectClient('bench_plugin', 'bench_secret', 'bench_user', project_key)
+    backend.mount(configurator.client.session)
+    if batch_window:
+        configurator.client.enable_field_batching(window=batch_window)
+    configurator.sync_all()
+
+
+def _run_configure_workflow(backend: FakeMeegoBackend, workdir: Path, worker: int, project_key: str,
+                            n_fields: int, n_nodes: int, request_interval: float,
+                            batch_window: float = 0.0):
+    config_file = workdir / f'workflow-config-{worker}.json'
+    auth_file = workdir / f'auth-config-{worker}.json'
+    auth_config = {'pluginToken': 'bench_token', 'userKey': 'bench_user', 'projectKey': project_key}
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(build_workflow_config(n_fields, n_nodes), f, ensure_ascii=False)
+    with open(auth_file, 'w', encoding='utf-8') as f:
+        json.dump(auth_config, f)
+
+    api = FeishuProjectAPI(auth_config)
+    api.request_interval = request_interval
+    backend.mount(api.session)
+    if batch_window:
+        api.enable_field_batching(window=batch_window)
+    configure_workflow(str(config_file), str(auth_file),
+                       str(workdir / f'configuration-report-{worker}.json'), api=api)
+
+
+RUNNERS = {
+    'sync_all': _run_sync_all,
+    'configure_workflow': _run_configure_workflow,
+}
+
+
+def run_scenario(entry_point: str, n_fields: int, n_nodes: int, concurrency: int,
+                 latency_ms: float, throttle_qps: float, repeat: int,
+                 request_interval: float, error_rate: float = 0.0,
+                 lost_response_rate: float = 0.0, batch_window: float = 0.0,
+                 same_project: bool = False) -> Dict:
+    """运行一个场景 repeat 次，返回聚合后的统计结果
+
+    same_project 为 True 时所有并发同步写同一个空间（模拟多个 worker 同步同一项目）
+    """
+    runner = RUNNERS[entry_point]
+    run_times: List[float] = []
+    request_latencies: List[float] = []
+    api_calls = 0
+    throttled = 0
+    failed = 0
+    writes = 0
+    reads = 0
+
+    for _ in range(repeat):
+        # 进程级读缓存不能跨轮次复用（每轮是全新的后端）
+        READ_FLIGHT.invalidate()
+        # 每轮使用全新的后端，避免上一轮创建的字段影响结果
+        backend = FakeMeegoBackend(latency_ms=latency_ms, throttle_qps=throttle_qps,
+                                   error_rate=error_rate, lost_response_rate=lost_response_rate)
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = [
+                    pool.submit(runner, backend, Path(tmp), worker,
+                                'bench_0' if same_project else f'bench_{worker}',
+                                n_fields, n_nodes, request_interval, batch_window)
+                    for worker in range(concurrency)
+                ]
+                for future in futures:
+                    future.result()
+            run_times.append(time.perf_counter() - started)
+
+        request_latencies.extend(backend.latencies)
+        api_calls += backend.total_calls
+        throttled += backend.throttled_calls
+        failed += backend.failed_calls
+        writes += sum(count for (method, _), count in backend.calls.items() if method != 'GET')
+        reads += sum(count for (method, _), count in backend.calls.items() if method == 'GET')
+
+    total_time = sum(run_times)
+    items = (n_fields + n_nodes) * concurrency * repeat
+    return {
+        'entry_point': entry_point,
+        'fields': n_fields,
+        'nodes': n_nodes,
+        'concurrency': concurrency,
+        'latency_ms': latency_ms,
+        'throttle_qps': throttle_qps,
+        'error_rate': error_rate,
+        'lost_response_rate': lost_response_rate,
+        'batch_window': batch_window,
+        'same_project': same_project,
+        'repeat': repeat,
+        'ops_per_sec': round(items / total_time, 3) if total_time else 0.0,
+        'requests_per_sec': round(api_calls / total_time, 3) if total_time else 0.0,
+        'api_calls': api_calls // repeat,
+        'throttled_calls': throttled // repeat,
+        'failed_calls': failed // repeat,
+        'applied_writes': writes // repeat,
+        'read_calls': reads // repeat,
+        'run_seconds': {
+            'p50': round(percentile(run_times, 50), 6),
+            'p99': round(percentile(run_times, 99), 6),
+        },
+        'request_latency_ms': {
+            'p50': round(percentile(request_latencies, 50) * 1000, 4),
+            'p99': round(percentile(request_latencies, 99) * 1000, 4),
+        },
+    }
+
+
+def scenario_id(result: Dict) -> str:
+    """场景唯一标识，用于跨提交对比"""
+    sid = ("{entry_point}/f{fields}/n{nodes}/c{concurrency}/"
+           "l{latency_ms:g}/q{throttle_qps:g}").format(**result)
+    if result.get('error_rate') or result.get('lost_response_rate'):
+        sid += "/e{error_rate:g}/r{lost_response_rate:g}".format(**result)
+    if result.get('batch_window'):
+        sid += "/b{batch_window:g}".format(**result)
+    if result.get('same_project'):
+        sid += "/shared"
+    return sid
+
+
+# ----------------------------------------------------------------------
+# 结果对比
+# ----------------------------------------------------------------------
+
+def compare_with_baseline(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """与基线结果对比，返回回归描述列表（空列表表示无回归）"""
+    previous = {scenario_id(r): r for r in baseline.get('results', [])}
+    regressions = []
+
+    for result in current['results']:
+        sid = scenario_id(result)
+        old = previous.get(sid)
+        if not old:
+            continue
+        if old['ops_per_sec'] and result['ops_per_sec'] < old['ops_per_sec'] * (1 - tolerance):
+            regressions.append(f"{sid}: ops/sec {old['ops_per_sec']} -> {result['ops_per_sec']}")
+        if result['api_calls'] > old['api_calls']:
+            regressions.append(f"{sid}: api_calls {old['api_calls']} -> {result['api_calls']}")
+
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).resolve().parent, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v]
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(v) for v in value.split(',') if v]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='飞书项目同步吞吐量基准测试')
+    parser.add_argument('--entry-points', default=','.join(ENTRY_POINTS),
+                        help='要测试的入口，逗号分隔 (sync_all,configure_workflow)')
+    parser.add_argument('--fields', type=_int_list, default=[10, 100, 500], help='字段数列表')
+    parser.add_argument('--nodes', type=_int_list, default=[6], help='流程节点数列表')
+    parser.add_argument('--concurrency', type=_int_list, default=[1, 4], help='并发同步数列表')
+    parser.add_argument('--latency-ms', type=_float_list, default=[0.0, 5.0], help='注入延迟列表(毫秒)')
+    parser.add_argument('--throttle-qps', type=_float_list, default=[0.0], help='限流QPS列表(0为不限流)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='注入 HTTP 503 的概率')
+    parser.add_argument('--lost-response-rate', type=float, default=0.0,
+                        help='请求已处理但响应丢失（客户端超时）的概率')
+    parser.add_argument('--batch-window', type=float, default=0.0,
+                        help='字段创建合并窗口(秒)，0为逐个创建')
+    parser.add_argument('--same-project', action='store_true',
+                        help='所有并发同步写同一个空间（测量重复读请求的合并效果）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个场景重复次数')
+    parser.add_argument('--request-interval', type=float, default=0.0,
+                        help='客户端写请求间隔(秒)，默认0以测量纯同步开销')
+    parser.add_argument('--output', help='结果JSON输出路径（默认输出到标准输出）')
+    parser.add_argument('--baseline', help='基线结果JSON，用于检测回归')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='ops/sec 允许下降比例')
+    args = parser.parse_args(argv)
+
+    # 基准测试期间只保留警告日志（经由队列异步写出），同步过程的事件不输出
+    setup_logging(logging.WARNING)
+    EVENTS.configure(SilentEmitter())
+
+    entry_points = [e for e in args.entry_points.split(',') if e]
+    for entry_point in entry_points:
+        if entry_point not in RUNNERS:
+            parser.error(f'未知入口: {entry_point}')
+
+    results = []
+    for entry_point, n_fields, n_nodes, concurrency, latency_ms, throttle_qps in itertools.product(
+            entry_points, args.fields, args.nodes, args.concurrency, args.latency_ms, args.throttle_qps):
+        result = run_scenario(entry_point, n_fields, n_nodes, concurrency, latency_ms,
+                              throttle_qps, args.repeat, args.request_interval,
+                              args.error_rate, args.lost_response_rate, args.batch_window,
+                              args.same_project)
+        results.append(result)
+        print(f"{scenario_id(result)}: {result['ops_per_sec']} ops/s, "
+              f"{result['api_calls']} calls, p99 {result['request_latency_ms']['p99']}ms",
+              file=sys.stderr)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'request_interval': args.request_interval,
+        'results': results,
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"基准结果已保存到 {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("检测到性能回归:", file=sys.stderr)
+            for line in regressions:
+                print(f"  - {line}", file=sys.stderr)
+            return 1
+        print(f"与基线 {baseline.get('commit')} 对比无回归", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
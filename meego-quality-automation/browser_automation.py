@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
 """
 通过浏览器自动化配置飞书项目质量指标
-使用selenium或pyautogui自动操作UI
+生成在浏览器控制台运行的脚本：
+- api 模式（默认）：直接调用 goapi 字段创建接口，限制并发的 Promise 池 + 复用 CSRF 头，
+  14~100 个字段几秒内完成，并按字段输出结果表
+- ui 模式：模拟点击页面按钮逐个创建（旧方式，每个字段需要数秒）
 """
 
+import argparse
+import json
 import time
 import subprocess
-import json
+from pathlib import Path
+
+BASE_URL = "https://project.f.mioffice.cn"
+PROJECT_KEY = "6917068acb0eb4333d5d6b1e"
+WORK_ITEM_TYPE = "story"
+SETTING_URL = f"{BASE_URL}/iretail/setting/workObjectSetting"
 
 # 5个质量指标配置
 METRICS = {
@@ -36,11 +46,8 @@ METRICS = {
     ]
 }
 
-print("🚀 启动浏览器自动化配置...")
-print("=" * 60)
-
-# 生成JavaScript代码
-js_code = """
+# 模拟点击创建字段的脚本（ui 模式）
+UI_JS = """
 (async function() {
     console.log('开始自动配置飞书项目质量指标...');
 
@@ -51,22 +58,7 @@ js_code = """
     }
 
     // 质量指标字段配置
-    const fields = [
-        {name: '需求创建时间', type: 'datetime'},
-        {name: '方案完成时间', type: 'datetime'},
-        {name: '评审通过时间', type: 'datetime'},
-        {name: '上线时间', type: 'datetime'},
-        {name: 'Lead Time(天)', type: 'number'},
-        {name: '评审结果', type: 'select'},
-        {name: '评审轮次', type: 'number'},
-        {name: '并行任务数', type: 'number'},
-        {name: '周完成数', type: 'number'},
-        {name: 'PRD版本', type: 'text'},
-        {name: 'PRD返工次数', type: 'number'},
-        {name: '试点开始', type: 'datetime'},
-        {name: 'GA发布', type: 'datetime'},
-        {name: '迭代次数', type: 'number'}
-    ];
+    const fields = __FIELDS__;
 
     // 自动创建字段
     for (let field of fields) {
@@ -110,28 +102,212 @@ js_code = """
 })();
 """
 
-# 保存JavaScript代码
-with open('/d/code/WSJF/meego-quality-automation/auto_config.js', 'w', encoding='utf-8') as f:
-    f.write(js_code)
-
-print("✅ 自动化脚本已生成")
-
-# 尝试通过系统调用打开浏览器
-print("\n正在尝试自动打开浏览器...")
-
-try:
-    # Windows系统
-    import webbrowser
-    webbrowser.open('https://project.f.mioffice.cn/iretail/setting/workObjectSetting')
-    print("✅ 浏览器已打开")
-    print("\n请在浏览器控制台运行 auto_config.js 中的代码")
-except:
-    print("⚠️ 请手动打开浏览器访问项目设置页面")
-
-print("\n" + "=" * 60)
-print("自动配置步骤：")
-print("1. 浏览器已自动打开（或手动打开）")
-print("2. 登录后按F12打开控制台")
-print("3. 粘贴运行 auto_config.js 的代码")
-print("4. 等待自动创建14个字段")
-print("=" * 60)
\ No newline at end of file
+# 直接调用 goapi 的并发脚本（api 模式）
+API_JS = """
+(async function() {
+    const PROJECT_KEY = __PROJECT_KEY__;
+    const WORK_ITEM_TYPE = __WORK_ITEM_TYPE__;
+    const CONCURRENCY = __CONCURRENCY__;
+    const MAX_RETRIES = 2;
+    const fields = __FIELDS__;
+    const url = `/goapi/v3/settings/${PROJECT_KEY}/${WORK_ITEM_TYPE}/field`;
+
+    // CSRF token 只读取一次，所有请求复用；被拒绝时由第一个发现的请求刷新，其余请求等待同一次刷新
+    function readCsrfToken() {
+        const cookie = document.cookie.split('; ').find(c => /csrf/i.test(c.split('=')[0]));
+        return cookie ? decodeURIComponent(cookie.split('=').slice(1).join('=')) : (window.__MEEGO_CSRF_TOKEN__ || '');
+    }
+    let csrfToken = readCsrfToken();
+    let refreshing = null;
+    function refreshCsrfToken(rejected) {
+        if (csrfToken !== rejected) return Promise.resolve(csrfToken);
+        if (!refreshing) {
+            refreshing = fetch(location.href, {credentials: 'include'})
+                .catch(() => null)
+                .then(() => {
+                    csrfToken = readCsrfToken() || prompt('CSRF token 已失效，请输入新的 x-meego-csrf-token') || '';
+                    refreshing = null;
+                    return csrfToken;
+                });
+        }
+        return refreshing;
+    }
+
+    function randomKey() {
+        const bytes = crypto.getRandomValues(new Uint8Array(3));
+        return 'field_' + Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    function buildPayload(field, key) {
+        return {
+            sync_uuid: '',
+            field: {
+                scope: [WORK_ITEM_TYPE],
+                authorized_roles: ['_anybody'],
+                plg_key: '',
+                validity: {condition_group: {conjunction: ''}, usage_mode: '', value: null},
+                default_value: {condition_group: {conjunction: ''}, usage_mode: '', value: null, bqls: []},
+                alias: field.alias || '',
+                name: field.name,
+                tooltip: field.description || '',
+                type: field.type,
+                project: PROJECT_KEY,
+                key: key
+            }
+        };
+    }
+
+    async function createField(field) {
+        const key = randomKey();
+        const started = performance.now();
+        let lastError = '';
+        let attempts = 0;
+        for (let attempt = 0; attempt <= MAX_RETRIES; attempt++) {
+            attempts = attempt + 1;
+            const token = csrfToken;
+            try {
+                const response = await fetch(url, {
+                    method: 'POST',
+                    credentials: 'include',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'x-meego-csrf-token': token,
+                        'x-meego-from': 'web',
+                        'x-meego-scope': 'workObjectSettingfieldManagement',
+                        'x-lark-gw': '1',
+                        'locale': 'zh',
+                        'x-content-language': 'zh'
+                    },
+                    body: JSON.stringify(buildPayload(field, key))
+                });
+                const body = await response.json().catch(() => ({}));
+                if (response.ok && body.code === 0) {
+                    return {name: field.name, type: field.type, key, status: '✅', attempts,
+                            ms: Math.round(performance.now() - started), error: ''};
+                }
+                lastError = body.msg || `HTTP ${response.status}`;
+                if (response.status === 403 || /csrf/i.test(lastError)) {
+                    await refreshCsrfToken(token);
+                } else if (response.status === 429 || response.status >= 500) {
+                    await new Promise(r => setTimeout(r, 300 * 2 ** attempt));
+                } else {
+                    break;
+                }
+            } catch (e) {
+                lastError = String(e);
+                await new Promise(r => setTimeout(r, 300 * 2 ** attempt));
+            }
+        }
+        return {name: field.name, type: field.type, key, status: '❌', attempts,
+                ms: Math.round(performance.now() - started), error: lastError};
+    }
+
+    // 限制并发的 Promise 池：CONCURRENCY 个 worker 依次领取字段，结果按原顺序保存
+    async function runPool(items, limit, worker) {
+        const results = new Array(items.length);
+        let next = 0;
+        const runners = Array.from({length: Math.min(limit, items.length)}, async () => {
+            while (next < items.length) {
+                const index = next++;
+                results[index] = await worker(items[index]);
+            }
+        });
+        await Promise.all(runners);
+        return results;
+    }
+
+    if (!csrfToken) {
+        csrfToken = prompt('未在 Cookie 中找到 CSRF token，请输入 x-meego-csrf-token') || '';
+    }
+
+    console.log(`开始创建 ${fields.length} 个字段（并发 ${CONCURRENCY}）...`);
+    const started = performance.now();
+    const results = await runPool(fields, CONCURRENCY, createField);
+    const succeeded = results.filter(r => r.status === '✅').length;
+
+    console.table(results);
+    console.log(`✅ 完成: ${succeeded}/${fields.length} 个字段创建成功，` +
+                `耗时 ${((performance.now() - started) / 1000).toFixed(1)} 秒`);
+    window.__qualityFieldResults = results;
+    return results;
+})();
+"""
+
+
+def metric_fields():
+    """展开 METRICS 为字段列表"""
+    return [
+        {"name": name, "type": field_type, "description": f"{metric} 指标字段"}
+        for metric, fields in METRICS.items()
+        for name, field_type in fields
+    ]
+
+
+def build_api_js(fields, project_key: str = PROJECT_KEY, work_item_type: str = WORK_ITEM_TYPE,
+                 concurrency: int = 6) -> str:
+    """生成直接调用 goapi 字段创建接口的控制台脚本"""
+    return (API_JS
+            .replace('__PROJECT_KEY__', json.dumps(project_key))
+            .replace('__WORK_ITEM_TYPE__', json.dumps(work_item_type))
+            .replace('__CONCURRENCY__', str(max(1, concurrency)))
+            .replace('__FIELDS__', json.dumps(fields, ensure_ascii=False, indent=8)))
+
+
+def build_ui_js(fields) -> str:
+    """生成模拟点击创建字段的控制台脚本"""
+    compact = [{"name": f["name"], "type": f["type"]} for f in fields]
+    return UI_JS.replace('__FIELDS__', json.dumps(compact, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成浏览器控制台自动配置脚本')
+    parser.add_argument('--mode', choices=('api', 'ui'), default='api',
+                        help='api: 并发调用 goapi 接口（默认）；ui: 模拟点击')
+    parser.add_argument('--concurrency', type=int, default=6, help='api 模式的并发请求数')
+    parser.add_argument('--project-key', default=PROJECT_KEY, help='空间ID')
+    parser.add_argument('--work-item-type', default=WORK_ITEM_TYPE, help='工作项类型')
+    parser.add_argument('--output', default=str(Path(__file__).resolve().parent / 'auto_config.js'),
+                        help='脚本输出路径')
+    parser.add_argument('--no-browser', action='store_true', help='不自动打开浏览器')
+    args = parser.parse_args()
+
+    print("🚀 启动浏览器自动化配置...")
+    print("=" * 60)
+
+    fields = metric_fields()
+    if args.mode == 'api':
+        js_code = build_api_js(fields, args.project_key, args.work_item_type, args.concurrency)
+    else:
+        js_code = build_ui_js(fields)
+
+    # 保存JavaScript代码
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(js_code)
+
+    print(f"✅ 自动化脚本已生成: {args.output}（{args.mode} 模式，{len(fields)} 个字段）")
+
+    # 尝试通过系统调用打开浏览器
+    if not args.no_browser:
+        print("\n正在尝试自动打开浏览器...")
+        try:
+            import webbrowser
+            webbrowser.open(SETTING_URL)
+            print("✅ 浏览器已打开")
+            print(f"\n请在浏览器控制台运行 {Path(args.output).name} 中的代码")
+        except Exception:
+            print("⚠️ 请手动打开浏览器访问项目设置页面")
+
+    print("\n" + "=" * 60)
+    print("自动配置步骤：")
+    print("1. 浏览器已自动打开（或手动打开）")
+    print("2. 登录后按F12打开控制台")
+    print(f"3. 粘贴运行 {Path(args.output).name} 的代码")
+    if args.mode == 'api':
+        print(f"4. 等待 {len(fields)} 个字段并发创建完成，控制台会输出每个字段的结果表")
+    else:
+        print(f"4. 等待自动创建{len(fields)}个字段")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+API客户端代码生成
+根据 MeegoAPIDebugger 分析出的端点模板生成客户端模块，包含：
+- AutoGeneratedFeishuClient：复用连接池的 requests.Session，信号量限制并发
+- AsyncFeishuClient：asyncio 接口（请求在专用线程池中执行，共享同一个连接池）
+- 由捕获的请求体推断的 TypedDict 类型，方法签名带类型注解
+- 令牌桶限流与请求前/响应后钩子
+
+生成的代码只依赖 requests。
+"""
+
+import keyword
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+
+# 路径中的占位符段，如 {id}、{key}
+_PLACEHOLDER = re.compile(r'^\{(\w+)\}$')
+
+# 端点最后一段是这些动词时直接用作方法名前缀
+_VERBS = ('batch_create', 'create', 'update', 'delete', 'remove', 'get', 'list', 'query',
+          'search', 'filter', 'detail')
+
+_HTTP_VERBS = {'GET': 'get', 'POST': 'post', 'PUT': 'put', 'PATCH': 'patch', 'DELETE': 'delete'}
+
+# 客户端自身的属性/方法，生成的接口方法不能与之重名
+_RESERVED = {'close', 'map', 'gather', 'session', 'headers', 'limiter', 'base_url', 'project_key',
+             'timeout', 'before_request', 'after_response', 'max_concurrency'}
+
+DEFAULT_PREFIX = 'open_api'
+
+# open_api 下不属于具体项目的接口分组（第一段不是项目key）
+_GLOBAL_ROOTS = {'auth', 'user', 'users', 'projects', 'project'}
+
+
+def _identifier(text: str) -> str:
+    """把任意文本转换为合法的小写标识符"""
+    name = re.sub(r'\W+', '_', text).strip('_').lower() or 'value'
+    if name[0].isdigit():
+        name = f'_{name}'
+    if keyword.iskeyword(name):
+        name += '_'
+    return name
+
+
+def _segments(template: str) -> List[str]:
+    return template.strip('/').split('/') if template.strip('/') else []
+
+
+def detect_project_key(endpoints: Dict[str, Dict]) -> str:
+    """推断捕获时的项目key：open_api 端点中最常见的第一段（跳过占位符与全局接口分组）"""
+    votes: Counter = Counter()
+    for key, details in endpoints.items():
+        if (details.get('prefix') or DEFAULT_PREFIX) != DEFAULT_PREFIX:
+            continue
+        segments = _segments(details.get('endpoint', key))
+        if segments and not _PLACEHOLDER.match(segments[0]) and segments[0] not in _GLOBAL_ROOTS:
+            votes[segments[0]] += details.get('count', 1)
+    return votes.most_common(1)[0][0] if votes else ''
+
+
+def _unique(name: str, used: Set[str]) -> str:
+    candidate, n = name, 2
+    while candidate in used:
+        candidate = f'{name}_{n}'
+        n += 1
+    used.add(candidate)
+    return candidate
+
+
+def infer_annotation(value: Any) -> str:
+    """由示例值推断类型注解"""
+    if value is None:
+        return 'Any'
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, str):
+        return 'str'
+    if isinstance(value, list):
+        element_types = {infer_annotation(v) for v in value}
+        return f'List[{element_types.pop()}]' if len(element_types) == 1 else 'List[Any]'
+    return 'Dict[str, Any]'
+
+
+def typed_dict_source(name: str, payload: Dict) -> str:
+    """由示例请求体生成 TypedDict 定义（total=False：捕获到的字段都视为可选）"""
+    fields = [(key, infer_annotation(value)) for key, value in payload.items()]
+    if fields and all(key.isidentifier() and not keyword.iskeyword(key) for key, _ in fields):
+        lines = [f'class {name}(TypedDict, total=False):']
+        lines += [f'    {key}: {annotation}' for key, annotation in fields]
+        return '\n'.join(lines) + '\n'
+    # 含有非标识符的键时使用函数式写法
+    items = ', '.join(f'{key!r}: {annotation}' for key, annotation in fields)
+    return f'{name} = TypedDict({name!r}, {{{items}}}, total=False)\n'
+
+
+class _Endpoint:
+    """一个待生成的接口方法"""
+
+    def __init__(self, method: str, template: str, details: Dict, project_key: str = ''):
+        self.method = method.upper()
+        self.template = template
+        self.prefix = details.get('prefix') or DEFAULT_PREFIX
+        self.project_key = project_key
+        self.count = details.get('count', 1)
+        self.payload = details.get('example_payload')
+        self.segments = _segments(template)
+        self.name = ''
+        self.payload_type: Optional[str] = None
+        # 路径段 -> 源码片段（参数名或字面量）
+        self.path_args: List[str] = []
+        self.path_parts: List[str] = []
+        self._bind_path()
+
+    def _bind_path(self):
+        used: Set[str] = {'self', 'payload'}
+        previous = None
+        for segment in self.segments:
+            match = _PLACEHOLDER.match(segment)
+            if self.project_key and segment == self.project_key:
+                # 捕获时的项目key（open_api 在第一段，goapi 在中间），由客户端实例提供
+                self.path_parts.append('{self.project_key}')
+            elif match:
+                base = f'{previous}_{match.group(1)}' if previous else match.group(1)
+                arg = _unique(_identifier(base), used)
+                self.path_args.append(arg)
+                self.path_parts.append('{' + arg + '}')
+            else:
+                self.path_parts.append(segment.replace('{', '{{').replace('}', '}}'))
+            previous = None if match else _identifier(segment)
+
+    def literals(self) -> List[str]:
+        return [_identifier(s) for s in self.segments
+                if s != self.project_key and not _PLACEHOLDER.match(s)]
+
+    def base_name(self) -> str:
+        literals = self.literals()
+        if literals and literals[-1] in _VERBS:
+            verb = literals.pop()
+        else:
+            verb = _HTTP_VERBS.get(self.method, self.method.lower())
+        return '_'.join([verb] + literals) if literals else f'{verb}_endpoint'
+
+    def signature(self) -> str:
+        params = ['self'] + [f'{arg}: str' for arg in self.path_args]
+        if isinstance(self.payload, dict) and self.payload:
+            params.append(f'payload: {self.payload_type}')
+        elif isinstance(self.payload, list):
+            params.append(f'payload: {infer_annotation(self.payload)}')
+        elif self.method != 'GET':
+            params.append('payload: Optional[Dict[str, Any]] = None')
+        return ', '.join(params)
+
+    def call(self) -> str:
+        path = 'f"' + '/'.join(self.path_parts) + '"'
+        args = [repr(self.method), path]
+        if self.prefix != DEFAULT_PREFIX:
+            args.append(f'prefix={self.prefix!r}')
+        if self.payload is not None or self.method != 'GET':
+            args.append(f"{'params' if self.method == 'GET' else 'json'}=payload")
+        return f"self._request({', '.join(args)})"
+
+
+def _assign_names(endpoints: List[_Endpoint]):
+    """生成互不冲突的方法名：基础名冲突时追加路径参数（_by_xxx），仍冲突再追加序号"""
+    by_name: Dict[str, List[_Endpoint]] = {}
+    for endpoint in endpoints:
+        by_name.setdefault(endpoint.base_name(), []).append(endpoint)
+
+    used = set(_RESERVED)
+    for name, group in by_name.items():
+        for endpoint in group:
+            candidate = name
+            if len(group) > 1 and endpoint.path_args:
+                candidate = f"{name}_by_{'_'.join(endpoint.path_args)}"
+            if candidate in _RESERVED:
+                candidate += '_api'
+            endpoint.name = _unique(candidate, used)
+            if isinstance(endpoint.payload, dict) and endpoint.payload:
+                camel = ''.join(part.capitalize() for part in endpoint.name.split('_') if part)
+                endpoint.payload_type = f'{camel}Payload'
+
+
+def _method_source(endpoint: _Endpoint, is_async: bool) -> str:
+    prefix = 'async def' if is_async else 'def'
+    call = f'await {endpoint.call()}' if is_async else endpoint.call()
+    return (
+        f'\n    {prefix} {endpoint.name}({endpoint.signature()}) -> Dict[str, Any]:\n'
+        f'        """{endpoint.method} /{endpoint.prefix}/{endpoint.template}（捕获 {endpoint.count} 次）"""\n'
+        f'        return {call}\n'
+    )
+
+
+_HEADER = '''"""
+自动生成的飞书项目API客户端
+基于Chrome DevTools捕获的真实API调用
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypedDict, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = __BASE_URL__
+DEFAULT_PROJECT_KEY = __PROJECT_KEY__
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+'''
+
+_RUNTIME = '''
+
+class RateLimiter:
+    """令牌桶限流（线程安全）；rate <= 0 表示不限流"""
+
+    def __init__(self, rate: float = 0.0, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """预留一个令牌，返回需要等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class _ClientBase:
+    """公共配置：认证头、限流、钩子和连接池"""
+
+    def __init__(self, plugin_token: str, user_key: str, project_key: str = DEFAULT_PROJECT_KEY,
+                 base_url: str = BASE_URL, max_concurrency: int = 8, rate_limit: float = 0.0,
+                 timeout: float = 30.0):
+        """
+        Args:
+            max_concurrency: 同时进行的请求数上限（也是连接池大小）
+            rate_limit: 每秒请求数上限，0 表示不限流
+        """
+        self.base_url = base_url.rstrip("/")
+        self.project_key = project_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate_limit, burst=max_concurrency)
+        self.headers = {
+            "X-Plugin-Token": plugin_token,
+            "X-User-Key": user_key,
+            "Content-Type": "application/json"
+        }
+        # 钩子：before_request(method, endpoint, kwargs)，after_response(method, endpoint, response)
+        self.before_request: List[Callable[[str, str, Dict[str, Any]], None]] = []
+        self.after_response: List[Callable[[str, str, requests.Response], None]] = []
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _send(self, method: str, endpoint: str, prefix: str = "open_api", **kwargs) -> Dict[str, Any]:
+        for hook in self.before_request:
+            hook(method, endpoint, kwargs)
+        response = self.session.request(method, f"{self.base_url}/{prefix}/{endpoint}",
+                                        timeout=self.timeout, **kwargs)
+        for hook in self.after_response:
+            hook(method, endpoint, response)
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+class AutoGeneratedFeishuClient(_ClientBase):
+    """同步客户端（线程安全，可在多个线程中共享）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    def _request(self, method: str, endpoint: str, prefix: str = "open_api", **kwargs) -> Dict[str, Any]:
+        with self._slots:
+            self.limiter.acquire()
+            return self._send(method, endpoint, prefix, **kwargs)
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """并发执行 fn(item)，返回按输入顺序排列的结果"""
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(fn, items))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+'''
+
+_ASYNC_RUNTIME = '''
+
+class AsyncFeishuClient(_ClientBase):
+    """asyncio 客户端：请求在专用线程池中执行，共享连接池，并发数受信号量限制"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                            thread_name_prefix="feishu-client")
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _request(self, method: str, endpoint: str, prefix: str = "open_api",
+                       **kwargs) -> Dict[str, Any]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        async with self._slots:
+            await self.limiter.acquire_async()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, lambda: self._send(method, endpoint, prefix, **kwargs))
+
+    async def gather(self, *calls: Awaitable[T]) -> List[T]:
+        """并发等待多个请求"""
+        return list(await asyncio.gather(*calls))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        super().close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+'''
+
+
+def generate_client(base_url: str, endpoints: Dict[str, Dict], project_key: Optional[str] = None) -> str:
+    """生成客户端模块源码
+
+    Args:
+        base_url: 飞书项目地址，如 https://project.feishu.cn
+        endpoints: analyze_api_patterns 的 endpoints（每项包含 endpoint/prefix/method/count/example_payload）
+        project_key: 捕获时的项目key；为 None 时由 detect_project_key 推断
+    """
+    if project_key is None:
+        project_key = detect_project_key(endpoints)
+    items = [
+        _Endpoint(details.get('method', 'GET'), details.get('endpoint', key), details, project_key)
+        for key, details in endpoints.items()
+    ]
+    _assign_names(items)
+
+    code = _HEADER.replace('__BASE_URL__', repr(base_url)).replace('__PROJECT_KEY__', repr(project_key))
+    typed = [typed_dict_source(e.payload_type, e.payload) for e in items if e.payload_type]
+    if typed:
+        code += '\n# 请求体类型（由捕获的请求推断）\n\n' + '\n\n'.join(typed)
+
+    code += _RUNTIME
+    code += ''.join(_method_source(e, is_async=False) for e in items)
+    code += _ASYNC_RUNTIME
+    code += ''.join(_method_source(e, is_async=True) for e in items)
+    return code
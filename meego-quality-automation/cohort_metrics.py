@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+质量指标分组统计
+按 创建周(cohort) × 团队 × 优先级 × 技术复杂度 等维度，对本地工作项表一次性计算所有分组的
+Lead Time（数量、均值、p50/p85/p95、最小、最大）和评审一次通过率。
+
+维度列先做字典编码（字符串 → 整数编码），多个维度按混合进制合成一个分组键；
+之后用 np.bincount 求计数与加权和，按 (分组, 值) 排序后每组连续且组内有序，
+极值与分位数都按组起点 + 偏移直接取值，整个过程是对列的向量运算，与分组数量无关。
+
+用法:
+    python cohort_metrics.py exports/requirement.ndjson
+    python cohort_metrics.py exports/parquet/requirement --by week,priority --from 2025-01-01
+    python cohort_metrics.py exports/requirement.csv --by team,technical_complexity --format csv -o by_team.csv
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+
+from quantile_sketch import DEFAULT_QUANTILES, lead_time_definition
+from work_item_table import iter_rows, option_label, to_epoch_days
+
+# 创建周维度的名称；其余维度为工作项字段key
+WEEK = 'week'
+
+DEFAULT_DIMENSIONS = (WEEK, 'team', 'priority', 'technical_complexity')
+
+# 1970-01-01 是周四，+3 后按 7 取整即以周一为起点的周序号
+_WEEK_SHIFT = 3
+_EPOCH = date(1970, 1, 1)
+
+
+def first_pass_definition(config: Dict, metric_key: str = 'review_first_pass_rate') -> Tuple[str, str]:
+    """从质量指标配置解析评审一次通过率的 (字段, 通过选项)，即 COUNTIF(字段, '选项')"""
+    metric = next((m for m in config.get('quality_metrics', []) if m.get('key') == metric_key), None)
+    if metric is None:
+        raise ValueError(f"质量指标配置中没有 {metric_key}")
+    match = re.match(r"\s*COUNTIF\(\s*(\w+)\s*,\s*'([^']*)'", metric.get('formula', ''))
+    if not match:
+        raise ValueError(f"{metric_key} 的公式不是 COUNTIF(字段, '选项')")
+    return match.group(1), match.group(2)
+
+
+def week_label(week: int) -> str:
+    """周序号 → 该周周一的日期"""
+    return (_EPOCH + timedelta(days=week * 7 - _WEEK_SHIFT)).isoformat()
+
+
+class WorkItemColumns:
+    """分组统计所需的列（一次遍历工作项构建）
+
+    Attributes:
+        codes: 维度 → 编码数组（int64）；编码 -1 表示缺少创建时间
+        dictionaries: 维度 → 编码对应的取值列表
+        lead_time: Lead Time 天数（缺少起止时间为 NaN）
+        reviewed / passed: 是否有评审结果 / 是否一次通过
+    """
+
+    def __init__(self, rows: Iterable[Dict], dimensions: Sequence[str],
+                 lead_time: Tuple[str, str, List], first_pass: Tuple[str, str]):
+        end_field, start_field, _ = lead_time
+        review_field, pass_option = first_pass
+        dimensions = list(dimensions)
+        lookups: Dict[str, Dict[str, int]] = {d: {} for d in dimensions if d != WEEK}
+        raw_codes: Dict[str, List[int]] = {d: [] for d in dimensions}
+        created, deployed, review = [], [], []
+
+        for row in rows:
+            start = to_epoch_days(row.get(start_field))
+            end = to_epoch_days(row.get(end_field))
+            created.append(np.nan if start is None else start)
+            deployed.append(np.nan if end is None else end)
+            review.append(option_label(row.get(review_field)))
+            for dimension, lookup in lookups.items():
+                value = option_label(row.get(dimension))
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(lookup)
+                raw_codes[dimension].append(code)
+
+        self.created = np.asarray(created, dtype=np.float64)
+        deployed = np.asarray(deployed, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            lead = deployed - self.created
+            lead[lead < 0] = np.nan
+        self.lead_time = lead
+
+        review = np.asarray(review, dtype=object)
+        self.reviewed = review != ''
+        self.passed = review == pass_option
+
+        self.codes: Dict[str, np.ndarray] = {}
+        self.dictionaries: Dict[str, List] = {}
+        for dimension in dimensions:
+            if dimension == WEEK:
+                weeks = np.floor((self.created + _WEEK_SHIFT) / 7.0)
+                valid = ~np.isnan(weeks)
+                first = int(weeks[valid].min()) if valid.any() else 0
+                codes = np.where(valid, weeks - first, -1).astype(np.int64)
+                count = int(codes.max()) + 1 if valid.any() else 0
+                self.codes[dimension] = codes
+                self.dictionaries[dimension] = [week_label(first + i) for i in range(count)]
+            else:
+                self.codes[dimension] = np.asarray(raw_codes[dimension], dtype=np.int64)
+                self.dictionaries[dimension] = list(lookups[dimension])
+
+    def __len__(self) -> int:
+        return len(self.created)
+
+    def since(self, start: Optional[str] = None, end: Optional[str] = None) -> np.ndarray:
+        """创建日期在 [start, end] 内的行掩码"""
+        mask = np.ones(len(self), dtype=bool)
+        if start:
+            mask &= self.created >= (date.fromisoformat(start) - _EPOCH).days
+        if end:
+            mask &= self.created < (date.fromisoformat(end) - _EPOCH).days + 1
+        return mask
+
+
+def group_metrics(columns: WorkItemColumns, by: Sequence[str],
+                  mask: Optional[np.ndarray] = None,
+                  quantiles: Sequence[float] = DEFAULT_QUANTILES) -> List[Dict]:
+    """按维度分组计算所有指标（单次向量运算，不按分组循环求值）
+
+    Returns:
+        每个非空分组一条记录：维度取值 + items、lead_time_count/mean/min/max/pXX、
+        reviewed、first_pass_rate（百分比）；按分组键排序
+    """
+    keep = np.ones(len(columns), dtype=bool) if mask is None else mask.copy()
+    for dimension in by:
+        keep &= columns.codes[dimension] >= 0
+    rows = np.flatnonzero(keep)
+
+    # 混合进制合成分组键，再压缩为连续的分组编号
+    key = np.zeros(len(rows), dtype=np.int64)
+    for dimension in by:
+        key = key * max(len(columns.dictionaries[dimension]), 1) + columns.codes[dimension][rows]
+    group_keys, group = np.unique(key, return_inverse=True)
+    group = group.reshape(-1)
+    groups = len(group_keys)
+    if groups == 0:
+        return []
+
+    lead = columns.lead_time[rows]
+    has_lead = ~np.isnan(lead)
+    items = np.bincount(group, minlength=groups)
+    lead_count = np.bincount(group, weights=has_lead, minlength=groups).astype(np.int64)
+    lead_sum = np.bincount(group, weights=np.where(has_lead, lead, 0.0), minlength=groups)
+    reviewed = np.bincount(group, weights=columns.reviewed[rows], minlength=groups).astype(np.int64)
+    passed = np.bincount(group, weights=columns.passed[rows], minlength=groups)
+
+    # 只保留有 Lead Time 的行，按 (分组, 值) 排序，每组连续且组内有序
+    valid_group, valid_lead = group[has_lead], lead[has_lead]
+    order = np.lexsort((valid_lead, valid_group))
+    sorted_lead = valid_lead[order]
+    starts = np.concatenate(([0], np.cumsum(lead_count)[:-1]))
+    present = lead_count > 0
+    safe_starts = np.minimum(starts, max(len(sorted_lead) - 1, 0))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(present, lead_sum / lead_count, np.nan)
+        rate = np.where(reviewed > 0, passed / reviewed * 100.0, np.nan)
+    stats = {'lead_time_mean': mean, 'first_pass_rate': rate}
+    if len(sorted_lead):
+        # 组内已有序：最小值为组首、最大值为组尾；空分组的下标只是占位，结果置为 NaN
+        last = np.minimum(starts + np.maximum(lead_count - 1, 0), len(sorted_lead) - 1)
+        stats['lead_time_min'] = np.where(present, sorted_lead[safe_starts], np.nan)
+        stats['lead_time_max'] = np.where(present, sorted_lead[last], np.nan)
+        for q in quantiles:
+            # 最近秩法：第 ceil(q·n) 个值
+            offset = np.maximum(np.ceil(q * lead_count).astype(np.int64) - 1, 0)
+            stats[f'lead_time_p{q * 100:g}'] = np.where(present, sorted_lead[safe_starts + offset * present], np.nan)
+    else:
+        for name in ['lead_time_min', 'lead_time_max'] + [f'lead_time_p{q * 100:g}' for q in quantiles]:
+            stats[name] = np.full(groups, np.nan)
+
+    # 分组键拆回各维度编码
+    decoded, remainder = {}, group_keys.copy()
+    for dimension in reversed(by):
+        size = max(len(columns.dictionaries[dimension]), 1)
+        decoded[dimension] = remainder % size
+        remainder //= size
+
+    # 转为 Python 列表后组装结果（NaN 输出为 None）
+    names = ['lead_time_mean', 'lead_time_min', 'lead_time_max'] + [f'lead_time_p{q * 100:g}' for q in quantiles]
+    columns_out = {d: [columns.dictionaries[d][c] for c in decoded[d].tolist()] for d in by}
+    columns_out['items'] = items.tolist()
+    columns_out['lead_time_count'] = lead_count.tolist()
+    for name in names:
+        columns_out[name] = [None if v != v else v for v in np.round(stats[name], 2).tolist()]
+    columns_out['reviewed'] = reviewed.tolist()
+    columns_out['first_pass_rate'] = [None if v != v else v for v in np.round(rate, 1).tolist()]
+    fields = list(columns_out)
+    results = [dict(zip(fields, values)) for values in zip(*columns_out.values())]
+    return results
+
+
+def load_columns(path: str, dimensions: Sequence[str], config_file: str = 'quality-metrics.yaml') -> WorkItemColumns:
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    return WorkItemColumns(iter_rows(path), dimensions, lead_time_definition(config), first_pass_definition(config))
+
+
+def _write_table(results: List[Dict], by: Sequence[str], out):
+    headers = list(by) + ['需求数', 'LT样本', 'LT均值', 'LT p50', 'LT p85', 'LT p95', '评审数', '一次通过率%']
+    keys = list(by) + ['items', 'lead_time_count', 'lead_time_mean', 'lead_time_p50', 'lead_time_p85',
+                       'lead_time_p95', 'reviewed', 'first_pass_rate']
+    widths = [max(len(h), *(len(str(r.get(k, '') if r.get(k) is not None else '-')) for r in results))
+              for h, k in zip(headers, keys)] if results else [len(h) for h in headers]
+    out.write('  '.join(h.ljust(w) for h, w in zip(headers, widths)) + '\n')
+    for r in results:
+        out.write('  '.join(str(r.get(k) if r.get(k) is not None else '-').ljust(w)
+                            for k, w in zip(keys, widths)) + '\n')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='质量指标分组统计（创建周 × 团队 × 优先级 × 技术复杂度）')
+    parser.add_argument('path', help='export_requirements.py 的导出文件（CSV/NDJSON/Parquet 目录）')
+    parser.add_argument('--by', default=','.join(DEFAULT_DIMENSIONS),
+                        help=f"分组维度，逗号分隔（默认 {','.join(DEFAULT_DIMENSIONS)}；{WEEK} 为创建周）")
+    parser.add_argument('--from', dest='start', help='创建日期起（YYYY-MM-DD）')
+    parser.add_argument('--to', dest='end', help='创建日期止（YYYY-MM-DD）')
+    parser.add_argument('--config', default='quality-metrics.yaml', help='质量指标配置')
+    parser.add_argument('--format', choices=['table', 'csv', 'json'], default='table', help='输出格式')
+    parser.add_argument('-o', '--out', help='输出文件（默认标准输出）')
+    args = parser.parse_args(argv)
+
+    by = [d.strip() for d in args.by.split(',') if d.strip()]
+    started = time.perf_counter()
+    columns = load_columns(args.path, by, args.config)
+    loaded = time.perf_counter()
+    results = group_metrics(columns, by, columns.since(args.start, args.end))
+    computed = time.perf_counter()
+
+    out = open(args.out, 'w', encoding='utf-8-sig' if args.format == 'csv' else 'utf-8', newline='') \
+        if args.out else sys.stdout
+    try:
+        if args.format == 'json':
+            json.dump(results, out, ensure_ascii=False, indent=2)
+            out.write('\n')
+        elif args.format == 'csv':
+            if results:
+                writer = csv.DictWriter(out, fieldnames=list(results[0]))
+                writer.writeheader()
+                writer.writerows(results)
+        else:
+            _write_table(results, by, out)
+    finally:
+        if args.out:
+            out.close()
+    print(f"{len(columns)} 个工作项，{len(results)} 个分组（读取 {loaded - started:.2f} 秒，"
+          f"计算 {(computed - loaded) * 1000:.1f} 毫秒）", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
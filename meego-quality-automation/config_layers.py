@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+分层配置
+每个空间的配置文件只写与公共配置不同的部分，通过 extends 继承基础配置：
+
+    # spaces/team_a.yaml
+    extends: ../quality-metrics.yaml
+    project:
+      key: "team_a_project"
+    quality_metrics:
+      - key: "review_first_pass_rate"    # 按 key 匹配基础配置中的指标，只覆盖阈值
+        threshold:
+          excellent: "> 95"
+
+合并规则：字典逐键深度合并；元素都带 key 的列表按 key 合并（新 key 追加到末尾）；
+其余值（包括普通列表）由上层直接覆盖。
+
+同一内容的文件只解析一次，同一继承链的合并结果只计算一次（均按内容哈希缓存），
+批量同步上百个空间时公共层在内存中共享。解析结果在各空间之间共享，调用方不应修改。
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+EXTENDS_KEY = 'extends'
+MERGE_KEY = 'key'
+
+
+def _is_keyed_list(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(
+        isinstance(item, dict) and MERGE_KEY in item for item in value)
+
+
+def deep_merge(base: Any, overlay: Any) -> Any:
+    """把 overlay 深度合并到 base 上，返回新对象（未改动的子树与 base 共享）"""
+    if isinstance(base, dict) and isinstance(overlay, dict):
+        result = dict(base)
+        for key, value in overlay.items():
+            result[key] = deep_merge(base[key], value) if key in base else value
+        return result
+
+    if _is_keyed_list(base) and _is_keyed_list(overlay):
+        result = list(base)
+        index = {item[MERGE_KEY]: i for i, item in enumerate(result)}
+        for item in overlay:
+            position = index.get(item[MERGE_KEY])
+            if position is None:
+                index[item[MERGE_KEY]] = len(result)
+                result.append(item)
+            else:
+                result[position] = deep_merge(result[position], item)
+        return result
+
+    return overlay
+
+
+class LayeredConfigLoader:
+    """分层配置加载器（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (路径, mtime, 大小) -> 内容哈希，避免重复读取未变化的公共层
+        self._stat_digests: Dict[Tuple[str, int, int], str] = {}
+        # 内容哈希 -> 解析结果
+        self._layers: Dict[str, Dict] = {}
+        # 继承链（内容哈希元组）-> 合并结果
+        self._resolved: Dict[Tuple[str, ...], Dict] = {}
+        self.stats = {'files_read': 0, 'layers_parsed': 0, 'resolved': 0, 'resolve_hits': 0}
+
+    def load(self, path: str) -> Dict:
+        """加载配置文件并解析其继承链，返回生效配置"""
+        chain = self._chain(Path(path).resolve(), ())
+        key = tuple(digest for digest, _ in chain)
+
+        with self._lock:
+            resolved = self._resolved.get(key)
+            if resolved is not None:
+                self.stats['resolve_hits'] += 1
+                return resolved
+
+        resolved = {}
+        for _, layer in chain:
+            resolved = deep_merge(resolved, layer)
+
+        with self._lock:
+            self.stats['resolved'] += 1
+            return self._resolved.setdefault(key, resolved)
+
+    def _chain(self, path: Path, visiting: Tuple[Path, ...]) -> List[Tuple[str, Dict]]:
+        """按继承顺序（最底层在前）返回 (内容哈希, 去掉 extends 的配置层)"""
+        if path in visiting:
+            cycle = ' -> '.join(str(p) for p in visiting + (path,))
+            raise ValueError(f"配置继承存在循环: {cycle}")
+
+        digest, layer = self._read_layer(path)
+        parents = layer.get(EXTENDS_KEY) or []
+        if isinstance(parents, str):
+            parents = [parents]
+
+        chain: List[Tuple[str, Dict]] = []
+        for parent in parents:
+            chain.extend(self._chain((path.parent / parent).resolve(), visiting + (path,)))
+        chain.append((digest, {k: v for k, v in layer.items() if k != EXTENDS_KEY}))
+        return chain
+
+    def _read_layer(self, path: Path) -> Tuple[str, Dict]:
+        st = os.stat(path)
+        stat_key = (str(path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            digest = self._stat_digests.get(stat_key)
+            if digest is not None and digest in self._layers:
+                return digest, self._layers[digest]
+
+        raw = path.read_bytes()
+        digest = hashlib.sha1(raw).hexdigest()
+        with self._lock:
+            self.stats['files_read'] += 1
+            self._stat_digests[stat_key] = digest
+            layer = self._layers.get(digest)
+            if layer is not None:
+                return digest, layer
+
+        layer = yaml.safe_load(raw) or {}
+        if not isinstance(layer, dict):
+            raise ValueError(f"配置文件顶层必须是字典: {path}")
+        with self._lock:
+            self.stats['layers_parsed'] += 1
+            return digest, self._layers.setdefault(digest, layer)
+
+
+# 进程级默认加载器
+CONFIG_LOADER = LayeredConfigLoader()
+
+
+def load_layered_config(path: str, loader: Optional[LayeredConfigLoader] = None) -> Dict:
+    """加载（可能带 extends 的）配置文件，返回生效配置"""
+    return (loader or CONFIG_LOADER).load(path)
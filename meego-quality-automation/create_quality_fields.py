@@ -4,10 +4,20 @@
 基于捕获的真实API创建5个质量指标字段
 """
 
+import argparse
 import requests
 import json
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from requests.adapters import HTTPAdapter
+
+# 重试前等待的秒数（限流/服务端错误时指数退避）
+RETRY_BACKOFF = 0.5
+MAX_ATTEMPTS = 3
 
 class QualityFieldsCreator:
     """质量指标字段创建器"""
@@ -27,19 +37,16 @@ class QualityFieldsCreator:
             # 'session_id': 'xxx',
         }
 
+        # 共享会话：Cookie、公共请求头和连接池在所有请求（包括并发请求）之间复用
         self.session = requests.Session()
+        self.session.cookies.update(self.cookies)
+        self.session.headers.update(self._common_headers())
+        self._csrf_lock = threading.Lock()
 
-    def create_field(self, field_data: dict) -> bool:
-        """创建单个字段"""
-        print(f"\n📝 创建字段: {field_data['name']}...")
-
-        # API端点
-        url = f"{self.base_url}/goapi/v3/settings/{self.project_key}/{self.work_item_type}/field"
-
-        # 请求头
-        headers = {
+    def _common_headers(self) -> Dict[str, str]:
+        """除 CSRF token 外的固定请求头"""
+        return {
             "Content-Type": "application/json",
-            "x-meego-csrf-token": self.csrf_token,
             "x-meego-source": "web/-1.0.0.1490",
             "x-meego-from": "web",
             "x-meego-scope": "workObjectSettingfieldManagement",
@@ -51,11 +58,13 @@ class QualityFieldsCreator:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
         }
 
-        # 生成字段key
-        field_key = f"field_{uuid.uuid4().hex[:6]}"
+    @property
+    def field_url(self) -> str:
+        return f"{self.base_url}/goapi/v3/settings/{self.project_key}/{self.work_item_type}/field"
 
-        # 请求体
-        payload = {
+    def _payload(self, field_data: dict, field_key: str) -> dict:
+        """字段创建请求体"""
+        return {
             "sync_uuid": "",
             "field": {
                 "scope": ["story"],
@@ -81,33 +90,137 @@ class QualityFieldsCreator:
             }
         }
 
-        try:
-            response = self.session.post(
-                url,
-                json=payload,
-                headers=headers,
-                cookies=self.cookies,
-                timeout=10
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("code") == 0:
-                    print(f"  ✅ 字段创建成功!")
-                    return True
-                else:
-                    print(f"  ❌ API返回错误: {result.get('msg', '未知错误')}")
+    def _read_csrf_cookie(self) -> Optional[str]:
+        """从会话 Cookie 中读取 CSRF token"""
+        for cookie in self.session.cookies:
+            if 'csrf' in cookie.name.lower():
+                return cookie.value
+        return None
+
+    def refresh_csrf_token(self, rejected: str) -> bool:
+        """CSRF token 被拒绝时刷新（并发请求同时被拒绝时只刷新一次）
+
+        重新请求设置页面以获取新的 Cookie，再从中读取 token。
+
+        Returns:
+            token 是否已更新
+        """
+        with self._csrf_lock:
+            if self.csrf_token != rejected:
+                # 其他线程已经刷新过
+                return True
+            try:
+                self.session.get(self.session.headers["Referer"], timeout=10)
+            except requests.RequestException:
+                pass
+            token = self._read_csrf_cookie()
+            if token and token != rejected:
+                self.csrf_token = token
+                return True
+            return False
+
+    def _create_field_result(self, field_data: dict) -> Dict:
+        """创建单个字段，返回结果（不打印），失败时按状态重试
+
+        Returns:
+            {name, key, success, attempts, elapsed, error}
+        """
+        # 生成字段key（重试时保持不变）
+        field_key = f"field_{uuid.uuid4().hex[:6]}"
+        payload = self._payload(field_data, field_key)
+        result = {"name": field_data['name'], "key": field_key, "success": False,
+                  "attempts": 0, "elapsed": 0.0, "error": ""}
+        started = time.perf_counter()
+
+        # attempt 只统计失败重试；CSRF token 刷新后的重发不计入 MAX_ATTEMPTS（每个字段最多刷新一次）
+        attempt = 0
+        refreshed = False
+        while attempt < MAX_ATTEMPTS:
+            result["attempts"] += 1
+            token = self.csrf_token
+            try:
+                response = self.session.post(
+                    self.field_url,
+                    json=payload,
+                    headers={"x-meego-csrf-token": token},
+                    timeout=10
+                )
+            except requests.RequestException as e:
+                result["error"] = f"异常: {e}"
+                attempt += 1
+                if attempt < MAX_ATTEMPTS:
+                    time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+                continue
+
+            body = {}
+            try:
+                body = response.json()
+            except ValueError:
+                pass
+
+            if response.status_code == 200 and body.get("code") == 0:
+                result["success"] = True
+                result["error"] = ""
+                break
+
+            message = body.get('msg') or f"HTTP错误: {response.status_code} {response.text[:200]}"
+            result["error"] = message
+            if response.status_code == 403 or 'csrf' in str(message).lower():
+                if refreshed:
+                    break
+                if not self.refresh_csrf_token(token):
+                    result["error"] = f"{message}（CSRF token 刷新失败，请重新从浏览器获取）"
+                    break
+                refreshed = True
+            elif response.status_code == 429 or response.status_code >= 500:
+                attempt += 1
+                if attempt < MAX_ATTEMPTS:
+                    time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
             else:
-                print(f"  ❌ HTTP错误: {response.status_code}")
-                print(f"  响应: {response.text[:500]}")
+                break
+
+        result["elapsed"] = time.perf_counter() - started
+        return result
+
+    def create_field(self, field_data: dict) -> bool:
+        """创建单个字段"""
+        print(f"\n📝 创建字段: {field_data['name']}...")
+
+        result = self._create_field_result(field_data)
+        if result["success"]:
+            print(f"  ✅ 字段创建成功!")
+        else:
+            print(f"  ❌ {result['error']}")
+        return result["success"]
+
+    def create_fields_concurrently(self, fields: List[dict], concurrency: int = 4) -> List[Dict]:
+        """并发创建字段（有界线程池，共享会话、Cookie 和 CSRF token）
+
+        Returns:
+            与 fields 顺序一致的结果列表
+        """
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(self._create_field_result, fields))
 
-        except Exception as e:
-            print(f"  ❌ 异常: {e}")
+    @staticmethod
+    def print_results_table(results: List[Dict]):
+        """输出汇总结果表"""
+        print(f"\n  {'状态':<4} {'字段名称':<24} {'字段key':<14} {'尝试':>4} {'耗时(秒)':>9}  说明")
+        print("  " + "-" * 78)
+        for r in results:
+            status = "✅" if r["success"] else "❌"
+            print(f"  {status:<4} {r['name']:<24} {r['key'] or '-':<14} {r['attempts']:>4} "
+                  f"{r['elapsed']:>9.2f}  {r['error']}")
 
-        return False
+    def create_all_quality_fields(self, concurrency: int = 1):
+        """创建所有质量指标字段
 
-    def create_all_quality_fields(self):
-        """创建所有质量指标字段"""
+        Args:
+            concurrency: 并发请求数；1 为逐个创建（每个字段间隔1秒）
+        """
         print("\n📊 开始创建5个质量指标字段...")
         print("=" * 60)
 
@@ -140,40 +253,43 @@ class QualityFieldsCreator:
             }
         ]
 
-        # 创建字段
-        results = {}
-        success_count = 0
-
         # 跳过第一个已创建的字段
         print("\n✅ Lead Time（交付周期）字段已通过UI创建")
-        results["Lead Time（交付周期）"] = True
-        success_count += 1
+        rows = [{"name": fields[0]['name'], "key": "", "success": True, "attempts": 0,
+                 "elapsed": 0.0, "error": "已通过UI创建"}]
 
         # 创建剩余字段
-        for field in fields[1:]:  # 从第二个开始
-            success = self.create_field(field)
-            results[field['name']] = success
-
-            if success:
-                success_count += 1
+        if concurrency > 1:
+            print(f"\n⚡ 并发创建 {len(fields) - 1} 个字段（并发数 {concurrency}）...")
+            rows += self.create_fields_concurrently(fields[1:], concurrency)
+        else:
+            for field in fields[1:]:  # 从第二个开始
+                print(f"\n📝 创建字段: {field['name']}...")
+                row = self._create_field_result(field)
+                print("  ✅ 字段创建成功!" if row["success"] else f"  ❌ {row['error']}")
+                rows.append(row)
 
-            # 避免请求过快
-            time.sleep(1)
+                # 避免请求过快
+                time.sleep(1)
 
+        success_count = sum(1 for row in rows if row["success"])
         print("\n" + "=" * 60)
-        print(f"📈 配置结果: {success_count}/5 个字段创建成功")
+        print(f"📈 配置结果: {success_count}/{len(fields)} 个字段创建成功")
         print("=" * 60)
 
         # 显示详细结果
         print("\n详细结果:")
-        for name, success in results.items():
-            status = "✅" if success else "❌"
-            print(f"  {status} {name}")
+        self.print_results_table(rows)
 
-        return results
+        return {row["name"]: row["success"] for row in rows}
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='飞书项目质量指标字段自动创建工具')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='并发请求数（默认1，逐个创建）')
+    args = parser.parse_args()
+
     print("""
 ╔══════════════════════════════════════════════════════════════╗
 ║     🚀 飞书项目质量指标字段自动创建工具                     ║
@@ -191,7 +307,7 @@ def main():
     input("\n按Enter键继续...")
 
     creator = QualityFieldsCreator()
-    results = creator.create_all_quality_fields()
+    results = creator.create_all_quality_fields(concurrency=args.concurrency)
 
     if all(results.values()):
         print("\n🎉 所有质量指标字段创建成功!")
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+质量指标看板
+根据 quality-metrics.yaml 的 5 个指标（目标值、阈值区间）和 metric_store 的预聚合数据，
+生成单个自包含的 HTML 看板（无外部依赖，可直接离线打开或作为附件发送）：
+
+    概览          每个指标最近一个月的值、所处区间和环比
+    指标分区      月度趋势（叠加阈值区间，可切换空间）+ 空间 × 最近 12 个月热力表
+    Lead Time 分位数   quantile_sketch 的 p50/p85/p95（总体、各阶段、各空间）
+
+所有聚合值在生成时算好，以紧凑 JSON 嵌入页面，浏览器只负责绘制；50 个空间 × 3 年约 1 万个数值，页面即开即渲染。
+每个分区按 (模板版本, 指标配置, 数据签名) 计算指纹并缓存渲染结果，数据未变化的分区直接复用，只重新生成变化的分区。
+
+用法:
+    python dashboard.py
+    python dashboard.py --db quality-metrics.db -o quality-dashboard.html --months 36
+    python dashboard.py --force             # 忽略缓存全部重新生成
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import math
+import os
+import re
+import sys
+import time
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config_layers import load_layered_config
+from metric_store import DEFAULT_DB, MetricStore, bucket_start
+from quantile_sketch import DEFAULT_QUANTILES, SketchStore
+
+# 修改分区的渲染方式或数据结构时递增，使旧缓存失效
+TEMPLATE_VERSION = 1
+
+DEFAULT_OUTPUT = 'quality-dashboard.html'
+DEFAULT_CACHE_DIR = '.dashboard-cache'
+
+# 阈值区间按此顺序匹配，先匹配先得
+BANDS = ('excellent', 'good', 'warning', 'critical')
+BAND_NAMES = {'excellent': '优秀', 'good': '良好', 'warning': '预警', 'critical': '严重'}
+
+# 热力表展示的月数
+HEATMAP_MONTHS = 12
+
+_THRESHOLD = re.compile(r'^\s*(?:(<=|>=|<|>)\s*(-?[\d.]+)|(-?[\d.]+)\s*-\s*(-?[\d.]+))\s*$')
+
+
+def parse_threshold(text: str) -> Tuple[Optional[float], Optional[float], bool, bool]:
+    """阈值文本 → (下界, 上界, 含下界, 含上界)；支持 "< 20"、"<= 3"、"> 45"、">= 1"、"20-30"，无界为 None"""
+    match = _THRESHOLD.match(str(text))
+    if not match:
+        raise ValueError(f"无法解析阈值: {text!r}")
+    op, bound, low, high = match.groups()
+    if op is None:
+        return float(low), float(high), True, True
+    value = float(bound)
+    if op in ('<', '<='):
+        return None, value, False, op == '<='
+    return value, None, op == '>=', False
+
+
+def metric_bands(metric: Dict) -> List[List]:
+    """指标的阈值区间 [[区间, 下界, 上界, 含下界, 含上界], ...]（按 BANDS 顺序）"""
+    thresholds = metric.get('threshold') or {}
+    return [[band, *parse_threshold(thresholds[band])] for band in BANDS if band in thresholds]
+
+
+def classify(value: Optional[float], bands: Sequence[Sequence]) -> Optional[str]:
+    """值所处的阈值区间（与页面脚本的 classify 一致）
+
+    阈值按整数书写时区间之间有空隙（如 "<= 3" 与 "4-5" 之间的 3.5），不落在任何区间的值归入最近的区间
+    """
+    if value is None or not bands:
+        return None
+    for band, low, high, low_inclusive, high_inclusive in bands:
+        if low is not None and (value < low or (value == low and not low_inclusive)):
+            continue
+        if high is not None and (value > high or (value == high and not high_inclusive)):
+            continue
+        return band
+    return min(bands, key=lambda b: max((b[1] - value) if b[1] is not None else 0,
+                                        (value - b[2]) if b[2] is not None else 0))[0]
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return round(value, 2)
+
+
+def _compact_json(data) -> str:
+    """紧凑 JSON，转义 </ 以便安全嵌入 <script>"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+def _fingerprint(*parts) -> str:
+    return hashlib.sha1(json.dumps([TEMPLATE_VERSION, *parts], ensure_ascii=False, sort_keys=True,
+                                   default=str).encode('utf-8')).hexdigest()
+
+
+# ----------------------------------------------------------------------
+# 分区数据
+# ----------------------------------------------------------------------
+
+def month_window(store: MetricStore, metrics: Sequence[Dict], months: int) -> Tuple[int, int]:
+    """看板的月份区间：以各指标数据的最新月份为终点，向前取 months 个月"""
+    ends = [bounds[1] for bounds in (store.bounds(m['key']) for m in metrics) if bounds]
+    end = bucket_start(max(ends) if ends else date.today().toordinal(), 'month')
+    d = date.fromordinal(end)
+    index = d.year * 12 + d.month - 1 - (months - 1)
+    return date(index // 12, index % 12 + 1, 1).toordinal(), end
+
+
+def metric_section_data(store: MetricStore, metric: Dict, start: int, end: int) -> Dict:
+    """指标分区的数据：总体月度序列 + 各空间月度序列（列式，按月份对齐）"""
+    overall = store.query(metric['key'], start, end, resolution='month')
+    by_project = store.query(metric['key'], start, end, resolution='month', group_by='project')
+
+    months, d = [], date.fromordinal(start)
+    while d.toordinal() <= end:
+        months.append(d.isoformat()[:7])
+        d = date(d.year + d.month // 12, d.month % 12 + 1, 1)
+    position = {m: i for i, m in enumerate(months)}
+
+    overall_values, counts = [None] * len(months), [0] * len(months)
+    for point in overall:
+        i = position[point['date'][:7]]
+        overall_values[i], counts[i] = _round(point['mean']), point['count']
+
+    series: Dict[str, List] = {}
+    for point in by_project:
+        values = series.setdefault(point['project'], [None] * len(months))
+        values[position[point['date'][:7]]] = _round(point['mean'])
+
+    return {
+        'key': metric['key'],
+        'name': metric.get('name', metric['key']),
+        'unit': metric.get('unit') or ('%' if metric.get('type') == 'percentage' else ''),
+        'target': metric.get('target', ''),
+        'description': metric.get('description', ''),
+        'bands': metric_bands(metric),
+        'months': months,
+        'overall': overall_values,
+        'counts': counts,
+        'projects': sorted(series),
+        'series': [series[p] for p in sorted(series)],
+        'recent': HEATMAP_MONTHS,
+    }
+
+
+def quantile_section_data(sketches: SketchStore, qs: Sequence[float] = DEFAULT_QUANTILES) -> Dict:
+    """Lead Time 分位数分区：每个指标（lead_time、stage:<阶段>）的总体与各空间分位数"""
+    metrics = sorted(sketches.metrics(), key=lambda m: (m != 'lead_time', m))
+    projects = sketches.projects()
+    rows = []
+    for metric in metrics:
+        overall = sketches.quantiles(metric, qs)
+        row = {'metric': metric, 'overall': [overall['count']] + [_round(overall[f'p{q * 100:g}']) for q in qs],
+               'projects': []}
+        for project in projects:
+            result = sketches.quantiles(metric, qs, project=project)
+            row['projects'].append([result['count']] + [_round(result[f'p{q * 100:g}']) for q in qs])
+        rows.append(row)
+    return {'quantiles': [f'p{q * 100:g}' for q in qs], 'projects': projects, 'metrics': rows}
+
+
+def metric_summary(data: Dict) -> Dict:
+    """概览卡片：最近一个有数据的月份、上一个月份的值和所处区间"""
+    points = [(m, v) for m, v in zip(data['months'], data['overall']) if v is not None]
+    latest = points[-1] if points else (None, None)
+    previous = points[-2][1] if len(points) > 1 else None
+    return {'key': data['key'], 'name': data['name'], 'unit': data['unit'], 'target': data['target'],
+            'month': latest[0], 'value': latest[1], 'previous': previous,
+            'band': classify(latest[1], data['bands']), 'projects': len(data['projects'])}
+
+
+# ----------------------------------------------------------------------
+# 分区渲染
+# ----------------------------------------------------------------------
+
+def _embed(section_id: str, data) -> str:
+    return f'<script type="application/json" data-section="{section_id}">{_compact_json(data)}</script>'
+
+
+def render_summary(summaries: List[Dict]) -> str:
+    cards = []
+    for s in summaries:
+        value = '-' if s['value'] is None else f"{s['value']:g}"
+        delta = ''
+        if s['value'] is not None and s['previous'] is not None:
+            change = s['value'] - s['previous']
+            delta = f'<span class="delta">环比 {change:+.2f}</span>'
+        band = s['band'] or 'none'
+        cards.append(
+            f'<a class="card band-{band}" href="#metric-{html.escape(s["key"])}">'
+            f'<div class="card-name">{html.escape(s["name"])}</div>'
+            f'<div class="card-value">{value}<small>{html.escape(s["unit"])}</small></div>'
+            f'<div class="card-meta">{BAND_NAMES.get(band, "无数据")} · 目标 {html.escape(s["target"])}'
+            f' · {html.escape(s["month"] or "-")}</div>{delta}</a>')
+    return f'<section id="summary"><h2>概览</h2><div class="cards">{"".join(cards)}</div></section>'
+
+
+def render_metric(data: Dict) -> str:
+    section_id = f'metric-{data["key"]}'
+    bands = ''.join(
+        f'<span class="legend band-{b[0]}">{BAND_NAMES[b[0]]}</span>' for b in data['bands'])
+    return (
+        f'<section id="{html.escape(section_id)}" class="metric">'
+        f'<h2>{html.escape(data["name"])} <small>目标 {html.escape(data["target"])}</small></h2>'
+        f'<p class="desc">{html.escape(data["description"])} {bands}</p>'
+        f'<label>空间 <select class="project-select"><option value="-1">全部空间</option></select></label>'
+        f'<div class="chart"></div><h3>各空间最近 {HEATMAP_MONTHS} 个月</h3><div class="heatmap"></div>'
+        f'{_embed(section_id, data)}</section>')
+
+
+def render_quantiles(data: Dict) -> str:
+    section_id = 'lead-time-quantiles'
+    return (f'<section id="{section_id}"><h2>Lead Time 分位数 <small>天，全部时间</small></h2>'
+            f'<div class="quantiles"></div>{_embed(section_id, data)}</section>')
+
+
+_STYLE = """
+body{font-family:-apple-system,"PingFang SC","Microsoft YaHei",sans-serif;margin:0;background:#f5f6f8;color:#1f2329}
+header{background:#1f2329;color:#fff;padding:16px 32px}header small{color:#a0a6ad;margin-left:12px}
+main{max-width:1200px;margin:0 auto;padding:16px 32px}
+section{background:#fff;border-radius:8px;padding:16px 24px;margin:16px 0;box-shadow:0 1px 2px rgba(0,0,0,.06)}
+h2 small,h3{color:#646a73;font-weight:normal;font-size:14px}.desc{color:#646a73;font-size:13px}
+.cards{display:grid;grid-template-columns:repeat(auto-fit,minmax(200px,1fr));gap:12px}
+.card{display:block;padding:12px 16px;border-radius:6px;border-left:6px solid #c9cdd4;color:inherit;text-decoration:none;background:#fafbfc}
+.card-name{font-size:13px;color:#646a73}.card-value{font-size:28px;font-weight:600}.card-value small{font-size:13px;margin-left:4px}
+.card-meta,.delta{font-size:12px;color:#646a73}
+.card.band-excellent{border-color:#2ea121}.card.band-good{border-color:#8fd460}.card.band-warning{border-color:#f5a623}.card.band-critical{border-color:#f54a45}
+.legend{display:inline-block;padding:0 6px;margin-left:4px;border-radius:3px;font-size:12px}
+.band-excellent.legend,td.band-excellent{background:#d9f5d6}.band-good.legend,td.band-good{background:#eef9e0}
+.band-warning.legend,td.band-warning{background:#fdefd2}.band-critical.legend,td.band-critical{background:#fde2e2}
+.chart svg{width:100%;height:240px}.chart text{font-size:11px;fill:#8f959e}
+table{border-collapse:collapse;font-size:12px;width:100%}th,td{padding:3px 6px;text-align:right;border-bottom:1px solid #eff0f1}
+th:first-child,td:first-child{text-align:left}.heatmap{max-height:420px;overflow:auto}
+"""
+
+# 页面脚本：读取各分区的嵌入 JSON 绘制趋势图、热力表和分位数表
+_SCRIPT = r"""
+(function(){
+var COLORS={excellent:'#2ea121',good:'#8fd460',warning:'#f5a623',critical:'#f54a45'};
+function classify(v,bands){if(v===null||!bands.length)return null;var best=null,gap=Infinity;
+ for(var i=0;i<bands.length;i++){var b=bands[i];
+ if(b[1]!==null&&(v<b[1]||(v===b[1]&&!b[3]))){if(b[1]-v<gap){gap=b[1]-v;best=b[0];}continue;}
+ if(b[2]!==null&&(v>b[2]||(v===b[2]&&!b[4]))){if(v-b[2]<gap){gap=v-b[2];best=b[0];}continue;}return b[0];}return best;}
+function fmt(v){return v===null||v===undefined?'-':String(v);}
+function esc(s){return String(s).replace(/[&<>"]/g,function(c){return{'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;'}[c];});}
+function chart(el,d,values){
+ var W=720,H=240,L=44,R=8,T=8,B=24,n=d.months.length,nums=values.filter(function(v){return v!==null;});
+ d.bands.forEach(function(b){if(b[1]!==null)nums.push(b[1]);if(b[2]!==null)nums.push(b[2]);});
+ var lo=Math.min.apply(null,nums.concat([0])),hi=Math.max.apply(null,nums.concat([1]));hi+=(hi-lo)*0.05;
+ function x(i){return L+(n>1?i*(W-L-R)/(n-1):0);}function y(v){return T+(hi-v)*(H-T-B)/(hi-lo||1);}
+ var s='<svg viewBox="0 0 '+W+' '+H+'" preserveAspectRatio="none">';
+ d.bands.forEach(function(b){var top=y(b[2]===null?hi:Math.min(b[2],hi)),bot=y(b[1]===null?lo:Math.max(b[1],lo));
+  if(bot>top)s+='<rect x="'+L+'" y="'+top+'" width="'+(W-L-R)+'" height="'+(bot-top)+'" fill="'+COLORS[b[0]]+'" opacity="0.12"/>';});
+ for(var k=0;k<=4;k++){var v=lo+(hi-lo)*k/4;s+='<text x="'+(L-4)+'" y="'+(y(v)+4)+'" text-anchor="end">'+v.toFixed(1)+'</text>';}
+ var step=Math.max(1,Math.ceil(n/12));for(var i=0;i<n;i+=step)s+='<text x="'+x(i)+'" y="'+(H-6)+'" text-anchor="middle">'+d.months[i]+'</text>';
+ var path='',pen=false;values.forEach(function(v,i){if(v===null){pen=false;return;}path+=(pen?'L':'M')+x(i).toFixed(1)+' '+y(v).toFixed(1);pen=true;});
+ s+='<path d="'+path+'" fill="none" stroke="#3370ff" stroke-width="2"/>';
+ values.forEach(function(v,i){if(v!==null)s+='<circle cx="'+x(i)+'" cy="'+y(v)+'" r="2.5" fill="'+(COLORS[classify(v,d.bands)]||'#3370ff')+'"><title>'+d.months[i]+': '+v+'</title></circle>';});
+ el.innerHTML=s+'</svg>';}
+function heatmap(el,d){
+ var from=Math.max(0,d.months.length-d.recent),months=d.months.slice(from),order=d.projects.map(function(p,i){return i;});
+ function last(i){var s=d.series[i];for(var j=s.length-1;j>=0;j--)if(s[j]!==null)return s[j];return null;}
+ order.sort(function(a,b){return (last(b)===null?-1e18:last(b))-(last(a)===null?-1e18:last(a));});
+ var h='<table><tr><th>空间</th>'+months.map(function(m){return '<th>'+m+'</th>';}).join('')+'</tr>';
+ order.forEach(function(i){h+='<tr><td>'+esc(d.projects[i])+'</td>'+d.series[i].slice(from).map(function(v){
+  var b=classify(v,d.bands);return '<td'+(b?' class="band-'+b+'"':'')+'>'+fmt(v)+'</td>';}).join('')+'</tr>';});
+ el.innerHTML=h+'</table>';}
+function quantiles(el,d){
+ var head='<tr><th>指标</th><th>空间</th><th>样本</th>'+d.quantiles.map(function(q){return '<th>'+q+'</th>';}).join('')+'</tr>',h='<table>'+head;
+ d.metrics.forEach(function(m){var name=m.metric==='lead_time'?'Lead Time':m.metric.replace('stage:','阶段：');
+  h+='<tr><td><b>'+esc(name)+'</b></td><td>全部</td>'+m.overall.map(function(v){return '<td><b>'+fmt(v)+'</b></td>';}).join('')+'</tr>';
+  m.projects.forEach(function(r,i){if(r[0])h+='<tr><td></td><td>'+esc(d.projects[i])+'</td>'+r.map(function(v){return '<td>'+fmt(v)+'</td>';}).join('')+'</tr>';});});
+ el.innerHTML=h+'</table>';}
+document.querySelectorAll('script[data-section]').forEach(function(node){
+ var d=JSON.parse(node.textContent),sec=node.parentNode;
+ if(d.quantiles){quantiles(sec.querySelector('.quantiles'),d);return;}
+ var sel=sec.querySelector('.project-select'),el=sec.querySelector('.chart');
+ d.projects.forEach(function(p,i){var o=document.createElement('option');o.value=i;o.textContent=p;sel.appendChild(o);});
+ sel.onchange=function(){var i=+sel.value;chart(el,d,i<0?d.overall:d.series[i]);};
+ chart(el,d,d.overall);heatmap(sec.querySelector('.heatmap'),d);});
+})();
+"""
+
+
+def render_page(title: str, subtitle: str, fragments: Sequence[str]) -> str:
+    return (f'<!DOCTYPE html><html lang="zh-CN"><head><meta charset="utf-8">'
+            f'<meta name="viewport" content="width=device-width,initial-scale=1">'
+            f'<title>{html.escape(title)}</title><style>{_STYLE}</style></head><body>'
+            f'<header><b>{html.escape(title)}</b><small>{html.escape(subtitle)}</small></header>'
+            f'<main>{"".join(fragments)}</main><script>{_SCRIPT}</script></body></html>')
+
+
+# ----------------------------------------------------------------------
+# 增量生成
+# ----------------------------------------------------------------------
+
+class SectionCache:
+    """分区渲染缓存：每个分区一个 JSON 文件 {fingerprint, html, summary}
+
+    Args:
+        directory: 缓存目录
+        force: 为 True 时忽略已有缓存（仍会写入新结果）
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, force: bool = False):
+        self.directory = directory
+        self.force = force
+        self.rendered: List[str] = []
+        self.reused: List[str] = []
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, re.sub(r'[^\w.-]', '_', name) + '.json')
+
+    def get(self, name: str, fingerprint: str) -> Optional[Dict]:
+        if self.force:
+            return None
+        try:
+            with open(self._path(name), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('fingerprint') != fingerprint:
+            return None
+        self.reused.append(name)
+        return entry
+
+    def put(self, name: str, fingerprint: str, fragment: str, summary: Optional[Dict] = None) -> Dict:
+        entry = {'fingerprint': fingerprint, 'html': fragment, 'summary': summary}
+        tmp = self._path(name) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, self._path(name))
+        self.rendered.append(name)
+        return entry
+
+
+def build_dashboard(config: Dict, store: MetricStore, sketches: Optional[SketchStore] = None,
+                    months: int = 36, cache: Optional[SectionCache] = None) -> str:
+    """生成看板 HTML；指纹未变化的分区直接使用缓存的渲染结果"""
+    cache = cache or SectionCache()
+    metrics = config.get('quality_metrics', [])
+    start, end = month_window(store, metrics, months)
+
+    fragments, summaries = [], []
+    for metric in metrics:
+        name = f'metric-{metric["key"]}'
+        fingerprint = _fingerprint(metric, start, end, store.signature(metric['key']))
+        entry = cache.get(name, fingerprint)
+        if entry is None:
+            data = metric_section_data(store, metric, start, end)
+            entry = cache.put(name, fingerprint, render_metric(data), metric_summary(data))
+        fragments.append(entry['html'])
+        summaries.append(entry['summary'])
+
+    fingerprint = _fingerprint(summaries)
+    entry = cache.get('summary', fingerprint) or cache.put('summary', fingerprint, render_summary(summaries))
+    fragments.insert(0, entry['html'])
+
+    if sketches is not None:
+        fingerprint = _fingerprint(sketches.digest())
+        entry = cache.get('lead-time-quantiles', fingerprint)
+        if entry is None:
+            data = quantile_section_data(sketches)
+            entry = cache.put('lead-time-quantiles', fingerprint, render_quantiles(data) if data['metrics'] else '')
+        fragments.append(entry['html'])
+
+    title = (config.get('project') or {}).get('name') or '质量指标看板'
+    subtitle = (f"{date.fromordinal(start).isoformat()[:7]} ~ {date.fromordinal(end).isoformat()[:7]}"
+                f" · 生成于 {time.strftime('%Y-%m-%d %H:%M')}")
+    return render_page(title, subtitle, fragments)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='生成质量指标 HTML 看板')
+    parser.add_argument('--config', default='quality-metrics.yaml', help='质量指标配置')
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'指标数据库（默认 {DEFAULT_DB}）')
+    parser.add_argument('-o', '--out', default=DEFAULT_OUTPUT, help=f'输出文件（默认 {DEFAULT_OUTPUT}）')
+    parser.add_argument('--months', type=int, default=36, help='趋势月数（默认 36）')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'分区缓存目录（默认 {DEFAULT_CACHE_DIR}）')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，全部重新生成')
+    parser.add_argument('--no-quantiles', action='store_true', help='不包含 Lead Time 分位数分区')
+    args = parser.parse_args(argv)
+
+    config = load_layered_config(args.config)
+    cache = SectionCache(args.cache_dir, args.force)
+    started = time.perf_counter()
+    with MetricStore(args.db) as store:
+        sketches = None if args.no_quantiles else SketchStore(args.db)
+        try:
+            page = build_dashboard(config, store, sketches, args.months, cache)
+        finally:
+            if sketches is not None:
+                sketches.close()
+
+    tmp = args.out + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(page)
+    os.replace(tmp, args.out)
+    print(f"已生成 {args.out}（{len(page.encode('utf-8')) / 1024:.0f} KB，重新生成 {len(cache.rendered)} 个分区，"
+          f"复用 {len(cache.reused)} 个，{time.perf_counter() - started:.2f} 秒）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
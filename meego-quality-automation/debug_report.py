@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+调试报告写入
+捕获到的请求逐条以 NDJSON（每行一个 JSON 对象）追加写入分卷文件，超过大小上限时切换到下一卷；
+结束时写出一个小的汇总索引（分卷列表、端点统计、API模式）。长时间抓包时内存占用不随请求数增长。
+
+    api_debug_report.json                # 汇总索引
+    api_debug_report.00001.ndjson        # 请求记录分卷
+    api_debug_report.00002.ndjson
+"""
+
+import glob
+import json
+import os
+import tempfile
+import threading
+from collections import Counter
+from dataclasses import asdict, is_dataclass
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def to_jsonable(value: Any) -> Any:
+    """json.dump 的 default：集合转为排序后的列表，Counter 的键转为字符串，dataclass 转为字典"""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, Counter):
+        return {str(k): v for k, v in value.items()}
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class NDJSONReportWriter:
+    """按大小分卷的 NDJSON 追加写入器（线程安全）
+
+    Args:
+        index_path: 汇总索引文件路径（*.json），分卷文件与其同名、带序号
+        max_bytes: 单个分卷的大小上限
+        max_files: 最多保留的分卷数（超过时删除最旧的），None 表示不限
+    """
+
+    def __init__(self, index_path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_files: Optional[int] = None):
+        self.index_path = index_path
+        self.prefix = index_path[:-5] if index_path.endswith('.json') else index_path
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.records = 0
+        self.files: List[Dict] = []
+        self._fp = None
+        self._lock = threading.Lock()
+        # 覆盖同名报告时清理上一次遗留的分卷
+        for stale in glob.glob(glob.escape(self.prefix) + '.*.ndjson'):
+            os.remove(stale)
+
+    def _part_path(self, number: int) -> str:
+        return f"{self.prefix}.{number:05d}.ndjson"
+
+    def _rotate(self):
+        if self._fp is not None:
+            self._fp.close()
+        number = self.files[-1]['number'] + 1 if self.files else 1
+        path = self._part_path(number)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._fp = open(path, 'wb')
+        self.files.append({'number': number, 'file': os.path.basename(path), 'records': 0, 'bytes': 0})
+
+        if self.max_files is not None:
+            while len(self.files) > self.max_files:
+                oldest = self.files.pop(0)
+                try:
+                    os.remove(os.path.join(directory, oldest['file']))
+                except FileNotFoundError:
+                    pass
+
+    def write(self, record: Dict):
+        """追加一条记录"""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'),
+                          default=to_jsonable).encode('utf-8') + b'\n'
+        with self._lock:
+            current = self.files[-1] if self.files else None
+            if current is None or (current['bytes'] and current['bytes'] + len(line) > self.max_bytes):
+                self._rotate()
+                current = self.files[-1]
+            self._fp.write(line)
+            current['records'] += 1
+            current['bytes'] += len(line)
+            self.records += 1
+
+    def close(self, summary: Optional[Dict] = None):
+        """关闭当前分卷并写出汇总索引（原子替换）
+
+        Args:
+            summary: 写入索引的附加内容（端点统计、API模式等）
+        """
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+            index = dict(summary or {})
+            index['total_records'] = self.records
+            index['files'] = [{k: v for k, v in f.items() if k != 'number'} for f in self.files]
+
+            directory = os.path.dirname(os.path.abspath(self.index_path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.report-', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False, indent=2, default=to_jsonable)
+            os.replace(tmp_path, self.index_path)
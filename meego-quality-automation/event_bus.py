@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+结构化事件流
+同步过程中的输出（API请求、字段/节点结果、阶段标题）以事件形式发布到进程级事件总线，
+由后台线程按固定间隔批量交给输出器：
+
+- PrettyEmitter：终端渲染（彩色、单行实时进度；单个 API 请求只计入进度，不逐条打印）
+- JSONLinesEmitter：每个事件一行 JSON，适合 CI 日志采集
+- SilentEmitter：不输出，只保留聚合统计
+
+发布事件只是追加到队列，不在调用线程里做 I/O；终端输出按批写入，开销与请求速率无关。
+"""
+
+import atexit
+import json
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import IO, Any, Deque, Dict, List, Optional
+
+# 事件级别（debug 级事件在终端中只计入进度）
+LEVELS = ('debug', 'info', 'notice', 'warning', 'error')
+
+
+class Event:
+    """一条事件"""
+
+    __slots__ = ('kind', 'level', 'message', 'fields', 'ts')
+
+    def __init__(self, kind: str, level: str, message: str, fields: Dict[str, Any]):
+        self.kind = kind
+        self.level = level
+        self.message = message
+        self.fields = fields
+        self.ts = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'ts': round(self.ts, 6), 'kind': self.kind, 'level': self.level}
+        if self.message:
+            data['message'] = self.message
+        data.update(self.fields)
+        return data
+
+
+class Progress:
+    """聚合进度：API 请求计数与各类条目（字段、节点）的结果计数"""
+
+    def __init__(self):
+        self.requests = 0
+        self.responses = Counter()
+        self.retries = 0
+        self.items: Dict[str, Counter] = {}
+
+    def update(self, event: Event):
+        kind = event.kind
+        if kind == 'api.request':
+            self.requests += event.fields.get('count', 1)
+        elif kind == 'api.response':
+            self.responses['ok' if event.fields.get('ok') else 'error'] += 1
+        elif kind == 'api.retry':
+            self.retries += 1
+        status = event.fields.get('status')
+        if status is not None and not kind.startswith('api.'):
+            self.items.setdefault(kind, Counter())[status] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'ok': self.responses['ok'],
+            'errors': self.responses['error'],
+            'retries': self.retries,
+            'items': {kind: dict(counts) for kind, counts in self.items.items()},
+        }
+
+
+class SilentEmitter:
+    """不输出"""
+
+    def write(self, events: List[Event], progress: Progress):
+        pass
+
+    def close(self, progress: Progress):
+        pass
+
+
+class JSONLinesEmitter:
+    """每个事件一行 JSON；结束时输出一行汇总"""
+
+    def __init__(self, stream: Optional[IO[str]] = None):
+        self._stream = stream
+
+    @property
+    def stream(self) -> IO[str]:
+        return self._stream or sys.stdout
+
+    def write(self, events: List[Event], progress: Progress):
+        if events:
+            self.stream.write(''.join(
+                json.dumps(e.to_dict(), ensure_ascii=False, default=str) + '\n' for e in events))
+            self.stream.flush()
+
+    def close(self, progress: Progress):
+        self.stream.write(json.dumps({'ts': round(time.time(), 6), 'kind': 'summary',
+                                      'level': 'notice', **progress.snapshot()},
+                                     ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+
+class PrettyEmitter:
+    """终端渲染：info 及以上级别的事件按批输出，TTY 上最后一行显示实时进度
+
+    Args:
+        stream: 输出流（默认当前的 sys.stdout）
+        color: 是否使用 ANSI 颜色，None 表示仅在 TTY 上使用
+        min_level: 逐条输出的最低级别
+    """
+
+    COLORS = {
+        'ok': '\033[92m', 'skip': '\033[93m', 'fail': '\033[91m',
+        'warning': '\033[93m', 'error': '\033[91m', 'notice': '\033[94m',
+    }
+    BOLD = '\033[1m'
+    ENDC = '\033[0m'
+
+    def __init__(self, stream: Optional[IO[str]] = None, color: Optional[bool] = None,
+                 min_level: str = 'info'):
+        self._stream = stream
+        self.color = color
+        self.min_level = LEVELS.index(min_level)
+        self._progress_shown = False
+
+    @property
+    def stream(self) -> IO[str]:
+        return self._stream or sys.stdout
+
+    def _is_tty(self) -> bool:
+        isatty = getattr(self.stream, 'isatty', None)
+        return bool(isatty and isatty())
+
+    def _use_color(self) -> bool:
+        return self._is_tty() if self.color is None else self.color
+
+    def _format(self, event: Event, use_color: bool) -> str:
+        text = event.message
+        if not use_color:
+            return text
+        color = self.COLORS.get(event.fields.get('status')) or self.COLORS.get(event.level)
+        if event.fields.get('bold'):
+            color = (color or '') + self.BOLD
+        return f"{color}{text}{self.ENDC}" if color else text
+
+    @staticmethod
+    def progress_line(progress: Progress) -> str:
+        snap = progress.snapshot()
+        parts = [f"📡 API请求 {snap['requests']}（成功 {snap['ok']}，失败 {snap['errors']}"
+                 + (f"，重试 {snap['retries']}" if snap['retries'] else '') + '）']
+        for kind, counts in snap['items'].items():
+            detail = ' '.join(f"{status} {count}" for status, count in sorted(counts.items()))
+            parts.append(f"{kind}: {detail}")
+        return ' | '.join(parts)
+
+    def write(self, events: List[Event], progress: Progress):
+        use_color = self._use_color()
+        lines = [self._format(e, use_color) for e in events
+                 if e.message and LEVELS.index(e.level) >= self.min_level]
+        tty = self._is_tty()
+        if not lines and not (tty and progress.requests):
+            return
+
+        out = []
+        if tty and self._progress_shown:
+            out.append('\r\033[K')
+        if lines:
+            out.append('\n'.join(lines) + '\n')
+        if tty and progress.requests:
+            out.append(self.progress_line(progress))
+            self._progress_shown = True
+        else:
+            self._progress_shown = False
+        self.stream.write(''.join(out))
+        self.stream.flush()
+
+    def close(self, progress: Progress):
+        if self._progress_shown:
+            self.stream.write('\r\033[K')
+            self._progress_shown = False
+        if progress.requests:
+            self.stream.write(self.progress_line(progress) + '\n')
+        self.stream.flush()
+
+
+class EventBus:
+    """进程级事件总线（线程安全）
+
+    Args:
+        emitter: 输出器，默认 PrettyEmitter
+        flush_interval: 后台批量输出的间隔（秒）
+    """
+
+    def __init__(self, emitter=None, flush_interval: float = 0.2):
+        self.emitter = emitter or PrettyEmitter()
+        self.flush_interval = flush_interval
+        self.progress = Progress()
+        self._queue: Deque[Event] = deque()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def configure(self, emitter):
+        """切换输出器（先输出已排队的事件）"""
+        self.flush()
+        self.emitter = emitter
+
+    def emit(self, kind: str, message: str = '', level: str = 'info', **fields):
+        """发布事件：只追加到队列，由后台线程批量输出"""
+        self._queue.append(Event(kind, level, message, fields))
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-bus', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _drain(self) -> List[Event]:
+        events = []
+        queue = self._queue
+        while queue:
+            events.append(queue.popleft())
+        return events
+
+    def flush(self):
+        """立即输出已排队的事件（在直接 print 之前调用以保持顺序）"""
+        with self._flush_lock:
+            events = self._drain()
+            for event in events:
+                self.progress.update(event)
+            if events:
+                self.emitter.write(events, self.progress)
+
+    def close(self):
+        """输出剩余事件和汇总"""
+        with self._flush_lock:
+            events = self._drain()
+            for event in events:
+                self.progress.update(event)
+            if events:
+                self.emitter.write(events, self.progress)
+            self.emitter.close(self.progress)
+            self.progress = Progress()
+
+
+def make_emitter(output: str, stream: Optional[IO[str]] = None):
+    """按名称创建输出器：pretty / json / silent"""
+    if output == 'json':
+        return JSONLinesEmitter(stream)
+    if output == 'silent':
+        return SilentEmitter()
+    return PrettyEmitter(stream)
+
+
+OUTPUT_CHOICES = ('pretty', 'json', 'silent')
+
+# 进程级事件总线
+EVENTS = EventBus()
+atexit.register(EVENTS.flush)
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+进程内模拟的飞书项目(Meego) Open API
+以 requests 传输适配器的形式挂载到客户端会话上，用于基准测试和回放压测
+"""
+
+import json
+import re
+import threading
+import time
+import random
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import BaseAdapter
+
+BASE_URL = "https://project.feishu.cn"
+
+
+class FakeMeegoBackend:
+    """模拟后端：保存字段/节点/转换等状态，并可注入延迟与限流
+
+    Args:
+        latency_ms: 每个请求的固定延迟（毫秒）
+        jitter_ms: 在固定延迟上叠加的随机抖动上限（毫秒）
+        throttle_qps: 每秒允许的请求数，超出返回 HTTP 429（0 表示不限流）
+        error_rate: 请求在处理前返回 HTTP 503 的概率
+        lost_response_rate: 请求已处理但响应丢失（客户端超时）的概率
+        seed: 随机数种子，保证多次运行可比
+        batch_supported: 是否提供字段批量创建端点（False 时返回 404，模拟旧版平台）
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 throttle_qps: float = 0.0, error_rate: float = 0.0,
+                 lost_response_rate: float = 0.0, seed: int = 0,
+                 batch_supported: bool = True):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_qps = throttle_qps
+        self.error_rate = error_rate
+        self.lost_response_rate = lost_response_rate
+        self.batch_supported = batch_supported
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        # 令牌桶（限流模拟）
+        self._tokens = throttle_qps
+        self._last_refill = time.monotonic()
+
+        # 空间状态: project_key -> work_item_type -> {...}
+        self.fields: Dict[str, Dict[str, Dict[str, Dict]]] = {}
+        self.nodes: Dict[str, Dict[str, Dict[str, Dict]]] = {}
+        self.transitions: Dict[str, Dict[str, List[Dict]]] = {}
+        self.metrics: Dict[str, Dict] = {}
+        # 工作项: project_key -> work_item_type -> [工作项]
+        self.work_items: Dict[str, Dict[str, List[Dict]]] = {}
+
+        # 幂等键 -> 首次处理的响应（与真实平台一样，重复的 X-IDEM-UUID 直接返回原结果）
+        self._idempotent_responses: Dict[str, Tuple[int, Dict]] = {}
+
+        # 调用统计
+        self.calls: Dict[Tuple[str, str], int] = {}
+        self.total_calls = 0
+        self.throttled_calls = 0
+        self.failed_calls = 0
+        self.replayed_calls = 0
+        self.latencies: List[float] = []
+
+        self._routes = [
+            ('POST', re.compile(r'^/open_api/auth/refresh_token$'), self._refresh_token),
+            ('GET', re.compile(r'^/open_api/(?P<project>[^/]+)/work_item_types$'), self._work_item_types),
+            ('GET', re.compile(r'^/open_api/(?P<project>[^/]+)/template_list/(?P<type>[^/]+)$'), self._template_list),
+            ('GET', re.compile(r'^/open_api/(?P<project>[^/]+)/field/(?P<type>[^/]+)$'), self._get_fields),
+            ('POST', re.compile(r'^/open_api/(?P<project>[^/]+)/field/batch_create$'), self._batch_create_fields),
+            ('POST', re.compile(r'^/open_api/(?P<project>[^/]+)/field/(?P<type>[^/]+)/create$'), self._create_field),
+            ('PUT', re.compile(r'^/open_api/(?P<project>[^/]+)/field/(?P<type>[^/]+)/(?P<key>[^/]+)$'), self._update_field),
+            ('POST', re.compile(r'^/open_api/(?P<project>[^/]+)/process/(?P<type>[^/]+)/node$'), self._create_node),
+            ('PUT', re.compile(r'^/open_api/(?P<project>[^/]+)/process/(?P<type>[^/]+)/config$'), self._update_process),
+            ('POST', re.compile(r'^/open_api/(?P<project>[^/]+)/process/(?P<type>[^/]+)/transition$'), self._create_transition),
+            ('POST', re.compile(r'^/open_api/(?P<project>[^/]+)/metrics/configure$'), self._configure_metrics),
+            ('POST', re.compile(r'^/open_api/(?P<project>[^/]+)/work_item/filter$'), self._filter_work_items),
+        ]
+
+    def adapter(self) -> 'FakeMeegoAdapter':
+        """创建挂载到 requests.Session 的适配器"""
+        return FakeMeegoAdapter(self)
+
+    def mount(self, session: requests.Session) -> requests.Session:
+        """将模拟后端挂载到会话上，拦截所有飞书项目域名的请求"""
+        session.mount(BASE_URL, self.adapter())
+        return session
+
+    def seed_work_items(self, project: str, work_item_type: str, count: int,
+                        fields: Dict[str, str] = None) -> List[Dict]:
+        """生成工作项（用于导出测试）
+
+        Args:
+            fields: 字段key -> 字段类型（number/datetime/select/text），按类型生成确定性的取值
+        """
+        items = self.work_items.setdefault(project, {}).setdefault(work_item_type, [])
+        base_id = len(items)
+        for index in range(base_id, base_id + count):
+            created = 1700000000000 + index * 3600_000
+            field_values = []
+            for key, field_type in (fields or {}).items():
+                if field_type == 'number':
+                    value = index % 7
+                elif field_type == 'datetime':
+                    value = created + (index % 30) * 86400_000
+                elif field_type == 'select':
+                    value = {"label": ("一次通过", "二次通过", "未通过")[index % 3], "value": str(index % 3)}
+                else:
+                    value = f"{key}-{index}"
+                field_values.append({"field_key": key, "field_type_key": field_type, "field_value": value})
+            items.append({
+                "id": 10_000_000 + index,
+                "name": f"{work_item_type}-{index}",
+                "work_item_type_key": work_item_type,
+                "project_key": project,
+                "created_at": created,
+                "updated_at": created + 60_000,
+                "fields": field_values,
+            })
+        return items
+
+    def reset_stats(self):
+        """清空调用统计（保留空间状态）"""
+        with self._lock:
+            self.calls.clear()
+            self.total_calls = 0
+            self.throttled_calls = 0
+            self.failed_calls = 0
+            self.replayed_calls = 0
+            self.latencies = []
+
+    # ------------------------------------------------------------------
+    # 请求分发
+    # ------------------------------------------------------------------
+
+    def handle(self, method: str, path: str, body: Optional[Dict],
+               idem_key: Optional[str] = None) -> Tuple[int, Dict]:
+        """处理一个请求，返回 (HTTP状态码, JSON响应体)"""
+        with self._lock:
+            self.total_calls += 1
+            throttled = not self._take_token()
+            if throttled:
+                self.throttled_calls += 1
+            failed = not throttled and self._chance(self.error_rate)
+            if failed:
+                self.failed_calls += 1
+
+        if throttled:
+            return 429, {"err_code": 429, "err_msg": "too many requests"}
+        if failed:
+            return 503, {"err_code": 503, "err_msg": "service unavailable"}
+
+        for route_method, pattern, handler in self._routes:
+            if route_method != method:
+                continue
+            match = pattern.match(path)
+            if match and handler == self._batch_create_fields and not self.batch_supported:
+                break
+            if match:
+                with self._lock:
+                    if idem_key and idem_key in self._idempotent_responses:
+                        self.replayed_calls += 1
+                        return self._idempotent_responses[idem_key]
+                    key = (method, pattern.pattern)
+                    self.calls[key] = self.calls.get(key, 0) + 1
+                    result = handler(body or {}, **match.groupdict())
+                    if idem_key:
+                        self._idempotent_responses[idem_key] = result
+                    return result
+
+        return 404, {"err_code": 404, "err_msg": f"not found: {method} {path}"}
+
+    def _chance(self, rate: float) -> bool:
+        """按概率触发故障注入（调用方持有锁）"""
+        return bool(rate) and self._random.random() < rate
+
+    def lose_response(self) -> bool:
+        """本次响应是否丢失"""
+        with self._lock:
+            return self._chance(self.lost_response_rate)
+
+    def _take_token(self) -> bool:
+        """令牌桶限流（调用方持有锁）"""
+        if not self.throttle_qps:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.throttle_qps,
+                           self._tokens + (now - self._last_refill) * self.throttle_qps)
+        self._last_refill = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def delay(self) -> float:
+        """注入的网络延迟（秒）"""
+        if not self.latency_ms and not self.jitter_ms:
+            return 0.0
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return (self.latency_ms + jitter) / 1000.0
+
+    # ------------------------------------------------------------------
+    # 端点实现
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _ok(data) -> Tuple[int, Dict]:
+        return 200, {"err_code": 0, "err_msg": "", "data": data}
+
+    @staticmethod
+    def _error(code: int, msg: str) -> Tuple[int, Dict]:
+        return 200, {"err_code": code, "err_msg": msg}
+
+    def _refresh_token(self, body):
+        return self._ok({"access_token": "fake_token", "expire_time": 7200})
+
+    def _work_item_types(self, body, project):
+        return self._ok([{"type_key": "requirement", "name": "需求"},
+                         {"type_key": "story", "name": "故事"}])
+
+    def _template_list(self, body, project, type):
+        nodes = self.nodes.get(project, {}).get(type, {})
+        return self._ok([{"template_id": 1, "template_name": "默认流程",
+                          "nodes": sorted(nodes)}])
+
+    def _get_fields(self, body, project, type):
+        return self._ok(list(self.fields.get(project, {}).get(type, {}).values()))
+
+    def _create_field(self, body, project, type):
+        fields = self.fields.setdefault(project, {}).setdefault(type, {})
+        key = body.get('key')
+        if not key:
+            return self._error(20001, "field key is required")
+        if key in fields:
+            return self._error(20002, f"field {key} already exists")
+        fields[key] = dict(body)
+        return self._ok({"field_key": key})
+
+    def _batch_create_fields(self, body, project):
+        """批量创建字段，按输入顺序返回每个字段的结果"""
+        type = body.get('work_item_type')
+        if not type:
+            return self._error(20001, "work_item_type is required")
+        results = []
+        for field in body.get('fields', []):
+            status, payload = self._create_field(field, project, type)
+            if payload.get('err_code') == 0:
+                results.append(payload['data'])
+            else:
+                results.append({"err_code": payload['err_code'], "err_msg": payload['err_msg']})
+        return self._ok({"fields": results})
+
+    def _update_field(self, body, project, type, key):
+        fields = self.fields.get(project, {}).get(type, {})
+        if key not in fields:
+            return self._error(20003, f"field {key} not found")
+        fields[key].update(body)
+        return self._ok({"field_key": key})
+
+    def _create_node(self, body, project, type):
+        nodes = self.nodes.setdefault(project, {}).setdefault(type, {})
+        key = body.get('key') or body.get('id')
+        if key in nodes:
+            return self._error(20004, f"node {key} already exists")
+        nodes[key] = dict(body)
+        return self._ok({"node_key": key})
+
+    def _update_process(self, body, project, type):
+        return self._ok({})
+
+    def _create_transition(self, body, project, type):
+        self.transitions.setdefault(project, {}).setdefault(type, []).append(dict(body))
+        return self._ok({"transition_id": len(self.transitions[project][type])})
+
+    def _configure_metrics(self, body, project):
+        self.metrics[project] = dict(body)
+        return self._ok({"metrics": len(body)})
+
+    def _filter_work_items(self, body, project):
+        """分页查询工作项（page_num 从1开始，page_size 最大200）"""
+        page_num = int(body.get('page_num', 1))
+        page_size = int(body.get('page_size', 50))
+        if page_num < 1 or not 0 < page_size <= 200:
+            return self._error(20006, "invalid pagination")
+        items = []
+        for type in body.get('work_item_type_keys') or sorted(self.work_items.get(project, {})):
+            items.extend(self.work_items.get(project, {}).get(type, []))
+        start = (page_num - 1) * page_size
+        return 200, {"err_code": 0, "err_msg": "", "data": items[start:start + page_size],
+                     "pagination": {"page_num": page_num, "page_size": page_size, "total": len(items)}}
+
+
+class FakeMeegoAdapter(BaseAdapter):
+    """把 requests 请求转交给 FakeMeegoBackend 的传输适配器"""
+
+    def __init__(self, backend: FakeMeegoBackend):
+        super().__init__()
+        self.backend = backend
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        started = time.perf_counter()
+
+        delay = self.backend.delay()
+        if delay:
+            time.sleep(delay)
+
+        body = None
+        if request.body:
+            raw = request.body.decode('utf-8') if isinstance(request.body, bytes) else request.body
+            body = json.loads(raw)
+
+        path = requests.utils.urlparse(request.url).path
+        status, payload = self.backend.handle(request.method, path, body,
+                                              request.headers.get('X-IDEM-UUID'))
+
+        elapsed = time.perf_counter() - started
+        if self.backend.lose_response():
+            with self.backend._lock:
+                self.backend.latencies.append(elapsed)
+            raise requests.exceptions.ReadTimeout(f"simulated lost response: {request.method} {path}")
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json'
+        response.headers['Content-Length'] = str(len(response._content))
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+
+        with self.backend._lock:
+            self.backend.latencies.append(elapsed)
+        return response
+
+    def close(self):
+        pass
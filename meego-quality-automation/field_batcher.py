@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+字段创建请求合并
+在很短的时间窗口内缓冲单个 create_field 调用，按工作项类型合并为批量创建请求；
+平台不支持批量端点时自动退回逐个创建。调用方仍然拿到每个字段各自的结果。
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 批量请求幂等键的命名空间：同一组字段幂等键总是得到同一个批量幂等键
+_BATCH_NAMESPACE = uuid.UUID('6f1c3a52-8d4e-4b7a-9c1d-2e5f7a9b0c3d')
+
+
+class BatchNotSupported(Exception):
+    """批量端点不可用（404/405 等），应退回逐个创建"""
+
+
+def batch_idem_key(item_keys: List[Optional[str]]) -> Optional[str]:
+    """由各字段幂等键派生批量请求的幂等键；任一字段没有键时返回 None（由客户端生成）"""
+    if not item_keys or not all(item_keys):
+        return None
+    return str(uuid.uuid5(_BATCH_NAMESPACE, '|'.join(item_keys)))
+
+
+_Item = Tuple[Dict, Optional[str], Future]
+
+
+class FieldCreateBatcher:
+    """create_field 合并器
+
+    Args:
+        send_batch: (工作项类型, 字段配置列表, 幂等键) -> 与输入等长的结果列表，
+            元素为异常表示该字段失败；端点不可用时抛出 BatchNotSupported
+        send_single: (工作项类型, 字段配置, 幂等键) -> 单个字段的创建结果
+        window: 缓冲窗口（秒），第一个字段到达后等待这么久再发送
+        max_batch: 单个批量请求的最大字段数，攒满立即发送
+    """
+
+    def __init__(self, send_batch: Callable[[str, List[Dict], Optional[str]], List[Any]],
+                 send_single: Callable[[str, Dict, Optional[str]], Any],
+                 window: float = 0.05, max_batch: int = 50):
+        self._send_batch = send_batch
+        self._send_single = send_single
+        self.window = window
+        self.max_batch = max_batch
+
+        # None: 尚未探测; True/False: 批量端点是否可用
+        self.batch_supported: Optional[bool] = None
+        self.stats = {'batch_requests': 0, 'batched_fields': 0, 'single_requests': 0}
+
+        self._cond = threading.Condition()
+        self._pending: Dict[str, List[_Item]] = {}
+        self._deadlines: Dict[str, float] = {}
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, work_item_type: str, field_config: Dict, idem_key: Optional[str] = None) -> Future:
+        """提交一个字段，返回其结果的 Future"""
+        future: Future = Future()
+        full_batch = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("FieldCreateBatcher 已关闭")
+            items = self._pending.setdefault(work_item_type, [])
+            items.append((field_config, idem_key, future))
+            if len(items) == 1:
+                self._deadlines[work_item_type] = time.monotonic() + self.window
+            if len(items) >= self.max_batch:
+                full_batch = self._take(work_item_type)
+            else:
+                self._ensure_thread()
+                self._cond.notify()
+
+        if full_batch:
+            self._dispatch(work_item_type, full_batch)
+        return future
+
+    def flush(self):
+        """立即发送所有缓冲中的字段（在调用线程中执行）"""
+        with self._cond:
+            batches = [(t, self._take(t)) for t in list(self._pending)]
+        for work_item_type, batch in batches:
+            self._dispatch(work_item_type, batch)
+
+    def close(self):
+        """发送剩余字段并停止后台线程"""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+
+    # ------------------------------------------------------------------
+
+    def _take(self, work_item_type: str) -> List[_Item]:
+        """取出某类型的缓冲字段（调用方持有锁）"""
+        self._deadlines.pop(work_item_type, None)
+        return self._pending.pop(work_item_type, [])
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='field-batcher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """后台线程：缓冲窗口到期后发送"""
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if not self._deadlines:
+                        self._cond.wait()
+                        continue
+                    now = time.monotonic()
+                    due = [t for t, deadline in self._deadlines.items() if deadline <= now]
+                    if due:
+                        break
+                    self._cond.wait(min(self._deadlines.values()) - now)
+                if self._closed:
+                    return
+                batches = [(t, self._take(t)) for t in due]
+
+            for work_item_type, batch in batches:
+                self._dispatch(work_item_type, batch)
+
+    def _dispatch(self, work_item_type: str, batch: List[_Item]):
+        if not batch:
+            return
+
+        if len(batch) > 1 and self.batch_supported is not False:
+            configs = [config for config, _, _ in batch]
+            key = batch_idem_key([idem_key for _, idem_key, _ in batch])
+            try:
+                results = self._send_batch(work_item_type, configs, key)
+            except BatchNotSupported:
+                self.batch_supported = False
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                return
+            else:
+                self.batch_supported = True
+                self.stats['batch_requests'] += 1
+                self.stats['batched_fields'] += len(batch)
+                for (_, _, future), result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+                return
+
+        for config, idem_key, future in batch:
+            self.stats['single_requests'] += 1
+            try:
+                future.set_result(self._send_single(work_item_type, config, idem_key))
+            except Exception as e:
+                future.set_exception(e)
+
+
+def split_batch_results(data: Any, count: int, error_factory: Callable[[Dict], Exception]) -> List[Any]:
+    """把批量接口的响应拆成每个字段的结果
+
+    支持 data 为结果列表，或包含 fields/results 列表的字典；
+    单项带非零 err_code 时转换为异常。无法按项对应时每个字段都返回整体结果。
+    """
+    items = data
+    if isinstance(data, dict):
+        items = data.get('fields', data.get('results'))
+    if not isinstance(items, list) or len(items) != count:
+        return [data] * count
+
+    results = []
+    for item in items:
+        if isinstance(item, dict) and item.get('err_code') not in (0, None):
+            results.append(error_factory(item))
+        else:
+            results.append(item)
+    return results
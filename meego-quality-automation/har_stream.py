@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+流式 HAR 解析
+逐条读取浏览器导出的 HAR 文件（可达数百 MB）中的 log.entries，
+内存占用只与单条记录大小相关；边读边过滤 open_api/goapi 请求并建立按路径模板聚合的端点索引。
+"""
+
+import base64
+import json
+from collections import Counter
+from dataclasses import dataclass
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from url_templates import DEFAULT_MAX_LITERALS, PathTemplateTrie
+
+# 飞书项目接口的路径前缀
+API_MARKERS = ('/open_api/', '/goapi/')
+
+
+@dataclass
+class CapturedRequest:
+    """捕获的API请求"""
+    method: str
+    url: str
+    headers: Dict[str, str]
+    payload: Optional[Dict] = None
+    response: Optional[Dict] = None
+    status_code: Optional[int] = None
+    started_at: Optional[str] = None
+    duration_ms: Optional[float] = None
+
+
+class HarFormatError(ValueError):
+    """HAR 文件结构不正确"""
+
+
+def endpoint_path(url: str, markers: Iterable[str] = API_MARKERS) -> Tuple[str, str]:
+    """拆分 URL 路径（不含查询参数），返回 (匹配到的接口前缀, 前缀之后的路径)
+
+    前缀不含斜杠，如 open_api、goapi；不是接口请求时前缀为空字符串、路径为完整路径。
+    """
+    path = urlsplit(url).path
+    for marker in markers:
+        position = path.find(marker)
+        if position >= 0:
+            return marker.strip('/'), path[position + len(marker):]
+    return '', path
+
+
+class _EntriesLocator:
+    """扫描 HAR 开头部分，找到 log.entries 数组的起点"""
+
+    def __init__(self):
+        self.in_string = False
+        self.escape = False
+        self.string_start = -1
+        self.last_string: Optional[str] = None
+        self.path: List[Optional[str]] = []
+        self.awaiting_value_for: Optional[str] = None
+
+    def feed(self, text: str, start: int) -> int:
+        """从 start 开始扫描，返回 entries 数组 '[' 之后的位置；未找到时返回 -1"""
+        i = start
+        length = len(text)
+        while i < length:
+            ch = text[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    self.last_string = text[self.string_start:i]
+            elif ch == '"':
+                self.in_string = True
+                self.string_start = i + 1
+            elif ch == ':':
+                self.awaiting_value_for = self.last_string
+            elif ch in '{[':
+                if (ch == '[' and self.awaiting_value_for == 'entries'
+                        and self.path == [None, 'log']):
+                    return i + 1
+                self.path.append(self.awaiting_value_for)
+                self.awaiting_value_for = None
+            elif ch in '}]':
+                if self.path:
+                    self.path.pop()
+                self.awaiting_value_for = None
+            elif ch == ',':
+                self.awaiting_value_for = None
+            i += 1
+        return -1
+
+
+def iter_har_entries(fp: IO[str], chunk_size: int = 1 << 20) -> Iterator[Dict]:
+    """逐条产出 HAR log.entries 中的记录
+
+    Args:
+        fp: 以文本模式打开的 HAR 文件
+        chunk_size: 每次读取的字符数
+    """
+    decoder = json.JSONDecoder()
+    locator = _EntriesLocator()
+    buf = ''
+    pos = 0
+
+    # 1. 定位 entries 数组（只保留未扫描完的字符串片段）
+    while True:
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            raise HarFormatError("HAR 文件中没有 log.entries")
+        if locator.in_string:
+            scan_from = len(buf)
+            buf += chunk
+        else:
+            buf, scan_from = chunk, 0
+        found = locator.feed(buf, scan_from)
+        if found >= 0:
+            buf, pos = buf[found:], 0
+            break
+        if locator.in_string:
+            # 保留当前字符串，下一块继续
+            buf = buf[locator.string_start:]
+            locator.string_start = 0
+        else:
+            buf = ''
+
+    # 2. 逐条解码 entries 中的对象
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buf) and buf[pos] == ']':
+            return
+
+        if pos < len(buf):
+            try:
+                entry, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise HarFormatError(f"HAR 记录不完整或格式错误（位置 {pos}）")
+            else:
+                if not isinstance(entry, dict):
+                    raise HarFormatError("log.entries 中的记录必须是对象")
+                pos = end
+                yield entry
+                continue
+        elif eof:
+            raise HarFormatError("HAR 文件在 log.entries 结束前截断")
+
+        # 需要更多数据：丢弃已解析部分，追加下一块；
+        # 单条记录很大时按已缓冲长度倍增读取量，避免反复重新解析
+        chunk = fp.read(max(chunk_size, len(buf) - pos))
+        buf = buf[pos:] + chunk
+        pos = 0
+        eof = not chunk
+
+
+def _header_dict(headers: List[Dict]) -> Dict[str, str]:
+    return {h.get('name', ''): h.get('value', '') for h in headers or []}
+
+
+def _parse_json(text: Optional[str], limit: int) -> Optional[Dict]:
+    if not text or len(text) > limit:
+        return None
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return None
+    return value if isinstance(value, (dict, list)) else None
+
+
+def entry_to_request(entry: Dict, max_body_chars: int = 1 << 20) -> CapturedRequest:
+    """把一条 HAR 记录转换为 CapturedRequest（超过 max_body_chars 的请求/响应体不解析）"""
+    request = entry.get('request', {})
+    response = entry.get('response', {})
+    content = response.get('content', {})
+
+    body = content.get('text')
+    if body and content.get('encoding') == 'base64' and len(body) <= max_body_chars:
+        try:
+            body = base64.b64decode(body).decode('utf-8')
+        except (ValueError, UnicodeDecodeError):
+            body = None
+
+    status = response.get('status')
+    return CapturedRequest(
+        method=request.get('method', 'GET').upper(),
+        url=request.get('url', ''),
+        headers=_header_dict(request.get('headers')),
+        payload=_parse_json((request.get('postData') or {}).get('text'), max_body_chars),
+        response=_parse_json(body, max_body_chars),
+        status_code=status if status else None,
+        started_at=entry.get('startedDateTime'),
+        duration_ms=entry.get('time')
+    )
+
+
+def iter_captured_requests(fp: IO[str], markers: Iterable[str] = API_MARKERS,
+                           max_body_chars: int = 1 << 20,
+                           chunk_size: int = 1 << 20) -> Iterator[CapturedRequest]:
+    """流式读取 HAR，只产出 URL 包含接口前缀的请求"""
+    markers = tuple(markers)
+    for entry in iter_har_entries(fp, chunk_size):
+        url = entry.get('request', {}).get('url', '')
+        if any(marker in url for marker in markers):
+            yield entry_to_request(entry, max_body_chars)
+
+
+def _new_stats() -> Dict:
+    return {
+        'count': 0,
+        'statuses': Counter(),
+        'err_codes': Counter(),
+        'auth_headers': set(),
+        'total_ms': 0.0,
+        'max_ms': 0.0,
+        'example': None,
+        'prefix': '',
+    }
+
+
+def _merge_stats(dst: Dict, src: Dict):
+    """模板分支合并时合并统计（保留目标的示例请求）"""
+    dst['count'] += src['count']
+    dst['statuses'].update(src['statuses'])
+    dst['err_codes'].update(src['err_codes'])
+    dst['auth_headers'] |= src['auth_headers']
+    dst['total_ms'] += src['total_ms']
+    dst['max_ms'] = max(dst['max_ms'], src['max_ms'])
+    if dst['example'] is None:
+        dst['example'] = src['example']
+        dst['prefix'] = src['prefix']
+
+
+class EndpointIndex:
+    """边读边建立的端点索引
+
+    按 (方法, 路径模板) 聚合调用统计，路径中的 ID、key 等变量段归并为占位符
+    （见 url_templates），保留每个模板的第一条请求作为示例。
+    """
+
+    def __init__(self, max_literals: int = DEFAULT_MAX_LITERALS):
+        self.templates = PathTemplateTrie(_merge_stats, max_literals)
+        self.total = 0
+
+    @property
+    def endpoints(self) -> Dict[Tuple[str, str], Dict]:
+        """(方法, 路径模板) -> 统计"""
+        return {(method, template): stats for method, template, stats in self.templates.items()}
+
+    def add(self, req: CapturedRequest) -> bool:
+        """加入一条请求，返回是否为新模板"""
+        self.total += 1
+        prefix, path = endpoint_path(req.url)
+        _, stats, is_new = self.templates.add(req.method, path, _new_stats)
+        if is_new:
+            stats['example'] = req
+            stats['prefix'] = prefix
+
+        stats['count'] += 1
+        if req.status_code is not None:
+            stats['statuses'][req.status_code] += 1
+        if isinstance(req.response, dict) and 'err_code' in req.response:
+            stats['err_codes'][req.response['err_code']] += 1
+        for header in req.headers:
+            lowered = header.lower()
+            if 'token' in lowered or 'key' in lowered:
+                stats['auth_headers'].add(header)
+        if req.duration_ms is not None and req.duration_ms >= 0:
+            stats['total_ms'] += req.duration_ms
+            stats['max_ms'] = max(stats['max_ms'], req.duration_ms)
+        return is_new
+
+    def summary(self) -> List[Dict]:
+        """按调用次数降序的模板统计（可序列化为 JSON）"""
+        rows = []
+        for (method, template), stats in self.endpoints.items():
+            rows.append({
+                'method': method,
+                'endpoint': template,
+                'prefix': stats['prefix'],
+                'count': stats['count'],
+                'statuses': {str(k): v for k, v in stats['statuses'].items()},
+                'err_codes': {str(k): v for k, v in stats['err_codes'].items()},
+                'avg_ms': round(stats['total_ms'] / stats['count'], 2),
+                'max_ms': round(stats['max_ms'], 2),
+            })
+        rows.sort(key=lambda row: -row['count'])
+        return rows
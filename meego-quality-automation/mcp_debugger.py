@@ -4,23 +4,16 @@ Chrome DevTools MCP集成 - 自动化API调试工具
 无需手动使用Postman，自动捕获并分析飞书项目API调用
 """
 
-import json
+import argparse
 import time
 import logging
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
 
-logger = logging.getLogger(__name__)
+from client_codegen import generate_client
+from debug_report import DEFAULT_MAX_BYTES, NDJSONReportWriter
+from har_stream import CapturedRequest, EndpointIndex, iter_captured_requests
 
-@dataclass
-class CapturedRequest:
-    """捕获的API请求"""
-    method: str
-    url: str
-    headers: Dict[str, str]
-    payload: Optional[Dict] = None
-    response: Optional[Dict] = None
-    status_code: Optional[int] = None
+logger = logging.getLogger(__name__)
 
 class MeegoAPIDebugger:
     """飞书项目API调试器 - 使用Chrome DevTools MCP"""
@@ -29,6 +22,10 @@ class MeegoAPIDebugger:
         self.project_url = project_url
         self.captured_requests: List[CapturedRequest] = []
         self.api_patterns = {}
+        # 端点索引（导入HAR时边读边建立）
+        self.endpoint_index = EndpointIndex()
+        # 流式调试报告（open_report 之后每条请求立即写入）
+        self.report: Optional[NDJSONReportWriter] = None
 
     def auto_login(self, username: str, password: str):
         """自动登录飞书项目"""
@@ -83,11 +80,65 @@ class MeegoAPIDebugger:
             status_code=200
         )
 
-        self.captured_requests.append(captured)
+        self._record(captured, keep=True)
         print(f"  ✓ 捕获到 {len(self.captured_requests)} 个API请求")
 
         return self.captured_requests
 
+    def _record(self, req: CapturedRequest, keep: bool):
+        """登记一条捕获的请求：更新端点索引、写入报告；keep 或新端点时保留在内存中"""
+        is_new = self.endpoint_index.add(req)
+        if keep or is_new:
+            self.captured_requests.append(req)
+        if self.report is not None:
+            self.report.write(self._request_record(req))
+
+    @staticmethod
+    def _request_record(req: CapturedRequest) -> Dict[str, Any]:
+        return {
+            "method": req.method,
+            "url": req.url,
+            "headers": req.headers,
+            "payload": req.payload,
+            "response": req.response,
+            "status_code": req.status_code,
+            "started_at": req.started_at,
+            "duration_ms": req.duration_ms
+        }
+
+    def open_report(self, filename: str = "api_debug_report.json",
+                    max_bytes: int = DEFAULT_MAX_BYTES) -> NDJSONReportWriter:
+        """开始流式写入调试报告：之后捕获的每条请求立即追加到 NDJSON 分卷
+
+        Args:
+            filename: 汇总索引文件名，分卷为同名的 .00001.ndjson、.00002.ndjson ...
+            max_bytes: 单个分卷的大小上限
+        """
+        self.report = NDJSONReportWriter(filename, max_bytes=max_bytes)
+        for req in self.captured_requests:
+            self.report.write(self._request_record(req))
+        return self.report
+
+    def load_har(self, har_file: str, keep_all: bool = False) -> EndpointIndex:
+        """流式导入浏览器导出的HAR文件
+
+        Args:
+            har_file: HAR 文件路径
+            keep_all: 在内存中保留所有请求；默认每个端点只保留第一条作为示例，内存占用与文件大小无关
+                      （已调用 open_report 时全部请求都会写入报告）
+
+        Returns:
+            端点索引
+        """
+        print(f"\n📂 导入HAR文件: {har_file}")
+        with open(har_file, 'r', encoding='utf-8-sig') as f:
+            for req in iter_captured_requests(f):
+                self._record(req, keep=keep_all)
+
+        print(f"  ✓ 读取 {self.endpoint_index.total} 个接口请求，"
+              f"{len(self.endpoint_index.templates)} 个端点模板")
+        return self.endpoint_index
+
     def analyze_api_patterns(self) -> Dict[str, Any]:
         """分析API模式"""
         print("\n🔍 分析API模式...")
@@ -99,23 +150,22 @@ class MeegoAPIDebugger:
             "error_codes": set()
         }
 
-        for req in self.captured_requests:
-            # 提取端点模式
-            endpoint = req.url.split("/open_api/")[-1] if "/open_api/" in req.url else req.url
-            patterns["endpoints"][endpoint] = {
-                "method": req.method,
-                "example_payload": req.payload,
-                "example_response": req.response
+        # 按路径模板聚合（ID、key 等变量段已归并为占位符）
+        for (method, template), stats in self.endpoint_index.endpoints.items():
+            key = template if template not in patterns["endpoints"] else f"{method} {template}"
+            example = stats["example"]
+            patterns["endpoints"][key] = {
+                "endpoint": template,
+                "prefix": stats["prefix"],
+                "method": method,
+                "count": stats["count"],
+                "statuses": dict(stats["statuses"]),
+                "avg_ms": round(stats["total_ms"] / stats["count"], 2),
+                "example_payload": example.payload,
+                "example_response": example.response
             }
-
-            # 提取认证头
-            for header in req.headers:
-                if "token" in header.lower() or "key" in header.lower():
-                    patterns["auth_headers"].add(header)
-
-            # 收集错误码
-            if req.response and "err_code" in req.response:
-                patterns["error_codes"].add(req.response["err_code"])
+            patterns["auth_headers"] |= stats["auth_headers"]
+            patterns["error_codes"].update(stats["err_codes"])
 
         self.api_patterns = patterns
         print(f"  ✓ 识别到 {len(patterns['endpoints'])} 个API端点")
@@ -123,96 +173,48 @@ class MeegoAPIDebugger:
         return patterns
 
     def generate_api_client(self) -> str:
-        """生成API客户端代码"""
+        """生成API客户端代码（连接池同步客户端 + asyncio 客户端，见 client_codegen）"""
         print("\n📝 生成API客户端代码...")
 
         if not self.api_patterns:
             self.analyze_api_patterns()
 
-        code = '''"""
-自动生成的飞书项目API客户端
-基于Chrome DevTools捕获的真实API调用
-"""
-
-import requests
-
-class AutoGeneratedFeishuClient:
-    def __init__(self, plugin_token, user_key):
-        self.base_url = "{base_url}"
-        self.headers = {{
-            "X-Plugin-Token": plugin_token,
-            "X-User-Key": user_key,
-            "Content-Type": "application/json"
-        }}
-
-'''.format(base_url=self.project_url)
-
-        # 为每个捕获的端点生成方法
-        for endpoint, details in self.api_patterns.get("endpoints", {}).items():
-            method_name = self._endpoint_to_method_name(endpoint)
-            code += self._generate_method(method_name, endpoint, details)
-
-        code += '''
-    def _request(self, method, endpoint, **kwargs):
-        """通用请求方法"""
-        url = f"{self.base_url}/open_api/{endpoint}"
-        response = requests.request(method, url, headers=self.headers, **kwargs)
-        return response.json()
-'''
+        code = generate_client(self.project_url, self.api_patterns.get("endpoints", {}))
 
         print("  ✓ 代码生成完成")
         return code
 
-    def _endpoint_to_method_name(self, endpoint: str) -> str:
-        """将端点转换为方法名"""
-        # project_key/field/requirement/create -> create_field
-        parts = endpoint.split("/")
-        if "create" in parts:
-            return f"create_{parts[-2]}"
-        elif "update" in parts:
-            return f"update_{parts[-2]}"
-        elif "get" in parts or "list" in parts:
-            return f"get_{parts[-2]}"
-        else:
-            return "_".join(parts[-2:])
-
-    def _generate_method(self, method_name: str, endpoint: str, details: Dict) -> str:
-        """生成单个API方法"""
-        method = details.get("method", "GET")
-        payload = details.get("example_payload", {})
-
-        code = f'''
-    def {method_name}(self, **params):
-        """自动生成的方法: {endpoint}"""
-        return self._request("{method}", "{endpoint}", json=params)
-'''
-        return code
+    def save_debug_report(self, filename: Optional[str] = None):
+        """保存调试报告：结束 NDJSON 分卷并写出汇总索引
+
+        Args:
+            filename: 汇总索引文件名（默认 api_debug_report.json）；
+                      已通过 open_report 流式写入时沿用 open_report 的文件名
+        """
+        if self.report is None:
+            self.open_report(filename or "api_debug_report.json")
+        report, self.report = self.report, None
 
-    def save_debug_report(self, filename: str = "api_debug_report.json"):
-        """保存调试报告"""
-        report = {
+        report.close({
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "captured_requests": [
-                {
-                    "method": req.method,
-                    "url": req.url,
-                    "headers": req.headers,
-                    "payload": req.payload,
-                    "response": req.response,
-                    "status_code": req.status_code
-                }
-                for req in self.captured_requests
-            ],
+            "total_requests": self.endpoint_index.total,
+            "endpoints": self.endpoint_index.summary(),
             "api_patterns": self.api_patterns
-        }
-
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        })
 
-        print(f"\n💾 调试报告已保存到: {filename}")
+        print(f"\n💾 调试报告已保存到: {report.index_path}"
+              f"（{report.records} 条请求，{len(report.files)} 个分卷）")
 
 def main():
     """主函数 - 演示API调试流程"""
+    parser = argparse.ArgumentParser(description='飞书项目API自动调试工具')
+    parser.add_argument('--har', metavar='PATH', help='从浏览器导出的HAR文件导入请求（流式读取）')
+    parser.add_argument('--keep-all', action='store_true', help='在内存中保留HAR中的全部请求（默认每个端点保留一条示例）')
+    parser.add_argument('--report', default='api_debug_report.json', help='调试报告索引文件（请求记录写入同名 NDJSON 分卷）')
+    parser.add_argument('--report-max-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help='单个报告分卷的大小上限（MB）')
+    args = parser.parse_args()
+
     print("""
 ╔══════════════════════════════════════════════════════╗
 ║        飞书项目API自动调试工具                        ║
@@ -221,12 +223,17 @@ def main():
     """)
 
     debugger = MeegoAPIDebugger()
+    debugger.open_report(args.report, max_bytes=int(args.report_max_mb * 1024 * 1024))
 
     # 1. 自动登录（需要提供凭据）
     # debugger.auto_login("your_username", "your_password")
 
     # 2. 捕获API调用
-    requests = debugger.capture_field_creation()
+    if args.har:
+        debugger.load_har(args.har, keep_all=args.keep_all)
+        requests = debugger.captured_requests
+    else:
+        requests = debugger.capture_field_creation()
 
     # 3. 分析API模式
     patterns = debugger.analyze_api_patterns()
@@ -250,7 +257,7 @@ def main():
 
     print("\n下一步:")
     print("1. 查看 generated_client.py 中的自动生成代码")
-    print("2. 查看 api_debug_report.json 了解详细的API调用")
+    print(f"2. 查看 {args.report} 及其 NDJSON 分卷了解详细的API调用")
     print("3. 使用生成的客户端代码替换手动编写的API调用")
 
 if __name__ == "__main__":
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+质量指标时序存储
+按 空间(project) × 团队(team) × 指标 × 天 追加写入计算出的指标值（SQLite，只追加），
+写入时在同一事务内增量更新 天/周/月 三级预聚合块（次数、权重和、加权和、最小、最大、最新值）。
+区间查询直接读取预聚合块：3 年的月度趋势只需读取 36 行，与原始样本数量无关。
+
+    samples   原始样本（只追加；可按日期裁剪，预聚合块保留）
+    rollups   (metric, resolution, project, team, bucket) → 聚合值；bucket 为块起始日的日序数
+
+用法:
+    python metric_store.py append --project iretail --team 交易 --metric requirement_lead_time --value 23.5
+    python metric_store.py import daily_metrics.csv
+    python metric_store.py query --metric requirement_lead_time --from 2024-01-01 --resolution month
+"""
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+DEFAULT_DB = 'quality-metrics.db'
+
+RESOLUTIONS = ('day', 'week', 'month')
+
+# 自动选择粒度：区间不超过 92 天按天，不超过 2 年按周，其余按月
+_AUTO_LIMITS = ((92, 'day'), (731, 'week'))
+
+DateLike = Union[date, str, int]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    team TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    value REAL NOT NULL,
+    weight REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_day ON samples (day);
+CREATE TABLE IF NOT EXISTS rollups (
+    metric TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    project TEXT NOT NULL,
+    team TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    total REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    last REAL NOT NULL,
+    last_day INTEGER NOT NULL,
+    PRIMARY KEY (metric, resolution, project, team, bucket)
+) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO rollups (metric, resolution, project, team, bucket,
+                     count, weight, total, min, max, last, last_day)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (metric, resolution, project, team, bucket) DO UPDATE SET
+    count = count + excluded.count,
+    weight = weight + excluded.weight,
+    total = total + excluded.total,
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max),
+    last = CASE WHEN excluded.last_day >= last_day THEN excluded.last ELSE last END,
+    last_day = MAX(last_day, excluded.last_day)
+"""
+
+
+def to_day(value: DateLike) -> int:
+    """日期 → 日序数（date.toordinal）；接受 date、'YYYY-MM-DD' 或日序数"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return value.toordinal()
+
+
+def bucket_start(day: int, resolution: str) -> int:
+    """日序数所在块的起始日序数（周从周一开始）"""
+    if resolution == 'day':
+        return day
+    d = date.fromordinal(day)
+    if resolution == 'week':
+        return day - d.weekday()
+    if resolution == 'month':
+        return d.replace(day=1).toordinal()
+    raise ValueError(f"未知粒度: {resolution}")
+
+
+def auto_resolution(start: int, end: int) -> str:
+    """按区间长度选择粒度，使趋势图的点数保持在百级以内"""
+    span = end - start + 1
+    for limit, resolution in _AUTO_LIMITS:
+        if span <= limit:
+            return resolution
+    return 'month'
+
+
+class _Block:
+    """写入批次内同一块的聚合值"""
+
+    __slots__ = ('count', 'weight', 'total', 'min', 'max', 'last', 'last_day')
+
+    def __init__(self, value: float, weight: float, day: int):
+        self.count = 1
+        self.weight = weight
+        self.total = value * weight
+        self.min = self.max = self.last = value
+        self.last_day = day
+
+    def add(self, value: float, weight: float, day: int):
+        self.count += 1
+        self.weight += weight
+        self.total += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if day >= self.last_day:
+            self.last, self.last_day = value, day
+
+
+def _merge_blocks(samples: Iterable[Sequence]) -> Dict[Tuple, _Block]:
+    """把 (project, team, metric, day, value, weight, ...) 样本在内存中合并到 天/周/月 块"""
+    blocks: Dict[Tuple, _Block] = {}
+    for project, team, metric, day, value, weight in (sample[:6] for sample in samples):
+        for resolution in RESOLUTIONS:
+            key = (metric, resolution, project, team, bucket_start(day, resolution))
+            block = blocks.get(key)
+            if block is None:
+                blocks[key] = _Block(value, weight, day)
+            else:
+                block.add(value, weight, day)
+    return blocks
+
+
+def _block_rows(blocks: Dict[Tuple, _Block]) -> List[Tuple]:
+    return [key + (b.count, b.weight, b.total, b.min, b.max, b.last, b.last_day) for key, b in blocks.items()]
+
+
+class MetricStore:
+    """只追加的指标时序存储（线程安全）
+
+    Args:
+        path: SQLite 数据库路径（':memory:' 为内存库）
+    """
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(self, project: str, team: str, metric: str, day: DateLike, value: float,
+               weight: float = 1.0):
+        """追加一个指标值
+
+        Args:
+            weight: 权重（如参与计算的需求数）；比率类指标按权重加权平均
+        """
+        self.append_many([(project, team, metric, day, value, weight)])
+
+    def append_many(self, records: Iterable[Sequence]) -> int:
+        """批量追加 (project, team, metric, day, value[, weight])，返回写入条数
+
+        同一批次内先在内存中合并到块，每个块只执行一次 UPSERT
+        """
+        samples = []
+        now = time.time()
+        for record in records:
+            project, team, metric, day, value = record[:5]
+            weight = float(record[5]) if len(record) > 5 and record[5] is not None else 1.0
+            samples.append((project, team or '', metric, to_day(day), float(value), weight, now))
+
+        if not samples:
+            return 0
+        blocks = _merge_blocks(samples)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO samples (project, team, metric, day, value, weight, recorded_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', samples)
+            self._conn.executemany(_UPSERT, _block_rows(blocks))
+        return len(samples)
+
+    def prune_samples(self, before: DateLike) -> int:
+        """删除早于该日期的原始样本（预聚合块保留），返回删除条数"""
+        with self._lock, self._conn:
+            return self._conn.execute('DELETE FROM samples WHERE day < ?', (to_day(before),)).rowcount
+
+    def rebuild_rollups(self) -> int:
+        """根据原始样本重建全部预聚合块（已裁剪的样本对应的块会丢失），返回样本数
+
+        只重写 rollups 表，原始样本不动；读取、清空与写入在同一事务内，出错时整体回滚
+        """
+        with self._lock, self._conn:
+            samples = self._conn.execute(
+                'SELECT project, team, metric, day, value, weight FROM samples ORDER BY id').fetchall()
+            self._conn.execute('DELETE FROM rollups')
+            self._conn.executemany(_UPSERT, _block_rows(_merge_blocks(samples)))
+        return len(samples)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def query(self, metric: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+              project: Optional[str] = None, team: Optional[str] = None,
+              resolution: str = 'auto', group_by: Optional[str] = None) -> List[Dict]:
+        """区间查询（读取预聚合块）
+
+        Args:
+            start/end: 起止日期（含），为空表示不限；首尾块按整块计入
+            project/team: 过滤条件，为空表示合并所有空间/团队
+            resolution: day / week / month / auto
+            group_by: 'project' 或 'team' 时按该维度分别返回序列
+
+        Returns:
+            [{'date': 块起始日期, 'count', 'mean', 'min', 'max', ('project'|'team')}]，按日期排序
+        """
+        if group_by not in (None, 'project', 'team'):
+            raise ValueError(f"不支持的分组: {group_by}")
+        start_day = to_day(start) if start is not None else None
+        end_day = to_day(end) if end is not None else None
+        if resolution == 'auto':
+            if start_day is None or end_day is None:
+                bounds = self.bounds(metric)
+                if bounds is None:
+                    return []
+                start_day = bounds[0] if start_day is None else start_day
+                end_day = bounds[1] if end_day is None else end_day
+            resolution = auto_resolution(start_day, end_day)
+        elif resolution not in RESOLUTIONS:
+            raise ValueError(f"未知粒度: {resolution}")
+
+        where = ['metric = ?', 'resolution = ?']
+        params: List = [metric, resolution]
+        if start_day is not None:
+            where.append('bucket >= ?')
+            params.append(bucket_start(start_day, resolution))
+        if end_day is not None:
+            where.append('bucket <= ?')
+            params.append(end_day)
+        for column, value in (('project', project), ('team', team)):
+            if value is not None:
+                where.append(f'{column} = ?')
+                params.append(value)
+        group = f'{group_by}, bucket' if group_by else 'bucket'
+        sql = (f'SELECT {group}, SUM(count), SUM(weight), SUM(total), MIN(min), MAX(max) '
+               f'FROM rollups WHERE {" AND ".join(where)} GROUP BY {group} ORDER BY {group}')
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        result = []
+        for row in rows:
+            if group_by:
+                key, row = row[0], row[1:]
+            bucket, count, weight, total, low, high = row
+            point = {'date': date.fromordinal(bucket).isoformat(), 'count': count,
+                     'mean': total / weight if weight else None, 'min': low, 'max': high}
+            if group_by:
+                point[group_by] = key
+            result.append(point)
+        return result
+
+    def latest(self, metric: str, project: Optional[str] = None,
+               team: Optional[str] = None) -> Optional[Dict]:
+        """最近一天的聚合值"""
+        bounds = self.bounds(metric, project, team)
+        if bounds is None:
+            return None
+        points = self.query(metric, bounds[1], bounds[1], project, team, resolution='day')
+        return points[-1] if points else None
+
+    def bounds(self, metric: str, project: Optional[str] = None,
+               team: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """指标有数据的首末日序数"""
+        where, params = ['metric = ?', "resolution = 'day'"], [metric]
+        for column, value in (('project', project), ('team', team)):
+            if value is not None:
+                where.append(f'{column} = ?')
+                params.append(value)
+        with self._lock:
+            row = self._conn.execute(f'SELECT MIN(bucket), MAX(bucket) FROM rollups '
+                                     f'WHERE {" AND ".join(where)}', params).fetchone()
+        return None if row[0] is None else (row[0], row[1])
+
+    def signature(self, metric: str) -> Tuple:
+        """指标月度预聚合块的签名（块数、样本数、权重和、加权和、最新日），写入后必然变化"""
+        with self._lock:
+            return tuple(self._conn.execute(
+                "SELECT COUNT(*), TOTAL(count), TOTAL(weight), TOTAL(total), MAX(last_day) "
+                "FROM rollups WHERE metric = ? AND resolution = 'month'", (metric,)).fetchone())
+
+    def series_keys(self) -> List[Tuple[str, str, str]]:
+        """已有数据的 (project, team, metric) 组合"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT DISTINCT project, team, metric FROM rollups WHERE resolution = 'month' "
+                "ORDER BY project, team, metric").fetchall()
+
+
+def _read_records(path: str) -> Iterable[Tuple]:
+    """读取 CSV（表头 project,team,metric,day,value[,weight]）或 NDJSON"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        if path.endswith(('.ndjson', '.jsonl')):
+            for line in f:
+                if line.strip():
+                    r = json.loads(line)
+                    yield r['project'], r.get('team', ''), r['metric'], r['day'], r['value'], r.get('weight')
+        else:
+            for r in csv.DictReader(f):
+                yield (r['project'], r.get('team', ''), r['metric'], r['day'], r['value'],
+                       r.get('weight') or None)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='质量指标时序存储')
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'数据库路径（默认 {DEFAULT_DB}）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_append = sub.add_parser('append', help='追加一个指标值')
+    p_append.add_argument('--project', required=True)
+    p_append.add_argument('--team', default='')
+    p_append.add_argument('--metric', required=True)
+    p_append.add_argument('--value', type=float, required=True)
+    p_append.add_argument('--weight', type=float, default=1.0, help='权重（如参与计算的需求数）')
+    p_append.add_argument('--day', default=date.today().isoformat(), help='日期 YYYY-MM-DD（默认今天）')
+
+    p_import = sub.add_parser('import', help='从 CSV/NDJSON 批量导入')
+    p_import.add_argument('path')
+
+    p_query = sub.add_parser('query', help='区间查询')
+    p_query.add_argument('--metric', required=True)
+    p_query.add_argument('--from', dest='start')
+    p_query.add_argument('--to', dest='end')
+    p_query.add_argument('--project')
+    p_query.add_argument('--team')
+    p_query.add_argument('--resolution', choices=('auto',) + RESOLUTIONS, default='auto')
+    p_query.add_argument('--group-by', choices=('project', 'team'))
+    p_query.add_argument('--json', action='store_true', help='输出 JSON')
+
+    p_prune = sub.add_parser('prune', help='删除早于指定日期的原始样本（保留预聚合块）')
+    p_prune.add_argument('--before', required=True)
+
+    args = parser.parse_args(argv)
+    with MetricStore(args.db) as store:
+        if args.command == 'append':
+            store.append(args.project, args.team, args.metric, args.day, args.value, args.weight)
+            print(f"已追加 {args.metric}={args.value}（{args.project}/{args.team or '-'} {args.day}）")
+        elif args.command == 'import':
+            started = time.perf_counter()
+            count = store.append_many(_read_records(args.path))
+            print(f"已导入 {count} 条（{time.perf_counter() - started:.2f} 秒）")
+        elif args.command == 'prune':
+            print(f"已删除 {store.prune_samples(args.before)} 条原始样本")
+        else:
+            points = store.query(args.metric, args.start, args.end, args.project, args.team,
+                                 args.resolution, args.group_by)
+            if args.json:
+                print(json.dumps(points, ensure_ascii=False, indent=2))
+            else:
+                for p in points:
+                    prefix = f"{p[args.group_by]}\t" if args.group_by else ''
+                    mean = '-' if p['mean'] is None else f"{p['mean']:.2f}"
+                    print(f"{prefix}{p['date']}\tn={p['count']}\tmean={mean}\tmin={p['min']:.2f}\tmax={p['max']:.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
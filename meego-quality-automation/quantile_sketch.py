@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Lead Time 分位数草图
+KLL 分位数草图：固定内存（约 3k 个数值），可增量更新、可跨分片合并，秩误差约 1%。
+按 空间 × 团队 × 月 维护 Lead Time（DATEDIFF(deployed_at, requirement_created_at)）和各阶段耗时的草图，
+并预先合并 空间/团队/全部 与 全部时间 的汇总草图；任意切片的 p50/p85/p95 只需读取并合并少量草图，
+重复查询命中内存缓存，在微秒级返回。
+
+    sketches   (metric, project, team, month, data)；project/team 为 '*' 表示全部，month 为 0 表示全部时间
+
+用法:
+    python quantile_sketch.py ingest exports/requirement.ndjson --project iretail
+    python quantile_sketch.py query --metric lead_time --project iretail --team 交易
+    python quantile_sketch.py query --metric stage:评审 --from 2025-01-01 --to 2025-06-30
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import yaml
+
+from metric_store import DEFAULT_DB, DateLike, bucket_start, to_day
+from work_item_table import iter_rows, to_epoch_days
+
+DEFAULT_QUANTILES = (0.5, 0.85, 0.95)
+
+# 汇总草图的通配符
+ALL = '*'
+
+# 1970-01-01 的日序数，用于把天数时间戳换算为 metric_store 的日序数
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_HEADER = struct.Struct('<IIQdd')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sketches (
+    metric TEXT NOT NULL,
+    project TEXT NOT NULL,
+    team TEXT NOT NULL,
+    month INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (metric, project, team, month)
+) WITHOUT ROWID;
+"""
+
+
+class KLLSketch:
+    """KLL 分位数草图
+
+    第 h 层的每个元素代表 2^h 个原始值；某层写满时排序后隔一取一（随机起点）提升到上一层。
+    高层容量为 k，越往下按 2/3 递减，总元素数约为 3k。
+
+    Args:
+        k: 最高层容量，越大越精确（k=200 时秩误差约 1%）
+        seed: 随机数种子（压缩时选取奇偶位置）
+    """
+
+    __slots__ = ('k', 'levels', 'n', 'min', 'max', '_random', '_size', '_capacity', '_cdf')
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.levels: List[List[float]] = [[]]
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._random = random.Random(seed)
+        self._size = 0
+        self._capacity = self._total_capacity()
+        self._cdf = None
+
+    def _level_capacity(self, height: int) -> int:
+        depth = len(self.levels) - height - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _total_capacity(self) -> int:
+        return sum(self._level_capacity(h) for h in range(len(self.levels)))
+
+    def update(self, value: float):
+        """加入一个值"""
+        value = float(value)
+        self.levels[0].append(value)
+        self.n += 1
+        self._size += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self._cdf = None
+        if self._size >= self._capacity:
+            self._compress()
+
+    def extend(self, values: Iterable[float]):
+        for value in values:
+            self.update(value)
+
+    def _compress(self):
+        for h in range(len(self.levels)):
+            level = self.levels[h]
+            if len(level) < self._level_capacity(h):
+                continue
+            if h + 1 == len(self.levels):
+                self.levels.append([])
+                self._capacity = self._total_capacity()
+            level.sort()
+            # 奇数个时保留一个在本层，其余隔一取一提升
+            keep = [level.pop()] if len(level) % 2 else []
+            offset = self._random.getrandbits(1)
+            self.levels[h + 1].extend(level[offset::2])
+            self.levels[h] = keep
+            self._size = sum(len(lv) for lv in self.levels)
+            if self._size < self._capacity:
+                break
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """合并另一个草图（就地），返回自身"""
+        if other.n == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, level in enumerate(other.levels):
+            self.levels[h].extend(level)
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._capacity = self._total_capacity()
+        self._size = sum(len(lv) for lv in self.levels)
+        self._cdf = None
+        while self._size >= self._capacity:
+            self._compress()
+        return self
+
+    def _build_cdf(self) -> Tuple[List[float], List[int]]:
+        if self._cdf is None:
+            weighted = sorted((value, 1 << h) for h, level in enumerate(self.levels) for value in level)
+            values, cumulative, total = [], [], 0
+            for value, weight in weighted:
+                total += weight
+                values.append(value)
+                cumulative.append(total)
+            self._cdf = (values, cumulative)
+        return self._cdf
+
+    def quantile(self, q: float) -> Optional[float]:
+        """近似分位数（q 取 0~1），空草图返回 None"""
+        if self.n == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        values, cumulative = self._build_cdf()
+        index = bisect_left(cumulative, q * cumulative[-1])
+        return values[min(index, len(values) - 1)]
+
+    def quantiles(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> List[Optional[float]]:
+        return [self.quantile(q) for q in qs]
+
+    def to_bytes(self) -> bytes:
+        """紧凑的二进制序列化（头部 + 各层长度 + float64 数组）"""
+        lengths = array('I', (len(level) for level in self.levels))
+        values = array('d', (value for level in self.levels for value in level))
+        return (_HEADER.pack(self.k, len(self.levels), self.n, self.min, self.max)
+                + lengths.tobytes() + values.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes, seed: Optional[int] = None) -> 'KLLSketch':
+        k, height, n, low, high = _HEADER.unpack_from(data)
+        offset = _HEADER.size
+        lengths = array('I')
+        lengths.frombytes(data[offset:offset + 4 * height])
+        values = array('d')
+        values.frombytes(data[offset + 4 * height:])
+        sketch = cls(k, seed)
+        sketch.levels, start = [], 0
+        for length in lengths:
+            sketch.levels.append(values[start:start + length].tolist())
+            start += length
+        sketch.n, sketch.min, sketch.max = n, low, high
+        sketch._size = len(values)
+        sketch._capacity = sketch._total_capacity()
+        return sketch
+
+
+# ----------------------------------------------------------------------
+# Lead Time 与阶段耗时
+# ----------------------------------------------------------------------
+
+def lead_time_definition(config: Dict, metric_key: str = 'requirement_lead_time') -> Tuple[str, str, List[Tuple[str, str]]]:
+    """从质量指标配置解析 Lead Time 的起止字段和各阶段的结束字段
+
+    阶段耗时 = 本阶段最后一个时间字段 - 上一阶段最后一个时间字段，各阶段耗时之和等于 Lead Time
+
+    Returns:
+        (结束字段, 开始字段, [(阶段名, 阶段结束字段)])
+    """
+    metric = next((m for m in config.get('quality_metrics', []) if m.get('key') == metric_key), None)
+    if metric is None:
+        raise ValueError(f"质量指标配置中没有 {metric_key}")
+    match = re.match(r"\s*DATEDIFF\(\s*(\w+)\s*,\s*(\w+)", metric.get('formula', ''))
+    if not match:
+        raise ValueError(f"{metric_key} 的公式不是 DATEDIFF(结束, 开始)")
+    end_field, start_field = match.groups()
+
+    stage_ends: Dict[str, str] = {}
+    for field in metric.get('fields', []):
+        if field.get('type') == 'datetime' and field.get('stage'):
+            stage_ends[field['stage']] = field['key']
+    return end_field, start_field, list(stage_ends.items())
+
+
+def lead_time_samples(row: Dict, definition: Tuple[str, str, List[Tuple[str, str]]]) -> Iterator[Tuple[str, float, float]]:
+    """一个工作项的 Lead Time 与各阶段耗时
+
+    Yields:
+        (指标名, 耗时天数, 完成时间的天数时间戳)；指标名为 'lead_time' 或 'stage:<阶段>'
+    """
+    end_field, start_field, stages = definition
+    start, end = to_epoch_days(row.get(start_field)), to_epoch_days(row.get(end_field))
+    if start is not None and end is not None and end >= start:
+        yield 'lead_time', end - start, end
+
+    previous = None
+    for stage, field in stages:
+        finished = to_epoch_days(row.get(field))
+        if finished is None:
+            previous = None
+            continue
+        if previous is not None and finished >= previous:
+            yield f'stage:{stage}', finished - previous, finished
+        previous = finished
+
+
+# ----------------------------------------------------------------------
+# 持久化与查询
+# ----------------------------------------------------------------------
+
+class SketchStore:
+    """按 空间 × 团队 × 月 维护的草图库（与 metric_store 共用 SQLite 文件，线程安全）
+
+    Args:
+        path: SQLite 数据库路径
+        k: 新建草图的精度参数
+    """
+
+    def __init__(self, path: str = DEFAULT_DB, k: int = 200):
+        self.path = path
+        self.k = k
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        # 切片 → 合并后的草图；写入后清空
+        self._cache: Dict[Tuple, KLLSketch] = {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_many(self, records: Iterable[Tuple[str, str, str, DateLike, float]]) -> int:
+        """批量加入 (project, team, metric, day, value)，返回条数
+
+        每条记录更新 4 个范围（空间×团队、空间、团队、全部）× 2 个时间粒度（月、全部时间）的草图；
+        同一批次内先按键构建新草图，再与已存储的草图合并，每个键只读写一次
+        """
+        batches: Dict[Tuple, KLLSketch] = {}
+        count = 0
+        for project, team, metric, day, value in records:
+            month = bucket_start(to_day(day), 'month')
+            team = team or ''
+            for scope in ((project, team), (project, ALL), (ALL, team), (ALL, ALL)):
+                for period in (month, 0):
+                    key = (metric,) + scope + (period,)
+                    sketch = batches.get(key)
+                    if sketch is None:
+                        sketch = batches[key] = KLLSketch(self.k)
+                    sketch.update(value)
+            count += 1
+
+        with self._lock, self._conn:
+            for key, sketch in batches.items():
+                row = self._conn.execute(
+                    'SELECT data FROM sketches WHERE metric = ? AND project = ? AND team = ? AND month = ?',
+                    key).fetchone()
+                if row is not None:
+                    sketch = KLLSketch.from_bytes(row[0]).merge(sketch)
+                self._conn.execute('INSERT OR REPLACE INTO sketches VALUES (?, ?, ?, ?, ?)',
+                                   key + (sketch.to_bytes(),))
+            self._cache.clear()
+        return count
+
+    def sketch(self, metric: str, project: Optional[str] = None, team: Optional[str] = None,
+               start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> KLLSketch:
+        """切片的合并草图（返回副本，调用方可以继续 merge/update 而不影响缓存）
+
+        Args:
+            project/team: 为空表示全部
+            start/end: 按月选取（首尾月按整月计入），都为空时直接读取全部时间的汇总草图
+        """
+        return KLLSketch.from_bytes(self._merged(metric, project, team, start, end).to_bytes())
+
+    def _merged(self, metric: str, project: Optional[str] = None, team: Optional[str] = None,
+                start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> KLLSketch:
+        """切片的合并草图（缓存到下一次写入；只在本类内部只读使用）"""
+        scope = (project or ALL, team if team is not None else ALL)
+        months = None
+        if start is not None or end is not None:
+            months = (bucket_start(to_day(start), 'month') if start is not None else 1,
+                      to_day(end) if end is not None else date.max.toordinal())
+        cache_key = (metric,) + scope + (months,)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+            if months is None:
+                rows = self._conn.execute(
+                    'SELECT data FROM sketches WHERE metric = ? AND project = ? AND team = ? AND month = 0',
+                    (metric,) + scope).fetchall()
+            else:
+                rows = self._conn.execute(
+                    'SELECT data FROM sketches WHERE metric = ? AND project = ? AND team = ? '
+                    'AND month BETWEEN ? AND ? AND month > 0', (metric,) + scope + months).fetchall()
+            merged = KLLSketch(self.k)
+            for (data,) in rows:
+                merged.merge(KLLSketch.from_bytes(data))
+            self._cache[cache_key] = merged
+            return merged
+
+    def quantiles(self, metric: str, qs: Sequence[float] = DEFAULT_QUANTILES, **slice_args) -> Dict:
+        """切片的分位数 {'count', 'p50', 'p85', 'p95', ...}"""
+        sketch = self._merged(metric, **slice_args)
+        result = {'count': sketch.n}
+        for q, value in zip(qs, sketch.quantiles(qs)):
+            result[f'p{q * 100:g}'] = value
+        return result
+
+    def metrics(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT metric FROM sketches WHERE project = ? AND team = ? AND month = 0",
+                (ALL, ALL))]
+
+    def projects(self) -> List[str]:
+        """已有草图的空间"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT project FROM sketches WHERE project != ? AND team = ? AND month = 0 "
+                "ORDER BY project", (ALL, ALL))]
+
+    def digest(self) -> str:
+        """各空间全部时间草图的摘要；任何写入都会改变样本数，从而改变摘要"""
+        h = hashlib.sha1()
+        with self._lock:
+            for metric, project, data in self._conn.execute(
+                    "SELECT metric, project, data FROM sketches WHERE team = ? AND month = 0 "
+                    "ORDER BY metric, project", (ALL,)):
+                h.update(f'{metric}\0{project}\0'.encode('utf-8'))
+                h.update(data)
+        return h.hexdigest()
+
+
+def ingest_work_items(store: SketchStore, rows: Iterable[Dict], project: str,
+                      definition: Tuple[str, str, List[Tuple[str, str]]],
+                      team_field: str = 'team', batch_size: int = 20000) -> int:
+    """把工作项的 Lead Time 与阶段耗时加入草图库，返回样本数（按完成日期归入月份）"""
+    batch, total = [], 0
+    for row in rows:
+        team = row.get(team_field) or ''
+        for metric, days, finished in lead_time_samples(row, definition):
+            batch.append((project, str(team), metric, EPOCH_ORDINAL + int(math.floor(finished)), days))
+        if len(batch) >= batch_size:
+            total += store.add_many(batch)
+            batch = []
+    if batch:
+        total += store.add_many(batch)
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Lead Time 分位数草图')
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'数据库路径（默认 {DEFAULT_DB}）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_ingest = sub.add_parser('ingest', help='从导出的工作项文件加入 Lead Time 与阶段耗时')
+    p_ingest.add_argument('path', help='export_requirements.py 的导出文件（CSV/NDJSON/Parquet 目录）')
+    p_ingest.add_argument('--project', required=True, help='空间标识')
+    p_ingest.add_argument('--team-field', default='team', help='团队字段key（默认 team）')
+    p_ingest.add_argument('--config', default='quality-metrics.yaml', help='质量指标配置')
+
+    p_query = sub.add_parser('query', help='查询切片的分位数')
+    p_query.add_argument('--metric', default='lead_time', help="lead_time 或 stage:<阶段>")
+    p_query.add_argument('--project')
+    p_query.add_argument('--team')
+    p_query.add_argument('--from', dest='start')
+    p_query.add_argument('--to', dest='end')
+    p_query.add_argument('--quantiles', default='0.5,0.85,0.95')
+
+    args = parser.parse_args(argv)
+    with SketchStore(args.db) as store:
+        if args.command == 'ingest':
+            with open(args.config, 'r', encoding='utf-8') as f:
+                definition = lead_time_definition(yaml.safe_load(f))
+            started = time.perf_counter()
+            count = ingest_work_items(store, iter_rows(args.path), args.project, definition, args.team_field)
+            print(f"已加入 {count} 个样本（{time.perf_counter() - started:.2f} 秒）")
+        else:
+            qs = [float(q) for q in args.quantiles.split(',')]
+            started = time.perf_counter()
+            result = store.quantiles(args.metric, qs, project=args.project, team=args.team,
+                                     start=args.start, end=args.end)
+            result['elapsed_us'] = round((time.perf_counter() - started) * 1e6, 1)
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
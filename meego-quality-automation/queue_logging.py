@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+基于队列的日志配置
+业务线程只把日志记录放入队列（QueueHandler），由单独的监听线程（QueueListener）格式化并写出，
+调用方不在流 I/O 上竞争锁；并发 worker 越多，每条日志的开销仍然不变。
+
+- 每条记录附带当前上下文：空间（project）、阶段（phase），由 log_context() 按线程/协程设置
+- 多进程：主进程创建跨进程队列并监听，子进程用 worker_initializer 把日志发回主进程统一输出
+
+用法:
+    listener = setup_logging()
+    with log_context(project='iretail', phase='fields'):
+        logger.info("创建字段...")
+    # 2025-01-01 10:00:00 [INFO] [iretail/fields] 创建字段...
+
+    # 多进程
+    log_queue = setup_multiprocess_logging()
+    with ProcessPoolExecutor(initializer=worker_initializer, initargs=(log_queue,)) as pool:
+        ...
+"""
+
+import atexit
+import contextvars
+import logging
+import multiprocessing
+import queue
+import sys
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import IO, Dict, Optional
+
+DEFAULT_FORMAT = '%(asctime)s [%(levelname)s] [%(project)s/%(phase)s] %(message)s'
+DEFAULT_DATEFMT = '%Y-%m-%d %H:%M:%S'
+
+# 未设置上下文时的占位
+_EMPTY = '-'
+
+_log_context: contextvars.ContextVar = contextvars.ContextVar('log_context', default={})
+
+# 当前进程安装的监听器（setup_logging 重复调用时先停止旧的）
+_listener: Optional[QueueListener] = None
+
+
+@contextmanager
+def log_context(**fields: str):
+    """在当前线程/协程内为日志附加上下文（project、phase 等），可嵌套，内层覆盖外层"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def current_context() -> Dict[str, str]:
+    """当前线程/协程的日志上下文"""
+    return dict(_log_context.get())
+
+
+class ContextFilter(logging.Filter):
+    """把日志上下文写入记录（在产生日志的线程中执行，监听线程格式化时仍可见）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        record.project = context.get('project', _EMPTY)
+        record.phase = context.get('phase', _EMPTY)
+        for key, value in context.items():
+            if key not in ('project', 'phase'):
+                setattr(record, key, value)
+        return True
+
+
+def _install_queue_handler(log_queue, level: int) -> QueueHandler:
+    """把根日志器的处理器替换为只入队的 QueueHandler"""
+    handler = QueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    return handler
+
+
+def _output_handler(stream: Optional[IO[str]], fmt: str, datefmt: str) -> logging.Handler:
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter(fmt, datefmt))
+    return handler
+
+
+def stop_logging():
+    """停止监听线程（写出队列中剩余的记录）"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _start_listener(log_queue, handlers) -> QueueListener:
+    global _listener
+    stop_logging()
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def setup_logging(level: int = logging.INFO, stream: Optional[IO[str]] = None,
+                  fmt: str = DEFAULT_FORMAT, datefmt: str = DEFAULT_DATEFMT,
+                  handlers=None) -> QueueListener:
+    """配置进程内基于队列的日志（替代 logging.basicConfig）
+
+    Args:
+        level: 根日志器级别
+        stream: 输出流（默认 sys.stderr）
+        fmt: 日志格式，可使用 %(project)s、%(phase)s
+        handlers: 自定义输出处理器（如 FileHandler），为空时输出到 stream
+
+    Returns:
+        已启动的 QueueListener（进程退出时自动停止）
+    """
+    log_queue = queue.SimpleQueue()
+    _install_queue_handler(log_queue, level)
+    return _start_listener(log_queue, handlers or [_output_handler(stream, fmt, datefmt)])
+
+
+def setup_multiprocess_logging(level: int = logging.INFO, stream: Optional[IO[str]] = None,
+                               fmt: str = DEFAULT_FORMAT, datefmt: str = DEFAULT_DATEFMT,
+                               handlers=None, context=None):
+    """配置跨进程日志汇总：主进程监听一个 multiprocessing 队列，子进程的日志经由它统一输出
+
+    Args:
+        context: multiprocessing 上下文（默认当前启动方式）
+
+    Returns:
+        传给 worker_initializer 的跨进程队列
+    """
+    log_queue = (context or multiprocessing).Queue()
+    _install_queue_handler(log_queue, level)
+    _start_listener(log_queue, handlers or [_output_handler(stream, fmt, datefmt)])
+    return log_queue
+
+
+def worker_initializer(log_queue, level: int = logging.INFO, **context: str):
+    """子进程初始化：日志发回主进程的队列（用作 ProcessPoolExecutor 的 initializer）
+
+    Args:
+        log_queue: setup_multiprocess_logging 返回的队列
+        context: 该进程所有日志的默认上下文（如 project）
+    """
+    # fork 启动时子进程继承了父进程的监听器对象，但监听线程不会随之复制
+    global _listener
+    _listener = None
+    _install_queue_handler(log_queue, level)
+    if context:
+        _log_context.set({**_log_context.get(), **context})
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+流量回放压测
+把 mcp_debugger 捕获的请求（HAR 文件或 NDJSON 调试报告）按原始时间间隔的倍速回放到
+本地模拟后端（或指定的本地服务），用并发 worker 发送，输出吞吐量和延迟分布，
+用于在大规模推广前找出并发拐点。
+
+用法:
+    python replay_load.py capture.har --speed 1,10,max --workers 1,4,16
+    python replay_load.py api_debug_report.json --speed max --workers 8 --latency-ms 20
+    python replay_load.py capture.har --target http://127.0.0.1:8080 --output replay.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+from fake_meego import FakeMeegoBackend
+from har_stream import CapturedRequest, endpoint_path, iter_captured_requests
+from request_metrics import LatencyHistogram
+from url_templates import PathTemplateTrie
+
+# 不回放的请求头（由 requests 重新生成，或是 HTTP/2 伪头）
+_SKIPPED_HEADERS = {'host', 'content-length', 'accept-encoding', 'connection'}
+
+# 每个 worker 允许排队的请求数，超过后调度线程等待（内存占用与会话长度无关）
+QUEUE_PER_WORKER = 4
+
+
+# ----------------------------------------------------------------------
+# 读取会话
+# ----------------------------------------------------------------------
+
+def _iter_report(index_path: str) -> Iterator[CapturedRequest]:
+    """读取 NDJSON 调试报告（索引文件 + 分卷）"""
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    directory = os.path.dirname(os.path.abspath(index_path))
+    for part in index.get('files', []):
+        with open(os.path.join(directory, part['file']), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield CapturedRequest(**{k: record.get(k) for k in (
+                        'method', 'url', 'headers', 'payload', 'response', 'status_code',
+                        'started_at', 'duration_ms')})
+
+
+def iter_session(path: str) -> Iterator[CapturedRequest]:
+    """按文件类型读取捕获会话：*.har 流式解析，其余视为 NDJSON 调试报告索引"""
+    if path.endswith('.har'):
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            yield from iter_captured_requests(f)
+    else:
+        yield from _iter_report(path)
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+# ----------------------------------------------------------------------
+# 回放
+# ----------------------------------------------------------------------
+
+class _Result:
+    """回放统计（线程安全）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = LatencyHistogram()
+        self.lateness = LatencyHistogram()
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.templates = PathTemplateTrie(LatencyHistogram.merge)
+
+    def record(self, req: CapturedRequest, status: str, elapsed: float, late: float):
+        with self.lock:
+            self.latency.record(elapsed)
+            self.lateness.record(late)
+            self.statuses[status] += 1
+            _, path = endpoint_path(req.url)
+            _, histogram, _ = self.templates.add(req.method, path, LatencyHistogram)
+            histogram.record(elapsed)
+
+
+class Replayer:
+    """按倍速回放捕获的请求
+
+    Args:
+        target: 回放目标的根地址（如 http://127.0.0.1:8080）；为 None 时使用进程内模拟后端
+        backend: 进程内模拟后端（target 为 None 时使用）
+        workers: 并发 worker 数
+        speed: 回放倍速；0 表示不按原始间隔等待，尽快发送
+        timeout: 单个请求超时（秒）
+    """
+
+    def __init__(self, target: Optional[str] = None, backend: Optional[FakeMeegoBackend] = None,
+                 workers: int = 4, speed: float = 1.0, timeout: float = 30.0):
+        self.target = urlsplit(target) if target else None
+        self.backend = backend if target is None else None
+        if target is None and self.backend is None:
+            self.backend = FakeMeegoBackend()
+        self.workers = workers
+        self.speed = speed
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            if self.backend is not None:
+                self.backend.mount(session)
+        return session
+
+    def _url(self, url: str) -> str:
+        if self.target is None:
+            return url
+        parts = urlsplit(url)
+        return urlunsplit((self.target.scheme, self.target.netloc,
+                           self.target.path.rstrip('/') + parts.path, parts.query, ''))
+
+    def _send(self, req: CapturedRequest, scheduled: float, result: _Result):
+        started = time.perf_counter()
+        headers = {k: v for k, v in (req.headers or {}).items()
+                   if not k.startswith(':') and k.lower() not in _SKIPPED_HEADERS}
+        try:
+            response = self._session().request(
+                req.method, self._url(req.url), headers=headers,
+                json=req.payload, timeout=self.timeout)
+            status = str(response.status_code)
+        except requests.RequestException as e:
+            status = type(e).__name__
+            with result.lock:
+                result.errors[status] += 1
+        result.record(req, status, time.perf_counter() - started, max(0.0, started - scheduled))
+
+    def run(self, requests_iter: Iterator[CapturedRequest], limit: Optional[int] = None) -> Dict:
+        """回放并返回统计结果"""
+        result = _Result()
+        slots = threading.BoundedSemaphore(self.workers * QUEUE_PER_WORKER)
+        first_ts: Optional[float] = None
+        sent = 0
+
+        def task(req, scheduled):
+            try:
+                self._send(req, scheduled, result)
+            finally:
+                slots.release()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='replay') as pool:
+            for req in itertools.islice(requests_iter, limit):
+                # 计划发送时间 = 回放起点 + 原始偏移 / 倍速
+                scheduled = started
+                ts = _timestamp(req.started_at)
+                if self.speed > 0 and ts is not None:
+                    if first_ts is None:
+                        first_ts = ts
+                    scheduled = started + max(0.0, ts - first_ts) / self.speed
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                slots.acquire()
+                pool.submit(task, req, scheduled)
+                sent += 1
+        elapsed = time.perf_counter() - started
+
+        return {
+            'workers': self.workers,
+            'speed': self.speed or 'max',
+            'requests': sent,
+            'elapsed_seconds': round(elapsed, 6),
+            'requests_per_sec': round(sent / elapsed, 3) if elapsed else 0.0,
+            'statuses': dict(result.statuses),
+            'errors': dict(result.errors),
+            'latency': _summary(result.latency),
+            'lateness': _summary(result.lateness),
+            'endpoints': sorted(
+                ({'method': method, 'endpoint': template, **_summary(histogram)}
+                 for method, template, histogram in result.templates.items()),
+                key=lambda row: -row['count']),
+        }
+
+
+def _summary(histogram: LatencyHistogram) -> Dict:
+    """直方图摘要（不含分桶明细）"""
+    data = histogram.to_dict()
+    data.pop('buckets_us')
+    return data
+
+
+def _speed(value: str) -> float:
+    value = value.strip().lower()
+    if value in ('max', '0', ''):
+        return 0.0
+    return float(value.rstrip('x×'))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='飞书项目API流量回放压测')
+    parser.add_argument('session', help='捕获会话：HAR 文件或 NDJSON 调试报告索引（api_debug_report.json）')
+    parser.add_argument('--speed', default='1,10,max', help='回放倍速列表，max 表示尽快发送')
+    parser.add_argument('--workers', default='4', help='并发 worker 数列表')
+    parser.add_argument('--limit', type=int, help='每轮最多回放的请求数')
+    parser.add_argument('--target', help='回放目标根地址（默认使用进程内模拟后端）')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='模拟后端注入延迟(毫秒)')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='模拟后端延迟抖动上限(毫秒)')
+    parser.add_argument('--throttle-qps', type=float, default=0.0, help='模拟后端限流QPS(0为不限流)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='模拟后端注入 HTTP 503 的概率')
+    parser.add_argument('--output', help='结果JSON输出路径（默认输出到标准输出）')
+    args = parser.parse_args(argv)
+
+    speeds = [_speed(s) for s in args.speed.split(',') if s.strip()]
+    workers = [int(w) for w in args.workers.split(',') if w.strip()]
+
+    results = []
+    for speed, n_workers in itertools.product(speeds, workers):
+        # 每轮使用全新的模拟后端
+        backend = None if args.target else FakeMeegoBackend(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+            throttle_qps=args.throttle_qps, error_rate=args.error_rate)
+        replayer = Replayer(args.target, backend, workers=n_workers, speed=speed)
+        result = replayer.run(iter_session(args.session), args.limit)
+        results.append(result)
+        print(f"speed={result['speed']} workers={n_workers}: {result['requests']} req, "
+              f"{result['requests_per_sec']} req/s, p50 {result['latency']['p50_ms']}ms, "
+              f"p99 {result['latency']['p99_ms']}ms, lag p99 {result['lateness']['p99_ms']}ms",
+              file=sys.stderr)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'session': args.session,
+        'target': args.target or 'fake',
+        'results': results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"回放结果已保存到 {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+API请求指标采集
+按端点和HTTP方法统计调用次数、错误码、收发字节数和延迟分布（HDR风格直方图），
+可在运行结束或按需导出为 JSON / Prometheus 文本格式
+"""
+
+import json
+import re
+import signal
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 每个2的幂区间内的子桶数 = 2^SUB_BUCKET_BITS，相对误差约 1/32
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+
+# Prometheus 直方图的 le 边界（秒）
+PROMETHEUS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 端点中的可变段（纯数字、长十六进制ID、UUID）
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F]{16,}|[0-9a-fA-F-]{36})$')
+
+
+def endpoint_template(endpoint: str) -> str:
+    """把端点中的ID段替换为占位符，避免统计维度无限增长"""
+    path = endpoint.split('?', 1)[0].strip('/')
+    return '/'.join('{id}' if _ID_SEGMENT.match(seg) else seg for seg in path.split('/'))
+
+
+def parse_response(response) -> Tuple[Optional[Dict], Optional[object]]:
+    """解析一次 JSON 响应体，返回 (响应体, err_code)
+
+    非200响应不解析，返回 (None, None)；响应体不是 JSON 对象时返回 (None, 'invalid_json')
+    """
+    if response.status_code != 200:
+        return None, None
+    try:
+        body = response.json()
+    except ValueError:
+        return None, 'invalid_json'
+    if not isinstance(body, dict):
+        return None, 'invalid_json'
+    return body, body.get('err_code')
+
+
+class LatencyHistogram:
+    """对数-线性分桶的延迟直方图（微秒精度，记录为O(1)的字典自增）"""
+
+    __slots__ = ('buckets', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @staticmethod
+    def bucket_index(micros: int) -> int:
+        """微秒值 -> 桶序号；小于 2*SUB_BUCKET_COUNT 的值精确记录"""
+        if micros < 2 * SUB_BUCKET_COUNT:
+            return max(micros, 0)
+        shift = micros.bit_length() - 1 - SUB_BUCKET_BITS
+        return (shift + 1) * SUB_BUCKET_COUNT + ((micros >> shift) - SUB_BUCKET_COUNT)
+
+    @staticmethod
+    def bucket_bounds(index: int) -> Tuple[int, int]:
+        """桶序号 -> [下界, 上界]（微秒，闭区间）"""
+        if index < 2 * SUB_BUCKET_COUNT:
+            return index, index
+        shift = index // SUB_BUCKET_COUNT - 1
+        mantissa = index % SUB_BUCKET_COUNT + SUB_BUCKET_COUNT
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        """记录一次耗时（秒）"""
+        index = self.bucket_index(int(seconds * 1_000_000))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: 'LatencyHistogram'):
+        """合并另一个直方图"""
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def percentile(self, pct: float) -> float:
+        """返回第 pct 百分位的耗时（秒），取所在桶的中点"""
+        if not self.count:
+            return 0.0
+        target = max(1, int(round(pct / 100.0 * self.count)))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                low, high = self.bucket_bounds(index)
+                value = (low + high) / 2 / 1_000_000
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds: Tuple[float, ...]) -> List[int]:
+        """按给定的 le 边界（秒）计算累计计数，用于 Prometheus 导出"""
+        limits = [b * 1_000_000 for b in bounds]
+        counts = [0] * len(limits)
+        for index, count in self.buckets.items():
+            upper = self.bucket_bounds(index)[1]
+            for i, limit in enumerate(limits):
+                if upper <= limit:
+                    counts[i] += count
+        return counts
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum_seconds': round(self.total, 6),
+            'min_ms': round((self.min or 0) * 1000, 3),
+            'max_ms': round((self.max or 0) * 1000, 3),
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p90_ms': round(self.percentile(90) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'buckets_us': {str(self.bucket_bounds(i)[0]): c for i, c in sorted(self.buckets.items())},
+        }
+
+
+class EndpointStats:
+    """单个 (方法, 端点) 的累计统计"""
+
+    __slots__ = ('count', 'errors', 'bytes_sent', 'bytes_received', 'latency')
+
+    def __init__(self):
+        self.count = 0
+        self.errors: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = LatencyHistogram()
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'errors': dict(self.errors),
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'latency': self.latency.to_dict(),
+        }
+
+
+class RequestMetrics:
+    """线程安全的请求指标注册表"""
+
+    def __init__(self, namespace: str = 'meego_api'):
+        self.namespace = namespace
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], EndpointStats] = {}
+
+    def record(self, method: str, endpoint: str, duration: float,
+               error: Optional[str] = None, bytes_sent: int = 0, bytes_received: int = 0):
+        """记录一次请求
+
+        Args:
+            method: HTTP方法
+            endpoint: API端点（会被模板化）
+            duration: 耗时（秒）
+            error: 错误码（HTTP状态码、err_code 或异常类名），成功时为空
+            bytes_sent: 请求体字节数
+            bytes_received: 响应体字节数
+        """
+        key = (method, endpoint_template(endpoint))
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = EndpointStats()
+            stats.count += 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            stats.latency.record(duration)
+            if error is not None:
+                stats.errors[error] = stats.errors.get(error, 0) + 1
+
+    def observe_response(self, method: str, endpoint: str, response, started: float,
+                         err_code: Optional[object] = None):
+        """根据 requests.Response 记录一次请求（started 为 time.perf_counter() 起点）
+
+        不读取也不解析响应体：业务错误码由调用方解析响应后传入（见 parse_response），
+        接收字节数取自 Content-Length 响应头（缺失时记为0）
+
+        Args:
+            err_code: 响应体中的 err_code（0/None 表示成功）
+        """
+        if response.status_code != 200:
+            error = f"http_{response.status_code}"
+        else:
+            error = None if err_code in (0, None) else str(err_code)
+
+        body = response.request.body if response.request is not None else None
+        try:
+            received = int(response.headers.get('Content-Length') or 0)
+        except ValueError:
+            received = 0
+        self.record(method, endpoint, time.perf_counter() - started, error,
+                    bytes_sent=len(body) if body else 0, bytes_received=received)
+
+    def observe_exception(self, method: str, endpoint: str, exc: BaseException, started: float):
+        """记录一次未拿到响应的请求（超时、连接错误等）"""
+        self.record(method, endpoint, time.perf_counter() - started, type(exc).__name__)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> Dict[Tuple[str, str], EndpointStats]:
+        """返回当前统计的合并副本"""
+        with self._lock:
+            copy = {}
+            for key, stats in self._stats.items():
+                clone = EndpointStats()
+                clone.count = stats.count
+                clone.errors = dict(stats.errors)
+                clone.bytes_sent = stats.bytes_sent
+                clone.bytes_received = stats.bytes_received
+                clone.latency.merge(stats.latency)
+                copy[key] = clone
+            return copy
+
+    # ------------------------------------------------------------------
+    # 导出
+    # ------------------------------------------------------------------
+
+    def to_json(self) -> Dict:
+        """导出为可序列化的字典，端点按累计耗时降序排列"""
+        stats = self.snapshot()
+        endpoints = [
+            dict(method=method, endpoint=endpoint, **s.to_dict())
+            for (method, endpoint), s in sorted(stats.items(), key=lambda kv: -kv[1].latency.total)
+        ]
+        return {
+            'started_at': self.started_at,
+            'elapsed_seconds': round(time.time() - self.started_at, 3),
+            'total_requests': sum(s.count for s in stats.values()),
+            'total_errors': sum(sum(s.errors.values()) for s in stats.values()),
+            'endpoints': endpoints,
+        }
+
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        ns = self.namespace
+        stats = sorted(self.snapshot().items())
+        lines = [
+            f'# HELP {ns}_requests_total Total API requests.',
+            f'# TYPE {ns}_requests_total counter',
+        ]
+        for (method, endpoint), s in stats:
+            lines.append(f'{ns}_requests_total{_labels(method, endpoint)} {s.count}')
+
+        lines += [f'# HELP {ns}_errors_total API errors by code.', f'# TYPE {ns}_errors_total counter']
+        for (method, endpoint), s in stats:
+            for code, count in sorted(s.errors.items()):
+                lines.append(f'{ns}_errors_total{_labels(method, endpoint, code=code)} {count}')
+
+        for name, attr in (('request_bytes_total', 'bytes_sent'), ('response_bytes_total', 'bytes_received')):
+            lines += [f'# HELP {ns}_{name} API payload bytes.', f'# TYPE {ns}_{name} counter']
+            for (method, endpoint), s in stats:
+                lines.append(f'{ns}_{name}{_labels(method, endpoint)} {getattr(s, attr)}')
+
+        lines += [f'# HELP {ns}_request_duration_seconds API request latency.',
+                  f'# TYPE {ns}_request_duration_seconds histogram']
+        for (method, endpoint), s in stats:
+            for bound, count in zip(PROMETHEUS_BUCKETS, s.latency.cumulative_counts(PROMETHEUS_BUCKETS)):
+                lines.append(f'{ns}_request_duration_seconds_bucket'
+                             f'{_labels(method, endpoint, le=repr(bound))} {count}')
+            lines.append(f'{ns}_request_duration_seconds_bucket'
+                         f'{_labels(method, endpoint, le="+Inf")} {s.latency.count}')
+            lines.append(f'{ns}_request_duration_seconds_sum{_labels(method, endpoint)} {s.latency.total:.6f}')
+            lines.append(f'{ns}_request_duration_seconds_count{_labels(method, endpoint)} {s.latency.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path: str):
+        """写入文件，后缀为 .prom / .txt 时输出 Prometheus 格式，否则输出 JSON"""
+        if path.endswith(('.prom', '.txt')):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.to_json(), ensure_ascii=False, indent=2)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def install_signal_dump(self, path: str) -> bool:
+        """收到 SIGUSR1 时导出当前指标（Windows 不支持，返回 False）"""
+        if not hasattr(signal, 'SIGUSR1'):
+            return False
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.dump(path))
+        return True
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(method: str, endpoint: str, **extra) -> str:
+    labels = [('method', method), ('endpoint', endpoint)] + sorted(extra.items())
+    return '{' + ','.join(f'{k}="{_escape(str(v))}"' for k, v in labels) + '}'
+
+
+# 进程级默认注册表，未显式指定时所有客户端共用
+METRICS = RequestMetrics()
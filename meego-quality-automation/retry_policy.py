@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+API请求重试策略
+对超时、连接错误、限流和5xx等瞬时故障做指数退避重试；
+调用方在首次尝试前生成 X-IDEM-UUID 并在所有重试中复用，保证写操作不会重复执行
+"""
+
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, FrozenSet, Optional
+
+import requests
+
+# 可以安全重试的HTTP方法（无需幂等键）
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+@dataclass
+class RetryPolicy:
+    """指数退避重试策略
+
+    Attributes:
+        max_attempts: 最大尝试次数（含首次）
+        base_delay: 首次重试前的基础等待（秒）
+        max_delay: 单次等待上限（秒）
+        jitter: 随机抖动比例（0~1），避免并发请求同时重试
+        retry_statuses: 视为瞬时故障的HTTP状态码
+        retry_err_codes: 视为瞬时故障的业务 err_code
+    """
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    jitter: float = 0.5
+    retry_statuses: FrozenSet[int] = field(default_factory=lambda: frozenset({429, 500, 502, 503, 504}))
+    retry_err_codes: FrozenSet[int] = field(default_factory=frozenset)
+
+    retryable_exceptions = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """第 attempt 次失败后的等待时间；优先遵循服务端的 Retry-After"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        delay = min(self.base_delay * (2 ** (attempt - 1)), self.max_delay)
+        return delay * (1 - self.jitter * random.random())
+
+    def should_retry(self, response: requests.Response) -> bool:
+        """判断响应是否属于可重试的瞬时故障"""
+        if response.status_code in self.retry_statuses:
+            return True
+        if self.retry_err_codes and response.status_code == 200:
+            try:
+                return response.json().get('err_code') in self.retry_err_codes
+            except ValueError:
+                return False
+        return False
+
+
+# 不重试（用于需要立即失败的场景）
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+def is_retry_safe(method: str, headers: Optional[dict]) -> bool:
+    """只有幂等方法或带有幂等键的写请求才允许自动重试"""
+    return method.upper() in IDEMPOTENT_METHODS or bool(headers and headers.get('X-IDEM-UUID'))
+
+
+def call_with_retry(attempt_fn: Callable[[], requests.Response], policy: RetryPolicy,
+                    on_retry: Optional[Callable[[int, float, str], None]] = None,
+                    sleep: Callable[[float], None] = time.sleep) -> requests.Response:
+    """执行请求并在瞬时故障时重试
+
+    Args:
+        attempt_fn: 发送一次请求的函数（每次调用必须携带相同的幂等键）
+        policy: 重试策略
+        on_retry: 重试前的回调 (已尝试次数, 等待秒数, 原因)
+        sleep: 等待函数（便于测试替换）
+
+    Returns:
+        最后一次尝试的响应；若最后一次仍为异常则抛出该异常
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            response = attempt_fn()
+        except policy.retryable_exceptions as e:
+            if attempt >= policy.max_attempts:
+                raise
+            delay = policy.backoff(attempt)
+            reason = type(e).__name__
+        else:
+            if attempt >= policy.max_attempts or not policy.should_retry(response):
+                return response
+            delay = policy.backoff(attempt, response.headers.get('Retry-After'))
+            reason = f"HTTP {response.status_code}"
+
+        if on_retry:
+            on_retry(attempt, delay, reason)
+        sleep(delay)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+读请求合并（single-flight）与短期缓存
+多个线程同时发出相同的读请求时只有一个真正发送，其余等待并共享结果；
+结果在短时间内缓存，重复读取直接返回。写操作后按空间失效缓存。
+"""
+
+import copy
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """一个正在进行中的请求"""
+
+    __slots__ = ('event', 'result', 'error', 'invalidated')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.invalidated = False
+
+
+def _in_scope(key: Hashable, scope: Optional[Tuple]) -> bool:
+    if scope is None:
+        return True
+    return isinstance(key, tuple) and key[:len(scope)] == scope
+
+
+class SingleFlight:
+    """相同 key 的并发调用只执行一次
+
+    Args:
+        ttl: 结果缓存时间（秒），0 表示只合并并发调用、不缓存
+    """
+
+    def __init__(self, ttl: float = 10.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._memo: Dict[Hashable, Tuple[float, Any]] = {}
+        self.stats = {'calls': 0, 'shared': 0, 'memo_hits': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any],
+           cacheable: Callable[[Any], bool] = lambda result: result is not None) -> Any:
+        """执行 fn 或共享同一 key 的进行中调用/缓存结果
+
+        Args:
+            key: 请求标识（建议为元组，前缀用于按范围失效）
+            fn: 实际发送请求的函数
+            cacheable: 判断结果是否可以缓存（默认不缓存 None，即失败的请求）
+
+        Returns:
+            结果的独立副本，调用方修改不会影响其他调用方
+        """
+        with self._lock:
+            memo = self._memo.get(key)
+            if memo and memo[0] > time.monotonic():
+                self.stats['memo_hits'] += 1
+                return copy.deepcopy(memo[1])
+
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._inflight[key] = call
+                self.stats['calls'] += 1
+            else:
+                self.stats['shared'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if (call.error is None and self.ttl > 0 and not call.invalidated
+                        and cacheable(call.result)):
+                    self._memo[key] = (time.monotonic() + self.ttl, copy.deepcopy(call.result))
+            call.event.set()
+        return copy.deepcopy(call.result)
+
+    def invalidate(self, scope: Optional[Tuple] = None):
+        """失效缓存；scope 为 key 的前缀元组，为空时失效全部
+
+        进行中的调用结果也不会再被缓存（它们可能读到了写之前的状态）
+        """
+        with self._lock:
+            for key in [k for k in self._memo if _in_scope(k, scope)]:
+                del self._memo[key]
+            for key, call in self._inflight.items():
+                if _in_scope(key, scope):
+                    call.invalidated = True
+
+
+# 进程级默认实例：同一进程内的所有客户端共享读请求
+READ_FLIGHT = SingleFlight()
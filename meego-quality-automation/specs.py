@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+字段/节点规格模型
+用 __slots__ 不可变对象代替配置中的普通字典：键、类型、名称等字符串全部驻留（intern），
+选项保存为元组，结构相同的规格在进程内只保留一个实例，并缓存结构哈希。
+多空间清单（10万+ 字段规格）时可以显著降低内存占用和重复构建开销。
+"""
+
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_intern = sys.intern
+
+
+class _FrozenDict(tuple):
+    """冻结后的字典（按键排序的 (键, 值) 元组）"""
+
+    __slots__ = ()
+
+
+def _freeze(value: Any) -> Any:
+    """把列表/字典转换为可哈希的元组，字符串驻留"""
+    if isinstance(value, str):
+        return _intern(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return _FrozenDict(sorted((_intern(str(k)), _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _typed(value: Any) -> Any:
+    """带类型的比较键：1、1.0、True 以及 0、False 在 Python 中相等且哈希相同，但作为默认值/选项含义不同"""
+    if isinstance(value, tuple):
+        return (type(value), tuple(_typed(v) for v in value))
+    return (type(value), value)
+
+
+def _thaw(value: Any) -> Any:
+    """_freeze 的逆操作（用于生成请求体）"""
+    if isinstance(value, _FrozenDict):
+        return {k: _thaw(v) for k, v in value}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+class _Spec:
+    """不可变规格基类"""
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 是不可变对象")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} 是不可变对象")
+
+    def _astuple(self) -> Tuple:
+        return tuple(getattr(self, name) for name in self._fields)
+
+    def __hash__(self) -> int:
+        # 结构哈希只计算一次
+        cached = self._hash
+        if cached is None:
+            cached = hash((type(self).__name__, _typed(self._astuple())))
+            object.__setattr__(self, '_hash', cached)
+        return cached
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        return hash(self) == hash(other) and _typed(self._astuple()) == _typed(other._astuple())
+
+    def __repr__(self) -> str:
+        attrs = ', '.join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({attrs})"
+
+    def __reduce__(self):
+        return (type(self), self._astuple())
+
+
+class FieldSpec(_Spec):
+    """字段规格
+
+    Attributes:
+        key: 字段key
+        name: 字段名称
+        type: 字段类型（text/number/datetime/select...）
+        required: 是否必填
+        default: 默认值（列表/字典会转换为元组）
+        options: 选项元组；未配置时为 None
+        description: 字段说明
+    """
+
+    __slots__ = ('key', 'name', 'type', 'required', 'default', 'options', 'description',
+                 '_hash')
+    _fields = ('key', 'name', 'type', 'required', 'default', 'options', 'description')
+
+    def __init__(self, key: str, name: str, type: str, required: bool = False,
+                 default: Any = None, options: Optional[Iterable] = None, description: str = ''):
+        init = object.__setattr__
+        init(self, 'key', _intern(key))
+        init(self, 'name', _intern(name))
+        init(self, 'type', _intern(type))
+        init(self, 'required', bool(required))
+        init(self, 'default', _freeze(default))
+        init(self, 'options', None if options is None else _freeze(list(options)))
+        init(self, 'description', _intern(description or ''))
+        init(self, '_hash', None)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FieldSpec':
+        """由配置中的字段字典构建（结构相同的规格返回同一实例）"""
+        options = data.get('options')
+        return _canonical(cls, (
+            _intern(data['key']),
+            _intern(data['name']),
+            _intern(data['type']),
+            bool(data.get('required', False)),
+            _freeze(data.get('default')),
+            None if options is None else _freeze(options),
+            _intern(data.get('description') or ''),
+        ))
+
+    def to_field_config(self) -> Dict:
+        """sync_config 创建字段的请求体"""
+        return {
+            'key': self.key,
+            'name': self.name,
+            'type': self.type,
+            'required': self.required,
+            'default': _thaw(self.default),
+            'options': _thaw(self.options) if self.options is not None else []
+        }
+
+    def to_workflow_field(self) -> Dict:
+        """api_client 创建字段的请求体"""
+        return {
+            'key': self.key,
+            'name': self.name,
+            'type': self.type,
+            'required': self.required,
+            'description': self.description,
+            'options': _thaw(self.options),
+            'default': _thaw(self.default)
+        }
+
+
+class NodeSpec(_Spec):
+    """流程节点规格
+
+    Attributes:
+        key: 节点key（workflow-config.json 中为 id）
+        name: 节点名称
+        type: 节点类型
+        field_keys: 节点关联的字段key元组
+    """
+
+    __slots__ = ('key', 'name', 'type', 'field_keys', '_hash')
+    _fields = ('key', 'name', 'type', 'field_keys')
+
+    def __init__(self, key: str, name: str, type: str, field_keys: Iterable[str] = ()):
+        init = object.__setattr__
+        init(self, 'key', _intern(key))
+        init(self, 'name', _intern(name))
+        init(self, 'type', _intern(type))
+        init(self, 'field_keys', tuple(_intern(k) for k in field_keys))
+        init(self, '_hash', None)
+
+    @classmethod
+    def from_quality_node(cls, data: Dict) -> 'NodeSpec':
+        """由 quality-metrics.yaml 的 workflow_nodes 条目构建"""
+        return _canonical(cls, (_intern(data['key']), _intern(data['name']), _intern(data['type']),
+                                tuple(_intern(k) for k in data.get('required_fields', []))))
+
+    @classmethod
+    def from_workflow_node(cls, data: Dict) -> 'NodeSpec':
+        """由 workflow-config.json 的 processManagement.nodes 条目构建"""
+        return _canonical(cls, (_intern(data['id']), _intern(data['name']), _intern(data['type']),
+                                tuple(_intern(f['key']) for f in data.get('fields', []))))
+
+    def to_node_config(self) -> Dict:
+        """sync_config 创建节点的请求体"""
+        return {
+            'key': self.key,
+            'name': self.name,
+            'type': self.type,
+            'required_fields': list(self.field_keys)
+        }
+
+    def to_workflow_node(self) -> Dict:
+        """api_client 创建节点的请求体"""
+        return {
+            'id': self.key,
+            'name': self.name,
+            'type': self.type,
+            'fields': list(self.field_keys)
+        }
+
+
+# 结构相同的规格共享同一实例；命中时不再构建对象。超过上限时按最近最少使用淘汰
+_CANONICAL: 'OrderedDict[Tuple, _Spec]' = OrderedDict()
+_CANONICAL_LIMIT = 1 << 18
+
+
+def _canonical(cls, values: Tuple) -> _Spec:
+    """按已规范化（驻留、冻结）的属性值查找已有实例，未命中时创建
+
+    查找键带上每个值的类型，避免 default: True / 1.0 命中 default: 1 的实例
+    """
+    key = (cls, _typed(values))
+    spec = _CANONICAL.get(key)
+    if spec is not None:
+        _CANONICAL.move_to_end(key)
+    else:
+        if len(_CANONICAL) >= _CANONICAL_LIMIT:
+            _CANONICAL.popitem(last=False)
+        spec = object.__new__(cls)
+        init = object.__setattr__
+        for name, value in zip(cls._fields, values):
+            init(spec, name, value)
+        init(spec, '_hash', None)
+        _CANONICAL[key] = spec
+    return spec
+
+
+# ----------------------------------------------------------------------
+# 清单解析
+# ----------------------------------------------------------------------
+
+def quality_metric_fields(config: Dict) -> List[Tuple[str, Tuple[FieldSpec, ...]]]:
+    """quality-metrics.yaml 中每个指标的 (指标名称, 字段规格元组)"""
+    return [
+        (metric['name'], tuple(FieldSpec.from_dict(f) for f in metric.get('fields', [])))
+        for metric in config.get('quality_metrics', [])
+    ]
+
+
+def quality_field_specs(config: Dict) -> List[FieldSpec]:
+    """quality-metrics.yaml 中的全部字段规格（按配置顺序）"""
+    return [spec for _, specs in quality_metric_fields(config) for spec in specs]
+
+
+def quality_node_specs(config: Dict) -> List[NodeSpec]:
+    """quality-metrics.yaml 中的流程节点规格"""
+    return [NodeSpec.from_quality_node(n) for n in config.get('workflow_nodes', [])]
+
+
+def workflow_node_fields(nodes: List[Dict]) -> Iterator[Tuple[NodeSpec, Tuple[FieldSpec, ...]]]:
+    """workflow-config.json 中每个节点的 (节点规格, 字段规格元组)"""
+    for node in nodes:
+        yield (NodeSpec.from_workflow_node(node),
+               tuple(FieldSpec.from_dict(f) for f in node.get('fields', [])))
+
+
+# ----------------------------------------------------------------------
+# 字段合并
+# ----------------------------------------------------------------------
+
+# 同一字段key在不同节点中定义不一致时需要报告的属性
+CONFLICT_ATTRIBUTES = ('type', 'options', 'default')
+
+
+def merge_field_specs(node_fields: Iterable[Tuple[NodeSpec, Tuple[FieldSpec, ...]]]
+                      ) -> Tuple[List[FieldSpec], List[Dict]]:
+    """按字段key合并各节点的字段（线性时间）
+
+    同一个key保留第一次出现的定义；后续定义的类型、选项或默认值与之不同时记为冲突。
+
+    Returns:
+        (去重后的字段规格列表, 冲突列表)；冲突项包含 key、不一致的属性、
+        首次定义所在节点及其取值、冲突定义所在节点及其取值
+    """
+    merged: Dict[str, Tuple[FieldSpec, NodeSpec]] = {}
+    fields: List[FieldSpec] = []
+    conflicts: List[Dict] = []
+
+    for node, field_specs in node_fields:
+        for field in field_specs:
+            first = merged.get(field.key)
+            if first is None:
+                merged[field.key] = (field, node)
+                fields.append(field)
+                continue
+
+            first_field, first_node = first
+            # 规格是规范化实例：结构相同即同一个对象
+            if field is first_field:
+                continue
+            attributes = [name for name in CONFLICT_ATTRIBUTES
+                          if _typed(getattr(field, name)) != _typed(getattr(first_field, name))]
+            if attributes:
+                conflicts.append({
+                    'key': field.key,
+                    'attributes': attributes,
+                    'first_node': first_node.key,
+                    'node': node.key,
+                    'first': {name: _thaw(getattr(first_field, name)) for name in attributes},
+                    'other': {name: _thaw(getattr(field, name)) for name in attributes},
+                })
+
+    return fields, conflicts
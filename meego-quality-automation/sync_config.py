@@ -6,21 +6,30 @@
 
 import os
 import sys
+import argparse
 import yaml
 import json
 import requests
 import time
+import uuid
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 from pathlib import Path
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+from config_layers import load_layered_config
+from event_bus import EVENTS, OUTPUT_CHOICES, make_emitter
+from field_batcher import BatchNotSupported, FieldCreateBatcher, split_batch_results
+from request_metrics import METRICS, RequestMetrics, parse_response
+from retry_policy import NO_RETRY, RetryPolicy, call_with_retry, is_retry_safe
+from single_flight import READ_FLIGHT, SingleFlight
+from specs import FieldSpec, quality_metric_fields, quality_node_specs
+from sync_journal import SyncJournal, payload_digest
+from sync_state import SyncState, config_fingerprint, remote_digest
+from queue_logging import log_context, setup_logging
+from tracing import TRACER, traced
+
 logger = logging.getLogger(__name__)
 
 # 添加颜色输出支持
@@ -36,6 +45,14 @@ def colored(text, color):
     """彩色输出"""
     return f"{color}{text}{Colors.ENDC}"
 
+class FeishuAPIError(Exception):
+    """飞书项目API返回错误（HTTP状态码或业务 err_code）"""
+
+    def __init__(self, message: str, status_code: int = 200, err_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.err_code = err_code
+
 class FeishuProjectClient:
     """飞书项目API客户端"""
 
@@ -47,6 +64,55 @@ class FeishuProjectClient:
         self.base_url = "https://project.feishu.cn/open_api"
         self.token = None
         self.token_expires = None
+        self.timeout = 30
+
+        # 复用连接池（也便于基准测试挂载模拟后端）
+        self.session = requests.Session()
+        # 请求指标（默认使用进程级注册表）
+        self.metrics: RequestMetrics = METRICS
+        # 瞬时故障重试策略
+        self.retry_policy = RetryPolicy()
+        # 字段创建合并器（enable_field_batching 后启用）
+        self.field_batcher: Optional[FieldCreateBatcher] = None
+        # 读请求合并与短期缓存（进程内共享；设为 None 关闭）
+        self.read_flight: Optional[SingleFlight] = READ_FLIGHT
+
+    def _send(self, method: str, url: str, endpoint: str, idempotent: Optional[bool] = None,
+              **kwargs) -> Tuple[requests.Response, Optional[Dict]]:
+        """发送HTTP请求，瞬时故障时按策略重试（重试复用同一个 X-IDEM-UUID）
+
+        Returns:
+            (最后一次的响应, 已解析的 JSON 响应体)；非200或无法解析时响应体为 None
+        """
+        parsed: Dict[str, Optional[Dict]] = {}
+        if idempotent is None:
+            idempotent = is_retry_safe(method, kwargs.get('headers'))
+
+        def on_retry(attempt, delay, reason):
+            EVENTS.emit('api.retry', f"{method} {endpoint} 第{attempt}次失败({reason})，{delay:.1f}秒后重试",
+                        'warning', method=method, endpoint=endpoint, attempt=attempt, reason=reason)
+
+        response = call_with_retry(
+            lambda: self._send_once(method, url, endpoint, parsed, **kwargs),
+            self.retry_policy if idempotent else NO_RETRY,
+            on_retry=on_retry
+        )
+        return response, parsed.get('body')
+
+    def _send_once(self, method: str, url: str, endpoint: str, parsed: Dict, **kwargs) -> requests.Response:
+        """发送一次HTTP请求，解析一次响应体（存入 parsed['body']）并记录端点指标"""
+        with TRACER.span(f"{method} {endpoint}", 'http') as span:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self.metrics.observe_exception(method, endpoint, e, started)
+                raise
+            body, err_code = parse_response(response)
+            parsed['body'] = body
+            self.metrics.observe_response(method, endpoint, response, started, err_code)
+            span.set(status=response.status_code)
+            return response
 
     def get_token(self) -> str:
         """获取或刷新访问令牌"""
@@ -54,27 +120,47 @@ class FeishuProjectClient:
         if self.token and self.token_expires and datetime.now() < self.token_expires:
             return self.token
 
-        logger.info("获取新的访问令牌...")
-        url = f"{self.base_url}/auth/refresh_token"
+        with TRACER.span('token'):
+            logger.info("获取新的访问令牌...")
+            url = f"{self.base_url}/auth/refresh_token"
 
-        response = requests.post(url, json={
-            "plugin_id": self.plugin_id,
-            "plugin_secret": self.plugin_secret
-        })
+            response, data = self._send('POST', url, 'auth/refresh_token', idempotent=True, json={
+                "plugin_id": self.plugin_id,
+                "plugin_secret": self.plugin_secret
+            })
 
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("err_code") == 0:
+            if data is not None and data.get("err_code") == 0:
                 self.token = data["data"]["access_token"]
                 # Token有效期2小时，提前5分钟刷新
                 self.token_expires = datetime.now() + timedelta(hours=2, minutes=-5)
                 logger.info(colored("✓ Token获取成功", Colors.GREEN))
                 return self.token
 
-        raise Exception(f"获取Token失败: {response.text}")
+            raise Exception(f"获取Token失败: {response.text}")
+
+    def _request(self, method, endpoint, idem_key: Optional[str] = None, **kwargs) -> Dict:
+        """统一的请求方法
+
+        并发的相同 GET 请求共享一次调用，结果短期缓存；写请求后失效本空间的缓存
 
-    def _request(self, method, endpoint, **kwargs) -> Dict:
-        """统一的请求方法"""
+        Args:
+            idem_key: 指定幂等键（断点续跑时复用日志中记录的键），为空时自动生成
+        """
+        if self.read_flight is None:
+            return self._request_once(method, endpoint, idem_key, **kwargs)
+
+        scope = (self.base_url, self.project_key)
+        if method == 'GET' and not kwargs:
+            return self.read_flight.do(scope + (self.user_key, endpoint),
+                                       lambda: self._request_once(method, endpoint))
+        try:
+            return self._request_once(method, endpoint, idem_key, **kwargs)
+        finally:
+            if method != 'GET':
+                self.read_flight.invalidate(scope)
+
+    def _request_once(self, method, endpoint, idem_key: Optional[str] = None, **kwargs) -> Dict:
+        """发送请求并解析响应"""
         token = self.get_token()
 
         headers = {
@@ -83,32 +169,81 @@ class FeishuProjectClient:
             'X-USER-KEY': self.user_key
         }
 
-        # 添加幂等性UUID
+        # 添加幂等性UUID（所有重试复用同一个）
         if method in ['POST', 'PUT', 'PATCH']:
-            import uuid
-            headers['X-IDEM-UUID'] = str(uuid.uuid4())
+            headers['X-IDEM-UUID'] = idem_key or str(uuid.uuid4())
 
         url = f"{self.base_url}/{self.project_key}/{endpoint}"
 
-        logger.debug(f"{method} {url}")
-        response = requests.request(method, url, headers=headers, **kwargs)
+        EVENTS.emit('api.request', f"{method} {url}", 'debug', method=method, endpoint=endpoint)
+        response, data = self._send(method, url, endpoint, headers=headers, **kwargs)
 
         if response.status_code == 200:
-            data = response.json()
-            if data.get("err_code") == 0:
+            if data is None:
+                EVENTS.emit('api.response', '', 'debug', method=method, endpoint=endpoint, ok=False)
+                raise FeishuAPIError(f"API错误: 响应不是有效的JSON: {response.text[:200]}")
+            ok = data.get("err_code") == 0
+            EVENTS.emit('api.response', '', 'debug', method=method, endpoint=endpoint, ok=ok)
+            if ok:
                 return data.get("data", {})
             else:
-                raise Exception(f"API错误: {data.get('err_msg')}")
+                raise FeishuAPIError(f"API错误: {data.get('err_msg')}", err_code=data.get('err_code'))
         else:
-            raise Exception(f"HTTP {response.status_code}: {response.text}")
+            EVENTS.emit('api.response', '', 'debug', method=method, endpoint=endpoint, ok=False,
+                        http_status=response.status_code)
+            raise FeishuAPIError(f"HTTP {response.status_code}: {response.text}",
+                                 status_code=response.status_code)
+
+    def get_fields(self, work_item_type: str, fresh: bool = False) -> List[Dict]:
+        """获取工作项字段列表
 
-    def get_fields(self, work_item_type: str) -> List[Dict]:
-        """获取工作项字段列表"""
+        Args:
+            fresh: 丢弃本空间的读缓存，确保读到远端的最新状态（断点续跑时使用）
+        """
+        if fresh and self.read_flight is not None:
+            self.read_flight.invalidate((self.base_url, self.project_key))
         return self._request('GET', f'field/{work_item_type}')
 
-    def create_field(self, work_item_type: str, field_config: Dict) -> Dict:
-        """创建自定义字段"""
-        return self._request('POST', f'field/{work_item_type}/create', json=field_config)
+    def create_field(self, work_item_type: str, field_config: Dict, idem_key: Optional[str] = None) -> Dict:
+        """创建自定义字段（启用合并时会等待所在批次完成）"""
+        if self.field_batcher:
+            return self.field_batcher.submit(work_item_type, field_config, idem_key).result()
+        return self._create_field_single(work_item_type, field_config, idem_key)
+
+    def submit_field(self, work_item_type: str, field_config: Dict, idem_key: Optional[str] = None) -> Future:
+        """提交字段创建，返回结果的 Future；未启用合并时立即执行"""
+        if self.field_batcher:
+            return self.field_batcher.submit(work_item_type, field_config, idem_key)
+        future: Future = Future()
+        try:
+            future.set_result(self._create_field_single(work_item_type, field_config, idem_key))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def enable_field_batching(self, window: float = 0.05, max_batch: int = 50) -> FieldCreateBatcher:
+        """把短时间内的 create_field 调用合并为批量创建请求"""
+        self.field_batcher = FieldCreateBatcher(self._create_fields_batch, self._create_field_single,
+                                                window=window, max_batch=max_batch)
+        return self.field_batcher
+
+    def _create_field_single(self, work_item_type: str, field_config: Dict, idem_key: Optional[str] = None) -> Dict:
+        return self._request('POST', f'field/{work_item_type}/create', idem_key=idem_key, json=field_config)
+
+    def _create_fields_batch(self, work_item_type: str, field_configs: List[Dict],
+                             idem_key: Optional[str] = None) -> List[Any]:
+        """调用批量创建端点，返回每个字段的结果（失败项为异常）"""
+        try:
+            data = self._request('POST', 'field/batch_create', idem_key=idem_key, json={
+                'work_item_type': work_item_type,
+                'fields': field_configs
+            })
+        except FeishuAPIError as e:
+            if e.status_code in (404, 405, 501):
+                raise BatchNotSupported(str(e)) from e
+            raise
+        return split_batch_results(data, len(field_configs), lambda item: FeishuAPIError(
+            f"API错误: {item.get('err_msg')}", err_code=item.get('err_code')))
 
     def update_field(self, work_item_type: str, field_key: str, updates: Dict) -> Dict:
         """更新字段配置"""
@@ -118,24 +253,54 @@ class FeishuProjectClient:
         """获取流程模板列表"""
         return self._request('GET', f'template_list/{work_item_type}')
 
-    def create_workflow_node(self, work_item_type: str, node_config: Dict) -> Dict:
+    def create_workflow_node(self, work_item_type: str, node_config: Dict, idem_key: Optional[str] = None) -> Dict:
         """创建流程节点"""
-        return self._request('POST', f'process/{work_item_type}/node', json=node_config)
+        return self._request('POST', f'process/{work_item_type}/node', idem_key=idem_key, json=node_config)
 
 class QualityMetricsConfigurator:
     """质量指标配置器"""
 
-    def __init__(self, config_file: str):
+    # 相邻写请求之间的间隔（秒），避免触发限流
+    request_interval = 0.1
+
+    def __init__(self, config_file: str, journal: Optional[SyncJournal] = None):
         self.config_file = config_file
         self.config = self._load_config()
+        # 字段/节点规格只构建一次
+        self.metric_fields = quality_metric_fields(self.config)
+        self.node_specs = quality_node_specs(self.config)
         self.client = None
+        # 预写日志（为空时不记录，每次全量同步）
+        self.journal = journal
+        # 本次同步中失败的写操作数
+        self.failures = 0
 
     def _load_config(self) -> Dict:
-        """加载YAML配置文件"""
-        with open(self.config_file, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-            logger.info(f"加载配置文件: {self.config_file}")
-            return config
+        """加载YAML配置文件（支持 extends 继承基础配置）"""
+        config = load_layered_config(self.config_file)
+        logger.info(f"加载配置文件: {self.config_file}")
+        return config
+
+    @property
+    def space_id(self) -> str:
+        """同步状态文件中的空间标识"""
+        return f"{self.config['project']['key']}:{self.config['work_item_type']}"
+
+    def config_fingerprint(self) -> str:
+        """规范化配置的指纹"""
+        return config_fingerprint(
+            self.config['project']['key'],
+            self.config['work_item_type'],
+            (field for _, field_specs in self.metric_fields for field in field_specs),
+            self.node_specs,
+            self.config.get('automation_rules')
+        )
+
+    def remote_fingerprint(self) -> str:
+        """远端状态摘要（只需读取字段列表和流程模板两个请求）"""
+        work_item_type = self.config['work_item_type']
+        return remote_digest(self.client.get_fields(work_item_type),
+                             self.client.get_workflow_templates(work_item_type))
 
     def init_client(self, credentials: Dict):
         """初始化API客户端"""
@@ -146,112 +311,181 @@ class QualityMetricsConfigurator:
             project_key=self.config['project']['key']
         )
 
+    @traced('sync_all')
     def sync_all(self):
         """同步所有配置到飞书项目"""
-        print(f"\n{colored('═' * 60, Colors.BLUE)}")
-        print(colored("开始同步质量指标配置到飞书项目", Colors.BOLD))
-        print(f"{colored('═' * 60, Colors.BLUE)}\n")
+        EVENTS.emit('step', f"\n{'═' * 60}\n开始同步质量指标配置到飞书项目\n{'═' * 60}\n", 'notice',
+                    bold=True, space=self.space_id)
 
         work_item_type = self.config['work_item_type']
 
-        # 1. 同步字段
-        self._sync_fields(work_item_type)
+        if self.journal and self.journal.resumed:
+            done = self.journal.summary().get('done', 0)
+            EVENTS.emit('resume', f"↻ 从断点恢复：跳过已完成的 {done} 个操作", 'warning', done=done)
+
+        # 各阶段的日志附带空间和阶段上下文
+        with log_context(project=self.config['project']['key']):
+            # 1. 同步字段
+            with log_context(phase='fields'):
+                self._sync_fields(work_item_type)
 
-        # 2. 同步流程节点
-        self._sync_workflow_nodes(work_item_type)
+            # 2. 同步流程节点
+            with log_context(phase='nodes'):
+                self._sync_workflow_nodes(work_item_type)
 
-        # 3. 配置自动化规则
-        self._setup_automation_rules()
+            # 3. 配置自动化规则
+            with log_context(phase='automation'):
+                self._setup_automation_rules()
 
-        print(f"\n{colored('═' * 60, Colors.GREEN)}")
-        print(colored("✅ 配置同步完成！", Colors.GREEN + Colors.BOLD))
-        print(f"{colored('═' * 60, Colors.GREEN)}")
+        if self.journal:
+            self.journal.finish_run()
 
+        EVENTS.emit('sync', f"\n{'═' * 60}\n✅ 配置同步完成！\n{'═' * 60}", status='ok', bold=True,
+                    space=self.space_id, failures=self.failures)
+
+    @traced('sync_fields')
     def _sync_fields(self, work_item_type: str):
         """同步字段配置（幂等操作）"""
-        print(colored("\n📋 同步字段配置...", Colors.BLUE))
+        EVENTS.emit('step', "\n📋 同步字段配置...", 'notice', phase='fields')
 
-        # 获取现有字段
-        try:
-            existing_fields = self.client.get_fields(work_item_type)
-            existing_keys = {f['key'] for f in existing_fields}
-        except Exception as e:
-            logger.warning(f"无法获取现有字段: {e}")
-            existing_keys = set()
+        # 获取现有字段；断点续跑时重新读取远端（中断前可能已创建了部分字段）
+        with TRACER.span('fetch_fields', work_item_type=work_item_type) as span:
+            resumed = bool(self.journal and self.journal.resumed)
+            try:
+                existing_fields = self.client.get_fields(work_item_type, fresh=resumed)
+                existing_keys = {f['key'] for f in existing_fields}
+            except Exception as e:
+                logger.warning(f"无法获取现有字段: {e}")
+                existing_keys = set()
+            span.set(existing=len(existing_keys), fresh=resumed)
+
+        with TRACER.span('create_fields', work_item_type=work_item_type):
+            self._apply_fields(work_item_type, existing_keys)
+
+    def _apply_fields(self, work_item_type: str, existing_keys: set):
+        """按配置逐个创建或更新字段；启用合并时先提交全部新字段再统一输出结果"""
+        batching = self.client.field_batcher is not None
+        pending = []
 
         # 遍历配置的质量指标
-        for metric in self.config['quality_metrics']:
-            print(f"\n处理指标: {colored(metric['name'], Colors.BOLD)}")
+        for metric_name, field_specs in self.metric_fields:
+            EVENTS.emit('metric', f"\n处理指标: {metric_name}", metric=metric_name)
 
             # 处理每个指标的字段
-            for field in metric.get('fields', []):
-                field_key = field['key']
-                field_name = field['name']
-
-                if field_key in existing_keys:
-                    print(f"  ↻ 更新字段: {field_name}")
-                    self._update_field(work_item_type, field_key, field)
+            for field in field_specs:
+                if field.key in existing_keys:
+                    EVENTS.emit('field.submit', f"  ↻ 更新字段: {field.name}", key=field.key)
+                    self._update_field(work_item_type, field.key, field)
+                    continue
+
+                EVENTS.emit('field.submit', f"  + 创建字段: {field.name}", key=field.key)
+                submitted = self._submit_field(work_item_type, field)
+                if submitted is None:
+                    continue
+                if batching:
+                    pending.append((field, submitted))
                 else:
-                    print(f"  + 创建字段: {field_name}")
-                    self._create_field(work_item_type, field)
-
-                # 避免触发限流
-                time.sleep(0.1)
-
-    def _create_field(self, work_item_type: str, field: Dict):
-        """创建字段"""
-        field_config = {
-            'key': field['key'],
-            'name': field['name'],
-            'type': field['type'],
-            'required': field.get('required', False),
-            'default': field.get('default'),
-            'options': field.get('options', [])
-        }
-
+                    self._finish_field(*submitted)
+                    # 避免触发限流
+                    time.sleep(self.request_interval)
+
+        if pending:
+            self.client.field_batcher.flush()
+            EVENTS.emit('field.batch', f"\n  批量创建 {len(pending)} 个字段:", 'notice', count=len(pending))
+            for field, submitted in pending:
+                EVENTS.emit('field.submit', f"  {field.name}", key=field.key)
+                self._finish_field(*submitted)
+
+    def _op_id(self, kind: str, *parts: str) -> str:
+        """日志中的操作标识"""
+        return ':'.join((kind, self.config['project']['key']) + parts)
+
+    def _submit_field(self, work_item_type: str, field: FieldSpec) -> Optional[tuple]:
+        """提交字段创建，返回 (操作标识, Future)；日志中已完成时返回 None"""
+        field_config = field.to_field_config()
+
+        op_id = self._op_id('field', work_item_type, field.key)
+        digest = payload_digest(field_config)
+        if self.journal and self.journal.is_done(op_id, digest):
+            EVENTS.emit('field', "    ✓ 已完成（日志）", key=field.key, status='skip')
+            return None
+
+        idem_key = self.journal.plan(op_id, 'field', digest) if self.journal else None
+        return op_id, self.client.submit_field(work_item_type, field_config, idem_key=idem_key)
+
+    def _finish_field(self, op_id: str, future: Future):
+        """等待字段创建结果并记录"""
         try:
-            result = self.client.create_field(work_item_type, field_config)
-            print(colored(f"    ✓ 成功", Colors.GREEN))
+            result = future.result()
+            if self.journal:
+                self.journal.complete(op_id, result)
+            EVENTS.emit('field', "    ✓ 成功", op_id=op_id, status='ok')
         except Exception as e:
-            print(colored(f"    ✗ 失败: {e}", Colors.RED))
+            # 断点续跑时批次成员变化、批量幂等键随之变化，上次已创建的字段会返回已存在
+            if "already exists" in str(e).lower():
+                if self.journal:
+                    self.journal.complete(op_id, 'already exists')
+                EVENTS.emit('field', "    ↻ 已存在", op_id=op_id, status='skip')
+            else:
+                self.failures += 1
+                if self.journal:
+                    self.journal.fail(op_id, str(e))
+                EVENTS.emit('field', f"    ✗ 失败: {e}", op_id=op_id, status='fail', error=str(e))
 
-    def _update_field(self, work_item_type: str, field_key: str, field: Dict):
+    def _update_field(self, work_item_type: str, field_key: str, field: FieldSpec):
         """更新字段（如果需要）"""
         # 这里可以实现字段的更新逻辑
         # 由于飞书API可能不支持所有字段的更新，这里仅作示例
-        print(colored(f"    ↻ 已存在，跳过", Colors.YELLOW))
+        op_id = self._op_id('field', work_item_type, field_key)
+        if self.journal and self.journal.is_pending(op_id):
+            # 中断前已发出的创建请求实际成功了
+            self.journal.complete(op_id, 'already exists')
+        EVENTS.emit('field', "    ↻ 已存在，跳过", key=field_key, status='skip')
 
+    @traced('sync_workflow_nodes')
     def _sync_workflow_nodes(self, work_item_type: str):
         """同步流程节点"""
-        print(colored("\n🔄 同步流程节点...", Colors.BLUE))
+        EVENTS.emit('step', "\n🔄 同步流程节点...", 'notice', phase='nodes')
 
-        for node in self.config.get('workflow_nodes', []):
-            print(f"  配置节点: {node['name']}")
+        for node in self.node_specs:
+            EVENTS.emit('node.submit', f"  配置节点: {node.name}", key=node.key)
+            node_config = node.to_node_config()
+
+            op_id = self._op_id('node', work_item_type, node.key)
+            digest = payload_digest(node_config)
+            if self.journal and self.journal.is_done(op_id, digest):
+                EVENTS.emit('node', "    ✓ 已完成（日志）", key=node.key, status='skip')
+                continue
+
+            idem_key = self.journal.plan(op_id, 'node', digest) if self.journal else None
             try:
-                self.client.create_workflow_node(work_item_type, {
-                    'key': node['key'],
-                    'name': node['name'],
-                    'type': node['type'],
-                    'required_fields': node.get('required_fields', [])
-                })
-                print(colored(f"    ✓ 成功", Colors.GREEN))
+                result = self.client.create_workflow_node(work_item_type, node_config, idem_key=idem_key)
+                if self.journal:
+                    self.journal.complete(op_id, result)
+                EVENTS.emit('node', "    ✓ 成功", key=node.key, status='ok')
             except Exception as e:
                 if "already exists" in str(e).lower():
-                    print(colored(f"    ↻ 已存在", Colors.YELLOW))
+                    if self.journal:
+                        self.journal.complete(op_id, 'already exists')
+                    EVENTS.emit('node', "    ↻ 已存在", key=node.key, status='skip')
                 else:
-                    print(colored(f"    ✗ 失败: {e}", Colors.RED))
+                    self.failures += 1
+                    if self.journal:
+                        self.journal.fail(op_id, str(e))
+                    EVENTS.emit('node', f"    ✗ 失败: {e}", key=node.key, status='fail', error=str(e))
 
-            time.sleep(0.1)
+            time.sleep(self.request_interval)
 
+    @traced('setup_automation_rules')
     def _setup_automation_rules(self):
         """设置自动化规则"""
-        print(colored("\n⚙️  配置自动化规则...", Colors.BLUE))
+        EVENTS.emit('step', "\n⚙️  配置自动化规则...", 'notice', phase='automation')
 
         for rule in self.config.get('automation_rules', []):
-            print(f"  配置规则: {rule['name']}")
+            EVENTS.emit('rule.submit', f"  配置规则: {rule['name']}", rule=rule['name'])
             # 飞书API可能暂不支持通过API配置自动化规则
             # 这里仅作为占位符，实际可能需要UI操作
-            print(colored(f"    ℹ 需要在UI中手动配置", Colors.YELLOW))
+            EVENTS.emit('rule', "    ℹ 需要在UI中手动配置", rule=rule['name'], status='manual')
 
 class ChromeDevToolsDebugger:
     """Chrome DevTools MCP集成 - 用于API调试"""
@@ -286,20 +520,78 @@ response = requests.post(url, headers=headers, json=payload)
         """
         return code
 
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行参数（忽略未知参数，保持与旧版调用方式兼容）"""
+    parser = argparse.ArgumentParser(description='飞书项目质量指标自动化配置')
+    parser.add_argument('--debug', action='store_true', help='同步后启动Chrome DevTools调试模式')
+    parser.add_argument('--config', metavar='PATH', action='append',
+                        help='空间配置文件，可通过 extends 继承基础配置；可重复指定以依次同步多个空间'
+                             '（默认 quality-metrics.yaml）')
+    parser.add_argument('--spaces-dir', metavar='DIR',
+                        help='同步该目录下所有 *.yaml 空间配置')
+    parser.add_argument('--metrics-out', metavar='PATH',
+                        help='导出API请求指标（.prom/.txt 为Prometheus格式，其余为JSON）；'
+                             '运行中可发送 SIGUSR1 按需导出')
+    parser.add_argument('--trace-out', metavar='PATH',
+                        help='导出各阶段耗时追踪（Chrome Trace Event JSON，可用 Perfetto 查看）')
+    parser.add_argument('--journal', metavar='PATH',
+                        help='预写日志路径；中断后重跑时跳过已完成的操作，从断点恢复')
+    parser.add_argument('--restart', action='store_true',
+                        help='忽略日志中未完成的运行，从头开始同步')
+    parser.add_argument('--state-file', metavar='PATH', default='.sync-state.json',
+                        help='同步状态文件；配置和远端状态都未变化时跳过同步（默认 .sync-state.json）')
+    parser.add_argument('--force', action='store_true',
+                        help='忽略同步状态，强制执行完整同步')
+    parser.add_argument('--batch-window', metavar='MS', type=float, default=0,
+                        help='把该时间窗口（毫秒）内的字段创建合并为批量请求；'
+                             '平台不支持批量端点时自动退回逐个创建（默认 0 不合并）')
+    parser.add_argument('--output', choices=OUTPUT_CHOICES, default='pretty',
+                        help='输出格式：pretty 终端渲染 + 实时进度（默认），json 每个事件一行 JSON，silent 不输出')
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+def _journal_path(journal: str, config_file: str, per_space: bool) -> str:
+    """同步多个空间时每个空间使用独立的日志文件"""
+    if not per_space:
+        return journal
+    path = Path(journal)
+    return str(path.with_name(f"{path.stem}.{Path(config_file).stem}{path.suffix}"))
+
+def _unchanged(state: SyncState, configurator: QualityMetricsConfigurator, fingerprint: str) -> bool:
+    """与上一次成功同步相比，配置和远端状态是否都未变化"""
+    if not state.get(configurator.space_id):
+        return False
+    try:
+        remote = configurator.remote_fingerprint()
+    except Exception as e:
+        logger.warning(f"无法获取远端状态，执行完整同步: {e}")
+        return False
+    return state.unchanged(configurator.space_id, fingerprint, remote)
+
 def main():
     """主函数"""
-    print(colored("""
+    args = parse_args()
+    setup_logging()
+    EVENTS.configure(make_emitter(args.output))
+
+    if args.output == 'pretty':
+        print(colored("""
 ╔══════════════════════════════════════════════════════╗
 ║     飞书项目(Meego)质量指标自动化配置工具            ║
 ║         配置即代码 - 告别手动配置的痛苦              ║
 ╚══════════════════════════════════════════════════════╝
-    """, Colors.BLUE + Colors.BOLD))
+        """, Colors.BLUE + Colors.BOLD))
 
     # 检查配置文件
-    config_file = "quality-metrics.yaml"
-    if not Path(config_file).exists():
-        print(colored(f"❌ 找不到配置文件: {config_file}", Colors.RED))
-        sys.exit(1)
+    config_files = list(args.config or [])
+    if args.spaces_dir:
+        config_files += sorted(str(p) for p in Path(args.spaces_dir).glob('*.yaml'))
+    if not config_files:
+        config_files = ["quality-metrics.yaml"]
+    for config_file in config_files:
+        if not Path(config_file).exists():
+            print(colored(f"❌ 找不到配置文件: {config_file}", Colors.RED))
+            sys.exit(1)
 
     # 检查认证信息
     credentials_file = "credentials.yaml"
@@ -322,24 +614,69 @@ def main():
             print("  - FEISHU_USER_KEY")
             sys.exit(1)
 
-    try:
-        # 初始化配置器
-        configurator = QualityMetricsConfigurator(config_file)
-        configurator.init_client(credentials)
+    if args.metrics_out:
+        METRICS.install_signal_dump(args.metrics_out)
+    if args.trace_out:
+        TRACER.configure(args.trace_out)
 
-        # 执行同步
-        configurator.sync_all()
+    journal = None
+    state = SyncState(args.state_file)
+    try:
+        for config_file in config_files:
+            if len(config_files) > 1:
+                EVENTS.emit('space', f"\n▶ 空间配置: {config_file}", 'notice', bold=True, config=config_file)
+
+            # 初始化配置器
+            configurator = QualityMetricsConfigurator(config_file)
+            configurator.init_client(credentials)
+            if args.batch_window > 0:
+                configurator.client.enable_field_batching(window=args.batch_window / 1000)
+
+            # 配置和远端状态都未变化时跳过
+            fingerprint = configurator.config_fingerprint()
+            if not args.force and _unchanged(state, configurator, fingerprint):
+                EVENTS.emit('sync', "✓ 配置与远端状态自上次同步后均未变化，跳过（--force 强制同步）",
+                            status='skip', space=configurator.space_id)
+                continue
+
+            if args.journal:
+                journal = SyncJournal(_journal_path(args.journal, config_file, len(config_files) > 1))
+                journal.begin_run(restart=args.restart)
+                configurator.journal = journal
+
+            # 执行同步
+            configurator.sync_all()
+
+            # 全部成功后记录状态
+            if configurator.failures == 0:
+                state.record(configurator.space_id, fingerprint, configurator.remote_fingerprint())
+            else:
+                EVENTS.emit('sync', f"⚠️  {configurator.failures} 个操作失败，下次运行将重新同步", 'warning',
+                            space=configurator.space_id, failures=configurator.failures)
 
         # 可选：使用Chrome DevTools调试
-        if '--debug' in sys.argv:
-            print(colored("\n🔍 启动Chrome DevTools调试模式...", Colors.BLUE))
+        if args.debug:
+            EVENTS.emit('step', "\n🔍 启动Chrome DevTools调试模式...", 'notice')
+            EVENTS.flush()
             debugger = ChromeDevToolsDebugger()
             debugger.start_capture()
 
     except Exception as e:
-        print(colored(f"\n❌ 配置失败: {e}", Colors.RED))
+        EVENTS.emit('error', f"\n❌ 配置失败: {e}", 'error', error=str(e))
+        EVENTS.flush()
         logger.exception("详细错误信息:")
         sys.exit(1)
 
+    finally:
+        if journal:
+            journal.close()
+        if args.metrics_out:
+            METRICS.dump(args.metrics_out)
+            EVENTS.emit('report', f"API请求指标已保存到 {args.metrics_out}", path=args.metrics_out)
+        if args.trace_out:
+            TRACER.export()
+            EVENTS.emit('report', f"阶段耗时追踪已保存到 {args.trace_out}", path=args.trace_out)
+        EVENTS.close()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
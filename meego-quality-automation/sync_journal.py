@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+同步预写日志（write-ahead journal）
+以追加写入的 JSON Lines 记录每个写操作的计划/完成状态及其幂等键。
+一次运行中断后重跑时，已完成的操作直接跳过，未完成的操作复用原幂等键重发，
+远端读取结果作为检查点保存，恢复时间只与剩余工作量成正比。
+运行完成后日志被压缩为只含未完成操作（失败的操作及其幂等键），文件大小不随运行次数增长；
+这些操作在下一次运行中复用原幂等键。
+
+记录格式（每行一条）:
+    {"type": "run", "status": "started|completed", "run_id": ..., "ts": ...}
+    {"type": "op", "op": "field:requirement:review_result", "kind": "field",
+     "status": "planned|done|failed", "idem_key": ..., "digest": ..., "ts": ...}
+    {"type": "checkpoint", "name": "existing_fields:requirement", "data": ..., "ts": ...}
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+
+def payload_digest(payload: Any) -> str:
+    """请求体的稳定摘要；配置变化后对应操作视为新操作"""
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _copy_ops(ops: Dict[str, Dict]) -> Dict[str, Dict]:
+    return {op_id: dict(op) for op_id, op in ops.items()}
+
+
+class SyncJournal:
+    """追加写入的同步日志
+
+    Args:
+        path: 日志文件路径
+        fsync: 每条记录写入后是否落盘（保证进程崩溃后日志完整）
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self.run_id: Optional[str] = None
+        self.resumed = False
+        self._lock = threading.Lock()
+        self._ops: Dict[str, Dict] = {}
+        self._checkpoints: Dict[str, Any] = {}
+        self._file = None
+
+    # ------------------------------------------------------------------
+    # 运行生命周期
+    # ------------------------------------------------------------------
+
+    def begin_run(self, restart: bool = False) -> bool:
+        """开始一次运行；若上一次运行未完成则恢复其状态
+
+        Args:
+            restart: 丢弃未完成运行的状态，从头开始
+
+        Returns:
+            是否恢复了未完成的运行
+        """
+        run_id, ops, checkpoints, carried = self._replay()
+        if run_id and not restart:
+            self.run_id = run_id
+            self._ops = ops
+            self._checkpoints = checkpoints
+            self.resumed = True
+        else:
+            self.run_id = uuid.uuid4().hex
+            self._ops = carried
+            self._checkpoints = {}
+            self.resumed = False
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if not self.resumed:
+            self._append({'type': 'run', 'status': 'started', 'run_id': self.run_id})
+        return self.resumed
+
+    def finish_run(self):
+        """标记本次运行完成并压缩日志；之后的运行将重新开始"""
+        self._append({'type': 'run', 'status': 'completed', 'run_id': self.run_id})
+        self.close()
+        self._compact()
+
+    def _compact(self):
+        """用只含未完成操作的日志原子替换原文件（完成标记已落盘，替换前崩溃不影响恢复）"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.journal-', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for op in self._ops.values():
+                if op.get('status') != 'done':
+                    record = {key: value for key, value in op.items() if key != 'result'}
+                    f.write(json.dumps({**record, 'type': 'op'}, ensure_ascii=False, default=str) + '\n')
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _replay(self):
+        """读取日志，返回最后一次未完成运行的 (run_id, 操作状态, 检查点, 上次运行遗留的未完成操作)"""
+        run_id = None
+        ops: Dict[str, Dict] = {}
+        checkpoints: Dict[str, Any] = {}
+        # 压缩后位于所有运行记录之前的操作：新运行从这些状态开始
+        carried: Dict[str, Dict] = {}
+        if not os.path.exists(self.path):
+            return None, ops, checkpoints, carried
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 崩溃时可能留下不完整的最后一行
+                    continue
+
+                kind = record.get('type')
+                if kind == 'run':
+                    if record['status'] == 'started':
+                        run_id, ops, checkpoints = record['run_id'], _copy_ops(carried), {}
+                    elif record['status'] == 'completed' and record.get('run_id') == run_id:
+                        # 完成后、压缩前中断时，与压缩结果一致
+                        carried = {op_id: op for op_id, op in ops.items() if op.get('status') != 'done'}
+                        run_id, ops, checkpoints = None, {}, {}
+                elif run_id is None:
+                    if kind == 'op':
+                        previous = carried.get(record['op'], {})
+                        carried[record['op']] = {**previous, **record}
+                    continue
+                elif kind == 'op':
+                    previous = ops.get(record['op'], {})
+                    ops[record['op']] = {**previous, **record}
+                elif kind == 'checkpoint':
+                    checkpoints[record['name']] = record.get('data')
+
+        return run_id, ops, checkpoints, carried
+
+    def _append(self, record: Dict):
+        record['ts'] = round(time.time(), 3)
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    # ------------------------------------------------------------------
+    # 操作记录
+    # ------------------------------------------------------------------
+
+    def is_done(self, op_id: str, digest: Optional[str] = None) -> bool:
+        """操作是否已在本次运行中完成（且请求体未变化）"""
+        op = self._ops.get(op_id)
+        if not op or op.get('status') != 'done':
+            return False
+        return digest is None or op.get('digest') == digest
+
+    def is_pending(self, op_id: str) -> bool:
+        """操作是否已在本次运行中登记但尚未完成（计划中或失败）"""
+        op = self._ops.get(op_id)
+        return bool(op) and op.get('status') != 'done'
+
+    def plan(self, op_id: str, kind: str, digest: Optional[str] = None) -> str:
+        """登记即将执行的操作，返回其幂等键
+
+        已登记但未完成的同一操作复用原幂等键，保证重发时平台按键去重
+        """
+        op = self._ops.get(op_id)
+        if op and op.get('idem_key') and op.get('digest') == digest:
+            idem_key = op['idem_key']
+        else:
+            idem_key = str(uuid.uuid4())
+
+        record = {'type': 'op', 'op': op_id, 'kind': kind, 'status': 'planned',
+                  'idem_key': idem_key, 'digest': digest}
+        self._ops[op_id] = dict(record)
+        self._append(record)
+        return idem_key
+
+    def complete(self, op_id: str, result: Any = None):
+        """标记操作完成"""
+        record = {'type': 'op', 'op': op_id, 'status': 'done', 'result': result}
+        self._ops.setdefault(op_id, {}).update(record)
+        self._append(record)
+
+    def fail(self, op_id: str, error: str):
+        """标记操作失败（保留幂等键，下次重跑时复用）"""
+        record = {'type': 'op', 'op': op_id, 'status': 'failed', 'error': error}
+        self._ops.setdefault(op_id, {}).update(record)
+        self._append(record)
+
+    # ------------------------------------------------------------------
+    # 检查点
+    # ------------------------------------------------------------------
+
+    def checkpoint(self, name: str, data: Any):
+        """保存远端读取结果等中间状态"""
+        self._checkpoints[name] = data
+        self._append({'type': 'checkpoint', 'name': name, 'data': data})
+
+    def get_checkpoint(self, name: str, default: Any = None) -> Any:
+        return self._checkpoints.get(name, default)
+
+    def remember(self, name: str, loader: Callable[[], Any]) -> Any:
+        """检查点存在时直接返回，否则调用 loader 并保存结果"""
+        if name in self._checkpoints:
+            return self._checkpoints[name]
+        data = loader()
+        if data is not None:
+            self.checkpoint(name, data)
+        return data
+
+    def summary(self) -> Dict[str, int]:
+        """按状态统计本次运行的操作数"""
+        counts: Dict[str, int] = {}
+        for op in self._ops.values():
+            status = op.get('status', 'planned')
+            counts[status] = counts.get(status, 0) + 1
+        return counts
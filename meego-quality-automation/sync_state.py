@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+同步状态指纹
+记录每个空间上一次成功同步时的配置指纹和远端状态摘要；
+两者都未变化时定时任务可以直接跳过逐字段同步。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from specs import FieldSpec, NodeSpec
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def config_fingerprint(project_key: str, work_item_type: str, fields: Iterable[FieldSpec],
+                       nodes: Iterable[NodeSpec], automation_rules: Optional[List[Dict]] = None) -> str:
+    """规范化配置的指纹：只包含会同步到平台的内容（与键顺序、注释、阈值等无关）"""
+    return _digest({
+        'project': project_key,
+        'work_item_type': work_item_type,
+        'fields': sorted((f.to_field_config() for f in fields), key=lambda f: f['key']),
+        'nodes': sorted((n.to_node_config() for n in nodes), key=lambda n: n['key']),
+        'automation_rules': automation_rules or [],
+    })
+
+
+def remote_digest(fields: List[Dict], templates: Any) -> str:
+    """远端状态摘要：字段的 key/名称/类型/选项 与流程模板"""
+    return _digest({
+        'fields': sorted(
+            ({k: f.get(k) for k in ('key', 'name', 'type', 'options')} for f in fields or []),
+            key=lambda f: str(f['key'])
+        ),
+        'templates': templates,
+    })
+
+
+class SyncState:
+    """同步状态文件（JSON，按空间记录）
+
+    格式:
+        {"<project_key>:<work_item_type>": {"config": ..., "remote": ..., "synced_at": ...}}
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = self._read()
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def unchanged(self, space: str, config: str, remote: str) -> bool:
+        """配置和远端状态是否都与上一次成功同步时相同"""
+        entry = self._entries.get(space)
+        return bool(entry) and entry.get('config') == config and entry.get('remote') == remote
+
+    def get(self, space: str) -> Optional[Dict]:
+        return self._entries.get(space)
+
+    def record(self, space: str, config: str, remote: str):
+        """记录一次成功同步并写入文件（原子替换）"""
+        with self._lock:
+            self._entries[space] = {
+                'config': config,
+                'remote': remote,
+                'synced_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.sync-state-', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+同步阶段耗时追踪
+嵌套 span 以 Chrome Trace Event 格式写入本地文件，
+可直接在 chrome://tracing、Perfetto (ui.perfetto.dev) 或 speedscope 中查看火焰时间线
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """一个已开始的 span"""
+
+    __slots__ = ('name', 'category', 'attrs', 'span_id', 'parent_id', 'start_us', 'start_perf')
+
+    def __init__(self, name: str, category: str, attrs: Dict[str, Any],
+                 span_id: int, parent_id: Optional[int]):
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_us = time.time_ns() // 1000
+        self.start_perf = time.perf_counter()
+
+    def set(self, **attrs):
+        """补充 span 属性（如处理数量、结果）"""
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """span 记录器；未启用时 span() 几乎没有开销"""
+
+    def __init__(self):
+        self.enabled = False
+        self.path: Optional[str] = None
+        self._events: List[Dict] = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def configure(self, path: str):
+        """启用追踪，结束时写入 path"""
+        self.path = path
+        self.enabled = True
+
+    @contextmanager
+    def span(self, name: str, category: str = 'phase', **attrs):
+        """记录一个嵌套 span
+
+        用法:
+            with TRACER.span('sync_fields', work_item_type='requirement') as span:
+                ...
+                span.set(created=10)
+        """
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        with self._lock:
+            self._next_id += 1
+            span_id = self._next_id
+        span = Span(name, category, dict(attrs), span_id, parent.span_id if parent else None)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        duration_us = (time.perf_counter() - span.start_perf) * 1_000_000
+        args = {k: _jsonable(v) for k, v in span.attrs.items()}
+        args['span_id'] = span.span_id
+        if span.parent_id is not None:
+            args['parent_id'] = span.parent_id
+        event = {
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': span.start_us,
+            'dur': round(duration_us, 3),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        }
+        with self._lock:
+            self._events.append(event)
+
+    def events(self) -> List[Dict]:
+        with self._lock:
+            return list(self._events)
+
+    def export(self, path: Optional[str] = None) -> Optional[str]:
+        """写入 Chrome Trace Event JSON 文件，返回文件路径"""
+        path = path or self.path
+        if not path:
+            return None
+
+        events = self.events()
+        threads = {(e['pid'], e['tid']) for e in events}
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': os.getpid(),
+                     'args': {'name': 'meego-sync'}}]
+        metadata += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                      'args': {'name': f'worker-{i}'}}
+                     for i, (pid, tid) in enumerate(sorted(threads))]
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'},
+                      f, ensure_ascii=False)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._events = []
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _jsonable(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def traced(name: Optional[str] = None, category: str = 'phase'):
+    """装饰器：把函数调用记录为一个 span"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(span_name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# 进程级默认追踪器
+TRACER = Tracer()
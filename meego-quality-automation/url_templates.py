@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+URL 路径模板聚类
+把捕获到的接口路径归并成参数化模板，例如：
+
+    proj_a/work_item/story/1234567/field/field_8f3a2c  ->  proj_a/work_item/story/{id}/field/{key}
+
+抓包中出现大量不同项目时，第一段也会归并为 {param}。
+
+按路径段构建前缀树，一次遍历完成归并：
+- 形如 ID/UUID/哈希/带数字的 key 的路径段直接替换为占位符；
+- 同一位置出现的不同字面量超过阈值（如项目key、用户名）时，把该位置的分支合并为一个占位符
+  （已有唯一占位符时沿用，否则为 {param}）。
+每个节点的字面量分支数有上限，模板数量不会随请求数无限增长。
+"""
+
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 同一位置允许的不同字面量数量，超过后合并为 {param}
+DEFAULT_MAX_LITERALS = 20
+
+PARAM = '{param}'
+
+# (占位符, 正则)，按顺序匹配
+_SEGMENT_PATTERNS = (
+    ('{id}', re.compile(r'^\d+$')),
+    ('{uuid}', re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$')),
+    ('{hash}', re.compile(r'^(?=[^0-9]*[0-9])[0-9a-fA-F]{16,}$')),
+    ('{token}', re.compile(r'^(?=[^0-9]*[0-9])(?=[^A-Za-z]*[A-Za-z])[A-Za-z0-9_\-]{20,}$')),
+    ('{key}', re.compile(r'^[A-Za-z]+_(?=[A-Za-z]*[0-9])[A-Za-z0-9]{4,}$')),
+)
+
+
+def classify_segment(segment: str) -> Optional[str]:
+    """路径段看起来是变量时返回占位符，否则返回 None"""
+    for placeholder, pattern in _SEGMENT_PATTERNS:
+        if pattern.match(segment):
+            return placeholder
+    return None
+
+
+class _Node:
+    __slots__ = ('literals', 'params', 'collapsed', 'values')
+
+    def __init__(self):
+        self.literals: Dict[str, '_Node'] = {}
+        self.params: Dict[str, '_Node'] = {}
+        # 合并后的占位符：该位置已确认是变量，所有路径段都归入此分支
+        self.collapsed: Optional[str] = None
+        # 在此结束的模板：方法 -> 统计值
+        self.values: Dict[str, Any] = {}
+
+
+class PathTemplateTrie:
+    """路径模板前缀树
+
+    Args:
+        merge: 分支合并时合并两个统计值的函数 merge(目标, 来源)
+        max_literals: 同一位置允许的不同字面量数量
+    """
+
+    def __init__(self, merge: Callable[[Any, Any], None], max_literals: int = DEFAULT_MAX_LITERALS):
+        self.root = _Node()
+        self.merge = merge
+        self.max_literals = max_literals
+        self.collapses = 0
+
+    def add(self, method: str, path: str, factory: Callable[[], Any]) -> Tuple[str, Any, bool]:
+        """记录一条请求路径
+
+        Returns:
+            (模板, 该模板+方法的统计值, 是否为新模板)
+        """
+        node = self.root
+        template: List[str] = []
+        for segment in path.strip('/').split('/'):
+            # 已见过的字面量不再做正则判断
+            child = None if node.collapsed else node.literals.get(segment)
+            if child is not None:
+                template.append(segment)
+                node = child
+                continue
+            placeholder = node.collapsed or classify_segment(segment)
+            if placeholder is not None:
+                child = node.params.get(placeholder)
+                if child is None:
+                    child = node.params[placeholder] = _Node()
+                template.append(placeholder)
+            else:
+                child = node.literals[segment] = _Node()
+                if len(node.literals) > self.max_literals:
+                    segment = self._collapse(node)
+                    child = node.params[segment]
+                template.append(segment)
+            node = child
+
+        value = node.values.get(method)
+        is_new = value is None
+        if is_new:
+            value = node.values[method] = factory()
+        return '/'.join(template), value, is_new
+
+    def items(self) -> Iterator[Tuple[str, str, Any]]:
+        """遍历 (方法, 模板, 统计值)"""
+        stack: List[Tuple[_Node, Tuple[str, ...]]] = [(self.root, ())]
+        while stack:
+            node, prefix = stack.pop()
+            for method, value in node.values.items():
+                yield method, '/'.join(prefix), value
+            for segment, child in node.literals.items():
+                stack.append((child, prefix + (segment,)))
+            for placeholder, child in node.params.items():
+                stack.append((child, prefix + (placeholder,)))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.items())
+
+    def _collapse(self, node: _Node) -> str:
+        """把 node 的全部分支合并为一个占位符分支，返回该占位符
+
+        已有唯一占位符分支（如 {key}）时沿用它，否则使用 {param}。
+        """
+        self.collapses += 1
+        name = next(iter(node.params)) if len(node.params) == 1 else PARAM
+        children = list(node.literals.values()) + [
+            child for placeholder, child in node.params.items() if placeholder != name]
+        target = node.params.get(name) or _Node()
+        node.literals, node.params = {}, {name: target}
+        node.collapsed = name
+        for child in children:
+            self._merge(target, child)
+        return name
+
+    def _merge(self, dst: _Node, src: _Node):
+        for method, value in src.values.items():
+            existing = dst.values.get(method)
+            if existing is None:
+                dst.values[method] = value
+            else:
+                self.merge(existing, value)
+
+        for placeholder, child in src.params.items():
+            self._merge_child(dst.params, dst.collapsed or placeholder, child)
+        for segment, child in src.literals.items():
+            if dst.collapsed:
+                self._merge_child(dst.params, dst.collapsed, child)
+            else:
+                self._merge_child(dst.literals, segment, child)
+                if len(dst.literals) > self.max_literals:
+                    self._collapse(dst)
+
+    def _merge_child(self, children: Dict[str, _Node], segment: str, child: _Node):
+        existing = children.get(segment)
+        if existing is None:
+            children[segment] = child
+        else:
+            self._merge(existing, child)
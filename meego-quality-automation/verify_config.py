@@ -5,7 +5,9 @@
 
 import yaml
 import sys
+from config_layers import load_layered_config
 from sync_config import FeishuProjectClient, Colors, colored
+from specs import quality_field_specs, quality_node_specs
 
 def verify_configuration():
     """验证配置是否成功应用"""
@@ -17,8 +19,7 @@ def verify_configuration():
     """, Colors.BLUE))
 
     # 加载配置
-    with open('quality-metrics.yaml', 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
+    config = load_layered_config('quality-metrics.yaml')
 
     with open('credentials.yaml', 'r', encoding='utf-8') as f:
         credentials = yaml.safe_load(f)
@@ -37,25 +38,21 @@ def verify_configuration():
     print(colored("1. 验证字段配置", Colors.BOLD))
     work_item_type = config['work_item_type']
 
+    # 收集所有配置的字段
+    expected_fields = quality_field_specs(config)
+    success_count = 0
+    missing_count = 0
+
     try:
         existing_fields = client.get_fields(work_item_type)
         existing_keys = {f['key'] for f in existing_fields}
 
-        # 收集所有配置的字段
-        expected_fields = []
-        for metric in config['quality_metrics']:
-            for field in metric.get('fields', []):
-                expected_fields.append(field)
-
-        success_count = 0
-        missing_count = 0
-
         for field in expected_fields:
-            if field['key'] in existing_keys:
-                print(f"  ✅ {field['name']}")
+            if field.key in existing_keys:
+                print(f"  ✅ {field.name}")
                 success_count += 1
             else:
-                print(colored(f"  ❌ {field['name']} - 未找到", Colors.RED))
+                print(colored(f"  ❌ {field.name} - 未找到", Colors.RED))
                 missing_count += 1
 
         print(f"\n  统计: {success_count} 个已配置, {missing_count} 个缺失")
@@ -70,8 +67,8 @@ def verify_configuration():
         templates = client.get_workflow_templates(work_item_type)
         print(f"  找到 {len(templates)} 个流程模板")
 
-        for node in config.get('workflow_nodes', []):
-            print(f"  • {node['name']} ({node['type']})")
+        for node in quality_node_specs(config):
+            print(f"  • {node.name} ({node.type})")
 
     except Exception as e:
         print(colored(f"  ❌ 验证失败: {e}", Colors.RED))
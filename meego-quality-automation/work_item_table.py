@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+本地工作项表
+读取 export_requirements.py 导出的工作项文件（CSV / NDJSON / Parquet 分卷目录），
+供离线指标计算使用；时间字段统一换算为以天为单位的时间戳。
+"""
+
+import csv
+import glob
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+DAY_SECONDS = 86400.0
+
+
+def to_epoch_days(value: Any) -> Optional[float]:
+    """时间字段 → 自 1970-01-01 起的天数（浮点）
+
+    接受毫秒/秒时间戳（平台返回毫秒）、数字字符串和 ISO 8601 字符串，无法解析时返回 None
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            value = float(text)
+        except ValueError:
+            try:
+                parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+            except ValueError:
+                return None
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp() / DAY_SECONDS
+    if isinstance(value, (int, float)):
+        seconds = value / 1000.0 if abs(value) >= 1e11 else float(value)
+        return seconds / DAY_SECONDS
+    return None
+
+
+def option_label(value: Any) -> str:
+    """选项/人员等字段 → 显示文本
+
+    平台返回 {"label", "value"} 结构（CSV 导出中为其 JSON 文本），多选为列表；空值返回空字符串
+    """
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        if not value.startswith(('{', '[')):
+            return value
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    if isinstance(value, dict):
+        return str(value.get('label') or value.get('name') or value.get('value') or '')
+    if isinstance(value, list):
+        return ','.join(option_label(item) for item in value)
+    return str(value)
+
+
+def iter_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取导出文件：*.csv、*.ndjson / *.jsonl，或 Parquet 分卷目录 / *.parquet"""
+    if os.path.isdir(path) or path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parts = sorted(glob.glob(os.path.join(path, 'part-*.parquet'))) if os.path.isdir(path) else [path]
+        for part in parts:
+            for batch in pq.ParquetFile(part).iter_batches():
+                yield from batch.to_pylist()
+    elif path.endswith(('.ndjson', '.jsonl')):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from csv.DictReader(f)